@@ -338,7 +338,7 @@ with right:
                 backend=backend,
                 profiles=st.session_state.spawn_profiles,
             )
-            kernel = Kernel(world, prog.consts, prog.laws)
+            kernel = Kernel(world, prog.consts, prog.laws, seed=int(st.session_state.seed))
 
             # re-seed with final dimensions
             W, H = kernel.world.w, kernel.world.h
@@ -352,7 +352,7 @@ with right:
                 profiles=st.session_state.spawn_profiles,
             )
             world.dt = DT
-            kernel = Kernel(world, prog.consts, prog.laws)
+            kernel = Kernel(world, prog.consts, prog.laws, seed=int(st.session_state.seed))
 
             st.session_state.kernel = kernel
             st.session_state.kernel_key = kernel_key
@@ -22,8 +22,19 @@ class Backend:
     def roll(self, arr, shift, axis):
         return self.xp.roll(arr, shift, axis)
 
-    def clip(self, arr, lo, hi):
-        return self.xp.clip(arr, lo, hi)
+    def clip(self, arr, lo, hi, out=None):
+        return self.xp.clip(arr, lo, hi, out=out)
+
+    def asarray(self, arr):
+        return self.xp.asarray(arr)
+
+    def scatter_add(self, arr, indices, values):
+        if self.xp is np:
+            np.add.at(arr, indices, values)
+            return
+        import cupyx
+
+        cupyx.scatter_add(arr, indices, values)
 
     def asnumpy(self, arr):
         if self.xp is np:
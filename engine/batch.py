@@ -0,0 +1,404 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, TextIO
+
+import numpy as np
+
+from .backend import get_backend
+from .compiler import CompiledProgram, compile_program
+from .factory import seed_world
+from .kernel import Kernel
+from .model import ENTITY_COLUMNS, World
+from .worldpack import load_worldpack_json, worldpack_to_dsl
+
+# Columns written when --columns is not given
+DEFAULT_COLUMNS = ("id", "x", "y", "vx", "vy", "energy", "color")
+
+
+@dataclass
+class WorldSpec:
+    """Everything needed to seed a world: a compiled-ready program plus its population."""
+
+    name: str
+    dsl: str
+    seed: int = 42
+    n: int = 200
+    profiles: List[Dict[str, Any]] | None = None
+    channels: List[Any] | None = None
+
+
+def load_spec(source: str | Path) -> WorldSpec:
+    """A worldpack (``.json`` or a preset name) or a ``.law`` program."""
+    path = Path(source)
+    if path.suffix == ".law":
+        return WorldSpec(name=path.stem, dsl=path.read_text(encoding="utf-8"))
+    pack = load_worldpack_json(str(source))
+    profiles = pack.get("profiles") or None
+    return WorldSpec(
+        name=pack.get("name", path.stem),
+        dsl=worldpack_to_dsl(pack),
+        seed=int(pack.get("seed", 42)),
+        n=sum(int(p.get("count", 0)) for p in profiles) if profiles else 200,
+        profiles=profiles,
+        channels=pack.get("channels") or None,
+    )
+
+
+def override_consts(prog: CompiledProgram, overrides: Dict[str, Any]) -> CompiledProgram:
+    """``prog`` with the consts in ``overrides`` replaced (or added), laws shared.
+
+    Replaced consts keep their place, so consts defined from them still see
+    the new value.
+    """
+    if not overrides:
+        return prog
+    lines = "\n".join(f"const {k} = {v}" for k, v in overrides.items())
+    return CompiledProgram(consts={**prog.consts, **compile_program(lines).consts}, laws=prog.laws)
+
+
+def build_kernel(
+    spec: WorldSpec,
+    seed: int | None = None,
+    n: int | None = None,
+    consts: Dict[str, Any] | None = None,
+    use_gpu: bool = False,
+    vectorize: bool | None = None,
+    program: CompiledProgram | None = None,
+) -> Kernel:
+    """Seed ``spec``'s world and its kernel, the way the service's apply does.
+
+    ``program`` is ``spec.dsl`` already compiled, for callers building many kernels.
+    """
+    prog = override_consts(program or compile_program(spec.dsl), consts or {})
+    seed = spec.seed if seed is None else int(seed)
+    n = spec.n if n is None else int(n)
+    backend = get_backend(use_gpu)
+    # W/H/DT come from the consts, which only the kernel evaluates; seed once to
+    # read them, then again at the real size so fields and positions match
+    probe = seed_world(256, 256, n=n, seed=seed, backend=backend, profiles=spec.profiles, channels=spec.channels)
+    kernel = Kernel(probe, prog.consts, prog.laws, seed=seed)
+    w, h, dt = kernel.world.w, kernel.world.h, kernel.world.dt
+    world = seed_world(w, h, n=n, seed=seed, backend=backend, profiles=spec.profiles, channels=spec.channels)
+    world.dt = dt
+    return Kernel(world, prog.consts, prog.laws, vectorize=vectorize, seed=seed)
+
+
+def parse_ids(text: str) -> np.ndarray:
+    """Entity ids from ``"1,4,10-20"``."""
+    ids: List[int] = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        lo, sep, hi = part.partition("-")
+        ids.extend(range(int(lo), int(hi) + 1) if sep else [int(lo)])
+    return np.asarray(ids, dtype=np.int64)
+
+
+class Sampler:
+    """Picks the entity rows, columns and field grids written for each sample.
+
+    Only living entities are sampled, narrowed to ``ids`` and ``colors`` when
+    given. Fields are taken every ``field_step`` cells, every ``field_every``
+    samples (0 never).
+    """
+
+    def __init__(
+        self,
+        columns: Sequence[str] = DEFAULT_COLUMNS,
+        ids: Iterable[int] | None = None,
+        colors: Iterable[str] | None = None,
+        fields: Sequence[str] = (),
+        field_step: int = 4,
+        field_every: int = 1,
+    ):
+        for name in columns:
+            if name != "color" and name not in ENTITY_COLUMNS:
+                raise ValueError(f"unknown entity column: {name}")
+        self.columns = tuple(columns)
+        self.ids = None if ids is None else np.asarray(list(ids), dtype=np.int64)
+        self.colors = None if colors is None else tuple(colors)
+        self.fields = tuple(fields)
+        self.field_step = max(1, int(field_step))
+        self.field_every = max(0, int(field_every))
+        self._count = 0
+
+    def rows(self, world: World) -> np.ndarray:
+        store = world.entities
+        rows = store.alive_indices()
+        if self.ids is not None:
+            rows = rows[np.isin(store.id[rows], self.ids)]
+        if self.colors is not None:
+            codes = [i for i, name in enumerate(store.colors) if name in self.colors]
+            rows = rows[np.isin(store.color_code[rows], codes)]
+        return rows
+
+    def sample(self, kernel: Kernel) -> Dict[str, Any]:
+        world = kernel.world
+        store = world.entities
+        rows = self.rows(world)
+        entities: Dict[str, np.ndarray] = {}
+        for name in self.columns:
+            entities[name] = store.color_code[rows] if name == "color" else store.column(name)[rows]
+        grids: Dict[str, np.ndarray] = {}
+        if self.fields and self.field_every and self._count % self.field_every == 0:
+            backend = world.backend
+            step = self.field_step
+            for name in self.fields:
+                grids[name] = np.asarray(backend.asnumpy(world.field(name)[::step, ::step]), dtype=np.float32)
+        self._count += 1
+        return {"tick": kernel.ticks, "t": float(world.time), "count": len(rows), "entities": entities, "fields": grids}
+
+    def check(self, world: World) -> None:
+        for name in self.fields:
+            if name not in world.channels:
+                raise ValueError(f"unknown field: {name}")
+
+
+class JsonlSink:
+    """One JSON object per sample, entity columns as lists and colors by name."""
+
+    def __init__(self, out: TextIO):
+        self.out = out
+
+    def write(self, sample: Dict[str, Any], world: World) -> None:
+        entities = {}
+        for name, values in sample["entities"].items():
+            entities[name] = world.entities.color_names(values) if name == "color" else values.tolist()
+        row = {
+            "tick": sample["tick"],
+            "t": sample["t"],
+            "count": sample["count"],
+            "entities": entities,
+        }
+        if sample["fields"]:
+            row["fields"] = {name: grid.tolist() for name, grid in sample["fields"].items()}
+        self.out.write(json.dumps(row) + "\n")
+
+    def close(self, world: World) -> None:
+        self.out.flush()
+
+
+class ColumnSink:
+    """Raw little-endian column files, appended to per sample.
+
+    ``directory`` gets ``entities/<column>.bin`` (every sampled row, back to
+    back), ``fields/<name>.bin`` (one float32 grid per sample that has
+    fields) and ``samples.jsonl`` with each sample's tick, time, row offset
+    and count. ``meta.json`` holds the dtypes, grid shape and color names;
+    ``read_columns`` puts it all back together.
+    """
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        (self.directory / "entities").mkdir(parents=True, exist_ok=True)
+        (self.directory / "fields").mkdir(exist_ok=True)
+        self._files: Dict[str, Any] = {}
+        self._index = open(self.directory / "samples.jsonl", "w", encoding="utf-8")
+        self._rows = 0
+        self._meta: Dict[str, Any] = {"columns": {}, "fields": {}, "colors": []}
+
+    def _file(self, kind: str, name: str):
+        key = f"{kind}/{name}"
+        f = self._files.get(key)
+        if f is None:
+            f = self._files[key] = open(self.directory / kind / f"{name}.bin", "wb")
+        return f
+
+    def write(self, sample: Dict[str, Any], world: World) -> None:
+        for name, values in sample["entities"].items():
+            dtype = values.dtype.newbyteorder("<")
+            self._meta["columns"][name] = dtype.str
+            self._file("entities", name).write(values.astype(dtype, copy=False).tobytes())
+        for name, grid in sample["fields"].items():
+            self._meta["fields"][name] = list(grid.shape)
+            self._file("fields", name).write(grid.astype("<f4", copy=False).tobytes())
+        self._index.write(json.dumps({
+            "tick": sample["tick"],
+            "t": sample["t"],
+            "offset": self._rows,
+            "count": sample["count"],
+            "fields": bool(sample["fields"]),
+        }) + "\n")
+        self._rows += sample["count"]
+
+    def close(self, world: World) -> None:
+        for f in self._files.values():
+            f.close()
+        self._index.close()
+        self._meta["colors"] = list(world.entities.colors)
+        (self.directory / "meta.json").write_text(json.dumps(self._meta, indent=2), encoding="utf-8")
+
+
+def read_columns(directory: str | Path) -> Dict[str, Any]:
+    """Load a ``ColumnSink`` directory: ``samples``, ``entities`` and ``fields`` arrays, ``colors``."""
+    directory = Path(directory)
+    meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+    text = (directory / "samples.jsonl").read_text(encoding="utf-8")
+    samples = [json.loads(line) for line in text.splitlines() if line.strip()]
+    entities = {
+        name: np.fromfile(directory / "entities" / f"{name}.bin", dtype=np.dtype(dtype))
+        for name, dtype in meta["columns"].items()
+    }
+    fields = {
+        name: np.fromfile(directory / "fields" / f"{name}.bin", dtype="<f4").reshape(-1, *shape)
+        for name, shape in meta["fields"].items()
+    }
+    return {"samples": samples, "entities": entities, "fields": fields, "colors": meta["colors"]}
+
+
+def run(kernel: Kernel, ticks: int, sink, sampler: Sampler | None = None, every: int = 1) -> Dict[str, Any]:
+    """Tick ``kernel`` ``ticks`` times with no observer, writing a sample to ``sink`` every ``every`` ticks.
+
+    The starting state is sampled, and so is the last tick; ``every`` 0
+    writes only those two.
+    """
+    sampler = sampler or Sampler()
+    sampler.check(kernel.world)
+    ticks = max(0, int(ticks))
+    every = max(0, int(every))
+    samples = 0
+    start = time.perf_counter()
+    sink.write(sampler.sample(kernel), kernel.world)
+    samples += 1
+    for i in range(1, ticks + 1):
+        kernel.tick(observer_xy=None)
+        if (every and i % every == 0) or i == ticks:
+            sink.write(sampler.sample(kernel), kernel.world)
+            samples += 1
+    elapsed = time.perf_counter() - start
+    sink.close(kernel.world)
+    return {
+        "ticks": ticks,
+        "samples": samples,
+        "alive": int(len(kernel.world.entities.alive_indices())),
+        "t": float(kernel.world.time),
+        "elapsed_s": round(elapsed, 4),
+        "ticks_per_s": round(ticks / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+def _split(text: str | None) -> List[str]:
+    return [part.strip() for part in (text or "").split(",") if part.strip()]
+
+
+def parse_consts(items: Iterable[str]) -> Dict[str, str]:
+    """``["G=0.2", "SUBSTEPS=2"]`` -> ``{"G": "0.2", "SUBSTEPS": "2"}``."""
+    consts = {}
+    for item in items:
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip() or not value.strip():
+            raise ValueError(f"expected NAME=VALUE, got {item!r}")
+        consts[name.strip()] = value.strip()
+    return consts
+
+
+def _run_command(args: argparse.Namespace) -> int:
+    spec = load_spec(args.source)
+    kernel = build_kernel(
+        spec,
+        seed=args.seed,
+        n=args.n,
+        consts=parse_consts(args.const),
+        use_gpu=args.gpu,
+        vectorize=args.vectorize,
+    )
+    sampler = Sampler(
+        columns=_split(args.columns) or DEFAULT_COLUMNS,
+        ids=parse_ids(args.ids) if args.ids else None,
+        colors=_split(args.color) or None,
+        fields=_split(args.fields),
+        field_step=args.field_step,
+        field_every=args.field_every,
+    )
+    fmt = args.format or ("jsonl" if args.out == "-" or args.out.endswith(".jsonl") else "columns")
+    if fmt == "columns":
+        sink = ColumnSink(args.out)
+    elif args.out == "-":
+        sink = JsonlSink(sys.stdout)
+    else:
+        sink = JsonlSink(open(args.out, "w", encoding="utf-8"))
+    try:
+        summary = run(kernel, args.ticks, sink, sampler, every=args.every)
+    finally:
+        if isinstance(sink, JsonlSink) and sink.out is not sys.stdout:
+            sink.out.close()
+    summary = {"name": spec.name, "seed": spec.seed if args.seed is None else args.seed, **summary}
+    print(json.dumps(summary), file=sys.stderr)
+    return 0
+
+
+def _sweep_command(args: argparse.Namespace) -> int:
+    from .ensemble import expand_grid, sweep
+
+    variants: List[Dict[str, Any]] = []
+    if args.variants:
+        variants.extend(json.loads(Path(args.variants).read_text(encoding="utf-8")))
+    grid = {name: _split(values) for name, values in parse_consts(args.grid).items()}
+    if grid:
+        # A grid applies on top of each listed variant (or on its own)
+        variants = [{**base, **point} for base in variants or [{}] for point in expand_grid(grid)]
+    seeds = parse_ids(args.seeds).tolist() if args.seeds else [None]
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    start = time.perf_counter()
+    runs = failed = 0
+    try:
+        for result in sweep(load_spec(args.source), variants or [{}], seeds, args.ticks, args.workers, args.n, args.vectorize):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            runs += 1
+            failed += "error" in result
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(json.dumps({"runs": runs, "failed": failed, "elapsed_s": round(time.perf_counter() - start, 4)}), file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m engine.batch", description="Headless simulation runs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("run", help="simulate a worldpack or .law file and stream sampled states")
+    p.add_argument("source", help="worldpack .json (or preset name) or .law file")
+    p.add_argument("--ticks", type=int, default=1000)
+    p.add_argument("--seed", type=int, default=None, help="defaults to the worldpack's seed (42 for .law)")
+    p.add_argument("--n", type=int, default=None, help="entity count for worlds without profiles")
+    p.add_argument("--const", action="append", default=[], metavar="NAME=VALUE", help="override a const")
+    p.add_argument("--every", type=int, default=10, help="sample every N ticks (0: first and last only)")
+    p.add_argument("--columns", default="", help=f"entity columns (default {','.join(DEFAULT_COLUMNS)})")
+    p.add_argument("--ids", default="", help="only these entity ids, e.g. 1,5,10-20")
+    p.add_argument("--color", default="", help="only entities of these colors")
+    p.add_argument("--fields", default="", help="field channels to sample, e.g. water,food")
+    p.add_argument("--field-step", type=int, default=4, help="keep every Nth field cell")
+    p.add_argument("--field-every", type=int, default=1, help="fields on every Nth sample")
+    p.add_argument("--out", default="-", help="'-' or *.jsonl for JSONL, anything else is a column directory")
+    p.add_argument("--format", choices=("jsonl", "columns"), default=None)
+    p.add_argument("--gpu", action="store_true")
+    p.add_argument("--vectorize", action=argparse.BooleanOptionalAction, default=None)
+    p.set_defaults(handler=_run_command)
+
+    p = commands.add_parser("sweep", help="run const overrides x seeds on a process pool, one summary line per run")
+    p.add_argument("source", help="worldpack .json (or preset name) or .law file")
+    p.add_argument("--ticks", type=int, default=1000)
+    p.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...", help="sweep a const over values")
+    p.add_argument("--variants", default="", help="JSON file with a list of const overrides, e.g. [{\"G\": 0.1}]")
+    p.add_argument("--seeds", default="", help="seeds to run each variant with, e.g. 1-32 (default: the pack's)")
+    p.add_argument("--n", type=int, default=None, help="entity count for worlds without profiles")
+    p.add_argument("--workers", type=int, default=None, help="processes (default: one per core)")
+    p.add_argument("--out", default="-", help="JSONL file for the summaries ('-' for stdout)")
+    p.add_argument("--vectorize", action=argparse.BooleanOptionalAction, default=None)
+    p.set_defaults(handler=_sweep_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
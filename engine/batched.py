@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import random
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .fields import FieldScratch
+from .kernel import Kernel
+from .model import ENTITY_COLUMNS, EntityStore, gather_channels, integrate_fields
+from .safeexpr import CompiledExpr, rng_stream
+from .spatial import StackedIndex
+from .vector import NeighborContext
+
+
+class _Draws:
+    """Stands in for the kernel RNG while a batched law runs.
+
+    Vector expressions draw ``len(rows)`` values per ``rand()``, in row
+    order, so each draw can be routed to the stream of the world owning its
+    row: every world sees exactly the draws its own kernel would make.
+    """
+
+    def __init__(self, rngs: List[random.Random], stride: int):
+        self.rngs = rngs
+        self.stride = stride
+        self.counts = np.zeros(len(rngs), dtype=np.intp)
+        self._owners: List[int] = []
+        self._i = 0
+
+    def rows(self, idx: np.ndarray) -> None:
+        owners = idx // self.stride
+        self.counts = np.bincount(owners, minlength=len(self.rngs))
+        self._owners = owners.tolist()
+        self._i = 0
+
+    def _next(self) -> random.Random:
+        rng = self.rngs[self._owners[self._i % len(self._owners)]]
+        self._i += 1
+        return rng
+
+    def random(self) -> float:
+        return self._next().random()
+
+    def randint(self, a: int, b: int) -> int:
+        return self._next().randint(a, b)
+
+
+class _StackedSelectors:
+    """Neighbor selector masks from each world's own ``SelectorCache``, laid out like the batched rows.
+
+    Only worlds with rows in the running law build a mask, as they would
+    alone, so cached and random selectors stay in step with a lone kernel.
+    """
+
+    def __init__(self, kernels: List[Kernel], stride: int, draws: _Draws):
+        self.kernels = kernels
+        self.stride = stride
+        self.draws = draws
+
+    def mask(self, expr: CompiledExpr) -> np.ndarray:
+        out = np.zeros(len(self.kernels) * self.stride, dtype=bool)
+        for k, kernel in enumerate(self.kernels):
+            if self.draws.counts[k]:
+                with rng_stream(kernel.rng):
+                    m = kernel.selectors.mask(expr)
+                out[k * self.stride:k * self.stride + m.size] = m
+        return out
+
+
+class BatchedKernel:
+    """Steps K worlds that run the same program as one.
+
+    The worlds' entity columns are stacked into one store of K blocks of
+    ``stride`` rows (padded with dead rows), and their field tensors into one
+    (F, K, H, W) tensor, so ``fields[c]`` holds channel ``c`` of every world.
+    Vectorized laws, field sampling, decay, diffusion and integration then
+    run once over all worlds. Each kernel keeps working on a view of its own
+    block, so ``kernels[k]`` is always current and can be inspected or
+    checkpointed; appending entities to one would detach it.
+
+    Results are identical to ticking each kernel alone with
+    ``vectorize=True``: neighbor queries follow each world's own cell
+    layout, selector masks come from its own cache, and every ``rand()`` draws from the stream of the
+    world it is drawn for. Laws with no column form run world by world.
+    """
+
+    def __init__(self, kernels: Sequence[Kernel]):
+        kernels = list(kernels)
+        if not kernels:
+            raise ValueError("no kernels to batch")
+        first = kernels[0]
+        for kernel in kernels:
+            if not kernel.cfg.vectorize:
+                raise ValueError("batched worlds run law-major; build their kernels with vectorize=True")
+            if self._signature(kernel) != self._signature(first):
+                raise ValueError("batched worlds must share program, consts, size, time and field channels")
+        self.kernels = kernels
+        self.stride = stride = max(1, max(len(k.world.entities) for k in kernels))
+        count = len(kernels)
+
+        # One store over every world's rows; each world's store becomes a window onto its block
+        store = self.entities = EntityStore(capacity=count * stride)
+        store._n = count * stride
+        versions = store.versions
+        for k, kernel in enumerate(kernels):
+            own = kernel.world.entities
+            n, base = len(own), k * stride
+            codes = np.asarray([store.intern_color(c) for c in own.colors] or [0], dtype=np.int32)
+            for name in ENTITY_COLUMNS:
+                col = own.column(name)
+                store._cols[name][base:base + n] = codes[col] if name == "color_code" else col
+            own._cols = {name: store._cols[name][base:base + stride] for name in ENTITY_COLUMNS}
+            own._cap = stride
+            # Shared palette (codes mean the same color everywhere) and write counters
+            own.colors, own._color_codes, own.versions = store.colors, store._color_codes, versions
+        store.touch()
+
+        world = first.world
+        backend = self.backend = world.backend
+        xp = backend.xp
+        self.fields = backend.zeros((world.fields.shape[0], count) + tuple(world.fields.shape[1:]), dtype=xp.float32)
+        for k, kernel in enumerate(kernels):
+            self.fields[:, k] = kernel.world.fields
+            kernel.world.fields = self.fields[:, k]
+        self._decay = world.channels.decay_vector(xp, xp.float32)[:, None, None, None]
+        self._scratch = FieldScratch(backend)
+
+        self.draws = _Draws([k.rng for k in kernels], stride)
+        self.spatial = StackedIndex(stride)
+        self.selectors = _StackedSelectors(kernels, stride, self.draws)
+        self._row_laws = any(v is None for v in first.vector_laws)
+
+    @classmethod
+    def seeded(cls, spec, seeds: Iterable[int], n: int | None = None, consts: Dict[str, Any] | None = None,
+               use_gpu: bool = False) -> "BatchedKernel":
+        """One world of ``spec`` (engine.batch.WorldSpec) per seed, batched."""
+        from .batch import build_kernel
+        from .compiler import compile_program
+
+        program = compile_program(spec.dsl)
+        return cls([
+            build_kernel(spec, seed=seed, n=n, consts=consts, use_gpu=use_gpu, vectorize=True, program=program)
+            for seed in seeds
+        ])
+
+    @staticmethod
+    def _signature(kernel: Kernel) -> Tuple[Any, ...]:
+        w = kernel.world
+        return (
+            kernel.laws, kernel.consts, kernel.cfg,
+            w.w, w.h, w.dt, w.time, w.day_cycle, w.weather_cycle, w.season_cycle,
+            w.fields.shape, list(w.channels.channels), w.backend.name,
+        )
+
+    def __len__(self) -> int:
+        return len(self.kernels)
+
+    @property
+    def ticks(self) -> int:
+        return self.kernels[0].ticks
+
+    # -- stepping ------------------------------------------------------------
+
+    def tick(self) -> None:
+        """One tick of every world (no observer)."""
+        first = self.kernels[0]
+        substeps = max(1, first.cfg.substeps)
+        step_dt = first.world.dt / substeps
+        for _ in range(substeps):
+            for kernel in self.kernels:
+                kernel._build_grid()
+            self.spatial.build([kernel.spatial for kernel in self.kernels])
+            self._sample_fields()
+            base_env = {"true": True, "false": False}
+            base_env.update(first.consts)
+            base_env.update(first.world.uniform_env())
+            for kernel in self.kernels:
+                kernel.selectors.begin_substep(kernel.world.entities, base_env, kernel.sample_names)
+                kernel._scratch.clear()
+            self._run_laws(base_env)
+            self._integrate(step_dt)
+        for kernel in self.kernels:
+            kernel.ticks += 1
+
+    def _derive(self, name: str, col: np.ndarray) -> None:
+        self.entities.set_derived(name, col)
+        for k, kernel in enumerate(self.kernels):
+            own = kernel.world.entities
+            own.set_derived(name, col[k * self.stride:k * self.stride + len(own)])
+
+    def _sample_fields(self) -> None:
+        # Kernel._sample_fields for every world in one gather
+        first = self.kernels[0]
+        names = first.sample_names
+        if not names:
+            return
+        store = self.entities
+        world = first.world
+        idx = store.alive_indices()
+        channels = [n for n in names if n in world.channels]
+        vals = gather_channels(
+            self.backend, self.fields, [world.channels.index(n) for n in channels],
+            store.x[idx], store.y[idx], first.cfg.bilinear_fields, worlds=idx // self.stride,
+        )
+        for k, name in enumerate(channels):
+            col = np.zeros(len(store))
+            col[idx] = vals[k]
+            self._derive(name, col)
+        if "latitude" in names:
+            self._derive("latitude", store.y / max(1.0, float(world.h)))
+        if self._row_laws:
+            for kernel in self.kernels:
+                own = kernel.world.entities
+                kernel._sample_rows = {n: own.column(n).tolist() for n in names}
+
+    def _run_laws(self, base_env: Dict[str, Any]) -> None:
+        # Kernel._run_vectorized, law-major, with each vector law run once over every world
+        store = self.entities
+        draws = self.draws
+        ctx = NeighborContext(self.spatial, self.selectors)
+        for i, vlaw in enumerate(self.kernels[0].vector_laws):
+            if vlaw is None:
+                for kernel in self.kernels:
+                    with rng_stream(kernel.rng):
+                        kernel._run_law_rows(kernel.laws[i], kernel.law_fns[i], base_env)
+                continue
+            with rng_stream(draws):
+                alive = store.alive_indices()
+                draws.rows(alive)
+                sel = vlaw.mask(store, alive, base_env)
+                if sel.size == 0:
+                    continue
+                draws.rows(sel)
+                for act in vlaw.actions:
+                    act(store, sel, base_env, ctx)
+
+    def _integrate(self, step_dt: float) -> None:
+        # World.step_integrate for every world at once
+        world = self.kernels[0].world
+        for kernel in self.kernels:
+            kernel.world.time += step_dt
+        integrate_fields(self.fields, world.channels, self._decay, self._scratch, world.season_level(), world.rain_level())
+        for kernel in self.kernels:
+            kernel.world.touch_fields(*kernel.world._stepped)
+
+        ents = self.entities
+        idx = ents.alive_indices()
+        if idx.size == 0:
+            return
+        ents.x[idx] += ents.vx[idx] * step_dt
+        ents.y[idx] += ents.vy[idx] * step_dt
+        ents.z[idx] += ents.vz[idx] * step_dt
+        ents.age[idx] += step_dt
+        ents.seen[idx] = np.maximum(0.0, ents.seen[idx] - 0.01)
+        ents.touch("x", "y", "z", "age", "seen", "sound")
+
+        b = self.backend
+        iy, ix = world.cell_index(ents.x[idx], ents.y[idx])
+        at = (b.asarray(idx // self.stride), b.asarray(iy), b.asarray(ix))
+        ents.sound[idx] = b.asnumpy(self.fields[world.channels.index("sound")][at])
+        b.scatter_add(self.fields[world.channels.index("trail")], at, 0.35)
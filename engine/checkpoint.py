@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+import numpy as np
+
+from .backend import Backend, get_backend
+from .fields import BUILTIN_CHANNELS
+from .laws import Action, Law
+from .model import ENTITY_COLUMNS, EntityStore, World
+from .safeexpr import CompiledExpr, compile_expr
+
+if TYPE_CHECKING:
+    from .kernel import Kernel
+
+# Checkpoint file ("MYCK"), little-endian:
+#   magic 4s, version u32, meta_offset u64, meta_len u64, then padding to 64 bytes
+#   arrays, each starting on a 64-byte boundary, raw C order
+#   meta JSON (utf-8) at meta_offset: world scalars, channel specs, consts,
+#   laws (as expression source), tick count, RNG state, and {name: [offset, dtype, shape]}
+# Arrays are written before the meta so a reader can map them in place.
+
+MAGIC = b"MYCK"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQ")
+ALIGN = 64
+
+_WORLD_SCALARS = ("w", "h", "dt", "time", "day_cycle", "weather_cycle", "season_cycle", "wind_x", "wind_y")
+
+
+def _expr_src(expr: CompiledExpr | None) -> str | None:
+    return None if expr is None else expr.src
+
+
+def _law_spec(law: Law) -> Dict[str, Any]:
+    return {
+        "name": law.name,
+        "priority": law.priority,
+        "when": law.when.src,
+        "actions": [
+            {
+                "kind": a.kind,
+                "name": a.name,
+                "op": a.op,
+                "expr": _expr_src(a.expr),
+                "args": None if a.args is None else [arg.src for arg in a.args],
+            }
+            for a in law.actions
+        ],
+    }
+
+
+def _law_from_spec(spec: Dict[str, Any]) -> Law:
+    actions = [
+        Action(
+            kind=a["kind"],
+            name=a["name"],
+            op=a["op"],
+            expr=None if a["expr"] is None else compile_expr(a["expr"]),
+            args=None if a["args"] is None else [compile_expr(src) for src in a["args"]],
+        )
+        for a in spec["actions"]
+    ]
+    return Law(name=spec["name"], priority=spec["priority"], when=compile_expr(spec["when"]), actions=actions)
+
+
+def write_checkpoint(kernel: "Kernel", path: str | os.PathLike) -> Path:
+    """Write the kernel's full state to ``path`` (atomically, via a temp file)."""
+    world = kernel.world
+    store = world.entities
+    n = len(store)
+    arrays: List[Tuple[str, np.ndarray]] = [(name, store.column(name)) for name in ENTITY_COLUMNS]
+    arrays.append(("fields", np.ascontiguousarray(world.backend.asnumpy(world.fields))))
+    version, internal, gauss = kernel.rng.getstate()
+    meta: Dict[str, Any] = {
+        "world": {name: getattr(world, name) for name in _WORLD_SCALARS},
+        "channels": [
+            {"name": ch.name, "decay": ch.decay, "diffuse": ch.diffuse}
+            for ch in world.channels.channels[len(BUILTIN_CHANNELS):]
+        ],
+        "field_versions": world.field_versions,
+        "entities": n,
+        "colors": list(store.colors),
+        "consts": {name: expr.src for name, expr in kernel.consts_expr.items()},
+        "vectorize": kernel._vectorize_override,
+        "laws": [_law_spec(law) for law in kernel.laws],
+        "ticks": kernel.ticks,
+        "rng": [version, list(internal), gauss],
+        "arrays": {},
+    }
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(b"\0" * ALIGN)
+        for name, values in arrays:
+            offset = f.tell()
+            values = np.ascontiguousarray(values)
+            meta["arrays"][name] = [offset, values.dtype.str, list(values.shape)]
+            f.write(memoryview(values).cast("B"))
+            f.write(b"\0" * (-f.tell() % ALIGN))
+        meta_offset = f.tell()
+        blob = json.dumps(meta).encode("utf-8")
+        f.write(blob)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, meta_offset, len(blob)))
+    os.replace(tmp, path)
+    return path
+
+
+def read_checkpoint(path: str | os.PathLike, backend: Backend | None = None) -> "Kernel":
+    """Rebuild a Kernel from a checkpoint, including its tick count and RNG stream.
+
+    On the CPU backend the field tensor is a copy-on-write mapping of the
+    file: pages load as the simulation first touches them and writes never
+    reach the file, so restoring a large map costs little more than the
+    entity columns.
+    """
+    from .kernel import Kernel
+
+    backend = backend or get_backend(False)
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    magic, version, meta_offset, meta_len = HEADER.unpack_from(mm, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a world checkpoint")
+    if version != VERSION:
+        raise ValueError(f"unsupported checkpoint version {version}")
+    meta = json.loads(mm[meta_offset:meta_offset + meta_len].decode("utf-8"))
+
+    def array(name: str) -> np.ndarray:
+        offset, dtype, shape = meta["arrays"][name]
+        count = int(np.prod(shape)) if shape else 1
+        return np.frombuffer(mm, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+    store = EntityStore.from_columns({name: array(name) for name in ENTITY_COLUMNS}, meta["colors"])
+    scalars = meta["world"]
+    fields = array("fields")
+    # The tensor keeps the shape it was seeded with even if consts later changed w/h
+    world = World(
+        w=fields.shape[2],
+        h=fields.shape[1],
+        dt=scalars["dt"],
+        entities=store,
+        backend=backend,
+        extra_channels=meta["channels"],
+    )
+    for name in _WORLD_SCALARS:
+        setattr(world, name, scalars[name])
+    if fields.shape != tuple(world.fields.shape):
+        raise ValueError(f"checkpoint fields {fields.shape} do not match the world {tuple(world.fields.shape)}")
+    world.fields = fields if backend.xp is np else backend.asarray(fields)
+    world.field_versions.update(meta["field_versions"])
+
+    consts = {name: compile_expr(src) for name, src in meta["consts"].items()}
+    laws = [_law_from_spec(spec) for spec in meta["laws"]]
+    kernel = Kernel(world, consts, laws, vectorize=meta["vectorize"])
+    # Consts may re-apply W/H/DT while compiling; the saved values win
+    for name in _WORLD_SCALARS:
+        setattr(world, name, scalars[name])
+    version, internal, gauss = meta["rng"]
+    kernel.rng.setstate((version, tuple(internal), gauss))
+    kernel.ticks = meta["ticks"]
+    return kernel
@@ -1,10 +1,12 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional, Set, Tuple
 import ast
+import math
 from lark import Lark, Transformer
 from .laws import Law, Action
-from .safeexpr import compile_expr, compile_ast_node
+from .model import ENV_FIELDS, WRITABLE_FIELDS
+from .safeexpr import CompiledExpr, compile_expr, compile_ast_node, SAFE_FUNCS, _SAFE_IMPL
 
 GRAMMAR_PATH = __file__.replace("compiler.py", "grammar.lark")
 
@@ -14,6 +16,30 @@ def _load_grammar() -> str:
 
 _PARSER = Lark(_load_grammar(), parser="lalr", propagate_positions=True)
 
+def _split_actions(line: str) -> List[str]:
+    # ';' separates actions at top level; inside a call it separates arguments
+    actions, buf = [], []
+    depth, quote = 0, None
+    for ch in line:
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth = max(0, depth - 1)
+        elif ch == ";":
+            if depth == 0:
+                actions.append("".join(buf))
+                buf = []
+                continue
+            ch = ","
+        buf.append(ch)
+    actions.append("".join(buf))
+    return [a.strip() for a in actions if a.strip()]
+
 class _AST(Transformer):
     def start(self, items):
         consts = {}
@@ -33,15 +59,12 @@ class _AST(Transformer):
             name=str(items[0]),
             priority=int(float(str(items[1]))),
             when=compile_expr(str(items[2])),
-            actions=items[3] # action_block returns list
+            actions=[a for block in items[3:] for a in block] # one list per do-line
         )
 
     def action_block(self, items):
-        # Items is a list of raw_action strings
-        actions = []
-        for raw in items:
-            actions.append(self._parse_action(str(raw)))
-        return actions
+        # A do-line holds one or more actions separated by top-level ';'
+        return [self._parse_action(raw) for raw in _split_actions(str(items[0]))]
 
     def _parse_action(self, raw: str) -> Action:
         raw = raw.strip()
@@ -68,14 +91,11 @@ class _AST(Transformer):
             compiled_args = []
             for arg in call_node.args:
                 # We wrap the arg node back into an Expression to compile it
-                compiled_args.append(compile_ast_node(arg))
+                compiled_args.append(compile_ast_node(arg, ast.unparse(arg)))
             return Action(kind="call", name=func_name, args=compiled_args)
         
         raise ValueError(f"Action must be assignment or function call: {raw}")
 
-    def raw_action(self, items):
-        return str(items[0])
-        
     def NAME(self, t): return str(t)
 
 @dataclass
@@ -87,3 +107,253 @@ def compile_program(src: str) -> CompiledProgram:
     tree = _PARSER.parse(src + "\n")
     ast_res = _AST().transform(tree)
     return CompiledProgram(consts=ast_res["consts"], laws=ast_res["laws"])
+
+
+# ---------------------------------------------------------------------------
+# Expression specialization: inline consts, fold constant sub-expressions and
+# classify what is left as tick-uniform or per-entity.
+# ---------------------------------------------------------------------------
+
+# Names that are the same for every entity within a substep (World.uniform_env()).
+TICK_UNIFORMS = ("season", "rain")
+
+CONST, UNIFORM, ENTITY = 0, 1, 2
+
+_LITERAL_NAMES = {"true": True, "false": False, "True": True, "False": False}
+# Functions whose result depends only on their arguments
+_PURE_FUNCS = SAFE_FUNCS - {"rand", "randint"}
+
+
+class _Uncompilable(Exception):
+    pass
+
+
+def _literal(value: Any) -> Optional[ast.AST]:
+    if isinstance(value, (bool, str)) or value is None:
+        return ast.Constant(value)
+    if isinstance(value, (int, float)) and math.isfinite(value):
+        if value < 0 or (value == 0 and math.copysign(1.0, value) < 0):
+            # Keep the sign outside the literal so unparse parenthesizes it
+            return ast.UnaryOp(ast.USub(), ast.Constant(-value))
+        return ast.Constant(value)
+    return None
+
+
+class _Specializer:
+    def __init__(self, consts: Dict[str, Any], uniforms=TICK_UNIFORMS, samples=()):
+        self.consts = consts
+        self.uniforms = set(uniforms)
+        # Per-entity field samples (terrain, water ...) readable like entity fields
+        self.samples = set(samples)
+        self.used_samples: set[str] = set()
+        self.scope: Dict[str, Any] = {"__builtins__": {}}
+        self.scope.update(_SAFE_IMPL)
+        self.scope.update(consts)
+        self.kinds: Dict[int, int] = {}
+
+    def _mark(self, node: ast.AST, kind: int):
+        self.kinds[id(node)] = kind
+        return node, kind
+
+    def _fold(self, node: ast.AST, src: ast.AST):
+        try:
+            value = eval(compile(ast.fix_missing_locations(ast.Expression(node)), "<fold>", "eval"), self.scope)
+        except Exception:
+            return self._mark(node, CONST)
+        lit = _literal(value)
+        if lit is None:
+            return self._mark(node, CONST)
+        return self._mark(ast.copy_location(lit, src), CONST)
+
+    def visit(self, node: ast.AST):
+        if isinstance(node, ast.Constant):
+            return self._mark(node, CONST)
+        if isinstance(node, ast.Name):
+            name = node.id
+            if name in ENV_FIELDS:
+                return self._mark(node, ENTITY)
+            if name in self.samples:
+                self.used_samples.add(name)
+                return self._mark(node, ENTITY)
+            if name in self.uniforms:
+                return self._mark(node, UNIFORM)
+            if name in _LITERAL_NAMES:
+                return self._mark(ast.copy_location(ast.Constant(_LITERAL_NAMES[name]), node), CONST)
+            if name in self.consts:
+                lit = _literal(self.consts[name])
+                # Values with no literal form stay as names bound in the function globals
+                return self._mark(ast.copy_location(lit, node) if lit is not None else node, CONST)
+            raise _Uncompilable(f"unknown name: {name}")
+        if isinstance(node, ast.BinOp):
+            node.left, lk = self.visit(node.left)
+            node.right, rk = self.visit(node.right)
+            kind = max(lk, rk)
+            return self._fold(node, node) if kind == CONST else self._mark(node, kind)
+        if isinstance(node, ast.UnaryOp):
+            node.operand, kind = self.visit(node.operand)
+            if kind == CONST and not (isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant)):
+                return self._fold(node, node)
+            return self._mark(node, kind)
+        if isinstance(node, ast.Compare):
+            node.left, kind = self.visit(node.left)
+            comps = []
+            for c in node.comparators:
+                c, ck = self.visit(c)
+                comps.append(c)
+                kind = max(kind, ck)
+            node.comparators = comps
+            return self._fold(node, node) if kind == CONST else self._mark(node, kind)
+        if isinstance(node, ast.BoolOp):
+            return self._visit_boolop(node)
+        if isinstance(node, ast.Call):
+            args, kind = [], CONST
+            for a in node.args:
+                a, ak = self.visit(a)
+                args.append(a)
+                kind = max(kind, ak)
+            node.args = args
+            if node.func.id not in _PURE_FUNCS:
+                return self._mark(node, ENTITY)
+            return self._fold(node, node) if kind == CONST else self._mark(node, kind)
+        raise _Uncompilable(f"unsupported node: {type(node).__name__}")
+
+    def _visit_boolop(self, node: ast.BoolOp):
+        is_and = isinstance(node.op, ast.And)
+        values = []
+        for v in node.values:
+            v, k = self.visit(v)
+            if not values and isinstance(v, ast.Constant):
+                # Leading constant: `true and e` -> e, `false and e` -> false (mirrored for or)
+                if bool(v.value) != is_and:
+                    return self._mark(v, CONST)
+                last = v
+                continue
+            values.append((v, k))
+        if not values:
+            return self._mark(last, CONST)
+        if len(values) == 1:
+            return values[0]
+        node.values = [v for v, _ in values]
+        kind = max(k for _, k in values)
+        return self._fold(node, node) if kind == CONST else self._mark(node, kind)
+
+
+def specialize_expr(compiled: CompiledExpr, consts: Dict[str, Any], uniforms=TICK_UNIFORMS, samples=()):
+    """Inline consts and fold constant sub-expressions; returns (tree, kind, specializer)."""
+    tree = ast.parse(compiled.src or "False", mode="eval")
+    sp = _Specializer(consts, uniforms, samples)
+    body, kind = sp.visit(tree.body)
+    return body, kind, sp
+
+
+class _Hoist(ast.NodeTransformer):
+    # Replaces maximal tick-uniform sub-expressions with _h[i] slots
+    def __init__(self, kinds: Dict[int, int], hoisted: List[str]):
+        self.kinds = kinds
+        self.hoisted = hoisted
+
+    def visit(self, node):
+        if self.kinds.get(id(node)) == UNIFORM:
+            src = ast.unparse(node)
+            if src not in self.hoisted:
+                self.hoisted.append(src)
+            slot = ast.Subscript(ast.Name("_h", ast.Load()), ast.Constant(self.hoisted.index(src)), ast.Load())
+            return ast.copy_location(slot, node)
+        return self.generic_visit(node)
+
+
+# ---------------------------------------------------------------------------
+# Law code generation: one specialized Python function per law.
+#
+# `fn` takes the entity fields (ENV_FIELDS order) as locals, followed by the
+# entity handle, the kernel's call dispatcher, the hoisted values and the
+# field samples the law reads (LawFunction.samples order). It returns None
+# when `when` is false, else a dict of the fields it changed.
+# `prepare` runs once per substep with the TICK_UNIFORMS values: it returns
+# None when the law is off for every entity, else the hoisted values.
+# ---------------------------------------------------------------------------
+
+_CALL_ARGS = "_e, _call, _h"
+
+
+@dataclass
+class LawFunction:
+    law: Law
+    source: str
+    fn: Callable[..., Optional[Dict[str, Any]]]
+    prepare: Callable[..., Optional[List[Any]]]
+    samples: Tuple[str, ...] = ()
+
+
+def law_names(law: Law) -> Set[str]:
+    """Every name a law's condition, assignments and call arguments mention."""
+    names: Set[str] = set()
+    exprs = [law.when] + [a.expr for a in law.actions if a.kind == "assign"]
+    exprs += [x for a in law.actions if a.kind != "assign" for x in a.args or []]
+    for compiled in exprs:
+        try:
+            tree = ast.parse(compiled.src or "", mode="eval")
+        except SyntaxError:
+            continue
+        names.update(n.id for n in ast.walk(tree) if isinstance(n, ast.Name))
+    return names
+
+
+def compile_law_function(law: Law, consts: Dict[str, Any], samples=()) -> Optional[LawFunction]:
+    """Generate a Python function for one law, or None if it must stay on eval_expr."""
+    glb: Dict[str, Any] = {"__builtins__": {}}
+    glb.update(_SAFE_IMPL)
+    glb.update(consts)
+    hoisted: List[str] = []
+    base = "".join(ch if ch.isalnum() else "_" for ch in law.name)
+
+    used = sorted(law_names(law) & set(samples))
+
+    def expr(compiled: CompiledExpr) -> str:
+        body, kind, sp = specialize_expr(compiled, consts, samples=used)
+        return "(" + ast.unparse(_Hoist(sp.kinds, hoisted).visit(body)) + ")"
+
+    lines = [f"def law_{base}({', '.join(list(ENV_FIELDS) + [_CALL_ARGS] + used)}):"]
+    guard = "True"
+    writes: List[str] = []
+    try:
+        when, kind, sp = specialize_expr(law.when, consts, samples=used)
+        if kind == UNIFORM:
+            guard = ast.unparse(when)
+        elif isinstance(when, ast.Constant):
+            guard = "True" if when.value else "False"
+        else:
+            lines += [f"    if not ({ast.unparse(_Hoist(sp.kinds, hoisted).visit(when))}):", "        return None"]
+        for i, a in enumerate(law.actions):
+            if a.kind == "assign":
+                if a.name not in WRITABLE_FIELDS:
+                    raise _Uncompilable(f"cannot assign {a.name}")
+                rhs = expr(a.expr)
+                if a.op == "=":
+                    lines.append(f"    {a.name} = {rhs}")
+                elif a.op == "/=":
+                    lines.append(f"    _v = {rhs}")
+                    lines.append(f"    {a.name} = {a.name} / _v if _v != 0 else {a.name}")
+                else:
+                    lines.append(f"    {a.name} = {a.name} {a.op[0]} {rhs}")
+                if a.name not in writes:
+                    writes.append(a.name)
+            else:
+                glb[f"_a{i}"] = a.args or []
+                avals = ", ".join(expr(x) for x in a.args or [])
+                env = ", ".join(f"{f!r}: {f}" for f in list(ENV_FIELDS) + used)
+                lines.append(f"    _env = {{{env}}}")
+                lines.append(f"    _call({a.name!r}, [{avals}], _a{i}, _env, _e)")
+                lines.append("    " + "; ".join(f"{f} = _env[{f!r}]" for f in ENV_FIELDS))
+                writes = list(WRITABLE_FIELDS)
+    except (_Uncompilable, SyntaxError):
+        return None
+    lines.append("    return {" + ", ".join(f"{f!r}: {f}" for f in writes) + "}")
+    lines.append(f"def prepare_{base}({', '.join(TICK_UNIFORMS)}):")
+    lines.append(f"    if not ({guard}):")
+    lines.append("        return None")
+    lines.append(f"    return [{', '.join(hoisted)}]")
+    source = "\n".join(lines) + "\n"
+    exec(compile(source, f"<law {law.name}>", "exec"), glb)
+    return LawFunction(law=law, source=source, fn=glb[f"law_{base}"], prepare=glb[f"prepare_{base}"],
+                       samples=tuple(used))
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import itertools
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+import numpy as np
+
+from .batch import WorldSpec, build_kernel
+from .compiler import CompiledProgram, compile_program
+from .kernel import Kernel
+
+
+def expand_grid(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Every combination of the values in ``grid``: ``{"G": [1, 2], "S": [3]}`` -> ``[{G: 1, S: 3}, {G: 2, S: 3}]``."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def summarize(kernel: Kernel) -> Dict[str, Any]:
+    """Population statistics for a finished run (what tools/repro_report.py reports)."""
+    store = kernel.world.entities
+    rows = store.alive_indices()
+    count = len(rows)
+
+    def mean(values: np.ndarray) -> float:
+        return round(float(values.mean()), 4) if count else 0.0
+
+    return {
+        "t": float(kernel.world.time),
+        "alive": count,
+        "avg_energy": mean(store.energy[rows]),
+        "avg_wealth": mean(store.wealth[rows]),
+        "avg_speed": mean(np.hypot(store.vx[rows], store.vy[rows])),
+    }
+
+
+@dataclass
+class _Inputs:
+    """What every run of a sweep reads: the spec and its compiled program."""
+
+    spec: WorldSpec
+    program: CompiledProgram
+
+
+# Set in each pool worker by _init_worker
+_WORKER: _Inputs | None = None
+
+
+def _init_worker(spec: WorldSpec) -> None:
+    global _WORKER
+    # Compiled once per worker, not once per run
+    _WORKER = _Inputs(spec, compile_program(spec.dsl))
+
+
+def _run_variant(
+    inputs: _Inputs,
+    index: int,
+    consts: Dict[str, Any],
+    seed: int | None,
+    ticks: int,
+    n: int | None,
+    vectorize: bool | None,
+) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"run": index, "seed": inputs.spec.seed if seed is None else seed, "consts": consts}
+    try:
+        kernel = build_kernel(inputs.spec, seed=seed, n=n, consts=consts, vectorize=vectorize, program=inputs.program)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            kernel.tick(observer_xy=None)
+        elapsed = time.perf_counter() - start
+    except Exception as exc:
+        # One bad variant (a const that does not parse, a law that divides by zero) must not sink the sweep
+        result["error"] = f"{type(exc).__name__}: {exc}"
+        return result
+    result.update(
+        ticks=ticks,
+        elapsed_s=round(elapsed, 4),
+        ticks_per_s=round(ticks / elapsed, 2) if elapsed > 0 else None,
+        **summarize(kernel),
+    )
+    return result
+
+
+def _pool_run(*args: Any) -> Dict[str, Any]:
+    return _run_variant(_WORKER, *args)
+
+
+def sweep(
+    spec: WorldSpec,
+    variants: Iterable[Dict[str, Any]] = ({},),
+    seeds: Iterable[int | None] = (None,),
+    ticks: int = 1000,
+    workers: int | None = None,
+    n: int | None = None,
+    vectorize: bool | None = None,
+) -> Iterator[Dict[str, Any]]:
+    """Run every const override in ``variants`` with every seed, yielding summaries as runs finish.
+
+    Runs are numbered in ``variants`` x ``seeds`` order (``run`` in each
+    summary) and spread over ``workers`` processes (default: one per core;
+    1 runs them here, in order). The program is compiled once per worker.
+    A run that fails yields its ``error`` instead of statistics.
+    """
+    runs = [(consts, seed) for consts in variants for seed in seeds]
+    ticks = max(0, int(ticks))
+    workers = max(1, min(workers or os.cpu_count() or 1, len(runs) or 1))
+    if workers == 1:
+        inputs = _Inputs(spec, compile_program(spec.dsl))
+        for index, (consts, seed) in enumerate(runs):
+            yield _run_variant(inputs, index, consts, seed, ticks, n, vectorize)
+        return
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(spec,)) as pool:
+        pending: set[Future] = {
+            pool.submit(_pool_run, index, consts, seed, ticks, n, vectorize)
+            for index, (consts, seed) in enumerate(runs)
+        }
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    yield fut.result()
+        finally:
+            # The caller stopped early (or a worker died): drop what has not started
+            for fut in pending:
+                fut.cancel()
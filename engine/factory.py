@@ -18,9 +18,10 @@ def seed_world(
     seed: int = 42,
     backend: Backend | None = None,
     profiles: list[dict] | None = None,
+    channels: list | None = None,
 ) -> World:
     rng = random.Random(seed)
-    world = World(w=w, h=h, dt=1.0, entities=[], backend=backend or get_backend(False))
+    world = World(w=w, h=h, dt=1.0, entities=[], backend=backend or get_backend(False), extra_channels=channels)
 
     palette = ["red", "blue", "green", "metal", "gold", "gray"]
     if profiles:
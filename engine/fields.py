@@ -0,0 +1,177 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Tuple
+
+from .backend import Backend
+
+# Grid ops over the last two axes, so a single (H, W) field and a stacked
+# (F, H, W) tensor go through the same code. Edges wrap (toroidal), matching
+# backend.roll, but nothing here allocates once the scratch buffers exist.
+
+
+class FieldScratch:
+    """Preallocated work buffers, reused across substeps."""
+
+    def __init__(self, backend: Backend):
+        self.backend = backend
+        self._bufs: Dict[Tuple[Any, ...], Any] = {}
+
+    def get(self, shape, dtype, slot: int = 0):
+        key = (tuple(shape), dtype, slot)
+        buf = self._bufs.get(key)
+        if buf is None:
+            buf = self._bufs[key] = self.backend.zeros(shape, dtype=dtype)
+        return buf
+
+
+def _sl(axis: int, s: slice):
+    idx = [Ellipsis, slice(None), slice(None)]
+    idx[axis] = s
+    return tuple(idx)
+
+
+def roll_into(src, out, shift: int, axis: int):
+    """out = roll(src, shift, axis) for shift in (1, -1) and axis in (-2, -1); out must not alias src."""
+    if shift == 1:
+        out[_sl(axis, slice(1, None))] = src[_sl(axis, slice(None, -1))]
+        out[_sl(axis, slice(0, 1))] = src[_sl(axis, slice(-1, None))]
+    else:
+        out[_sl(axis, slice(None, -1))] = src[_sl(axis, slice(1, None))]
+        out[_sl(axis, slice(-1, None))] = src[_sl(axis, slice(0, 1))]
+    return out
+
+
+def add_rolled(acc, src, shift: int, axis: int) -> None:
+    """acc += roll(src, shift, axis), as two in-place slice adds."""
+    if shift == 1:
+        acc[_sl(axis, slice(1, None))] += src[_sl(axis, slice(None, -1))]
+        acc[_sl(axis, slice(0, 1))] += src[_sl(axis, slice(-1, None))]
+    else:
+        acc[_sl(axis, slice(None, -1))] += src[_sl(axis, slice(1, None))]
+        acc[_sl(axis, slice(-1, None))] += src[_sl(axis, slice(0, 1))]
+
+
+def diffuse(field, scratch: FieldScratch) -> None:
+    """In-place 5-point box blur with wraparound: (f + up + down + left + right) / 5.
+
+    Accumulates in the same order as the roll-based expression, so results are
+    bit-identical to it.
+    """
+    acc = scratch.get(field.shape, field.dtype)
+    acc[...] = field
+    add_rolled(acc, field, 1, -2)
+    add_rolled(acc, field, -1, -2)
+    add_rolled(acc, field, 1, -1)
+    add_rolled(acc, field, -1, -1)
+    scratch.backend.xp.divide(acc, 5.0, out=field)
+
+
+def flow_water(terrain, water, scratch: FieldScratch) -> None:
+    """Each cell sends 4% of its water to its lowest neighbor when that is downhill."""
+    t, w = terrain, water
+    xp = scratch.backend.xp
+    sc = scratch
+    neighbors = sc.get((4,) + t.shape, t.dtype, slot=3)
+    roll_into(t, neighbors[0], 1, -2)
+    roll_into(t, neighbors[1], -1, -2)
+    roll_into(t, neighbors[2], 1, -1)
+    roll_into(t, neighbors[3], -1, -1)
+    # Running argmin over the four neighbors (first wins on ties, like argmin)
+    min_idx = sc.get(t.shape, xp.int8)
+    min_idx[...] = 0
+    min_val = sc.get(t.shape, t.dtype, slot=4)
+    min_val[...] = neighbors[0]
+    lower = sc.get(t.shape, xp.bool_, slot=2)
+    for k in (1, 2, 3):
+        xp.less(neighbors[k], min_val, out=lower)
+        xp.copyto(min_val, neighbors[k], where=lower)
+        xp.copyto(min_idx, k, where=lower)
+    mask = xp.less(min_val, t, out=sc.get(t.shape, xp.bool_))
+    flow = xp.multiply(w, 0.04, out=sc.get(w.shape, w.dtype, slot=5))
+    moved = sc.get(w.shape, w.dtype, slot=6)
+    w -= xp.multiply(flow, mask, out=moved)
+    sel = sc.get(t.shape, xp.bool_, slot=1)
+    for k, (shift, axis) in enumerate(((-1, -2), (1, -2), (-1, -1), (1, -1))):
+        xp.equal(min_idx, k, out=sel)
+        sel &= mask
+        add_rolled(w, xp.multiply(flow, sel, out=moved), shift, axis)
+
+
+@dataclass(frozen=True)
+class FieldChannel:
+    name: str
+    decay: float = 1.0     # multiplied in every substep
+    diffuse: bool = False  # 5-point blur after the decay
+
+    @classmethod
+    def from_spec(cls, spec: Any) -> "FieldChannel":
+        # Worldpack form: "scent" or {"name": "scent", "decay": 0.9, "diffuse": true}
+        if isinstance(spec, str):
+            return cls(spec)
+        return cls(str(spec["name"]), float(spec.get("decay", 1.0)), bool(spec.get("diffuse", False)))
+
+
+# Built-in channels in tensor order; the diffusing ones come first so they form one slice.
+BUILTIN_CHANNELS: Tuple[FieldChannel, ...] = (
+    FieldChannel("sound", 0.92, True),
+    FieldChannel("food", 0.95, True),
+    FieldChannel("water", 0.985, True),
+    FieldChannel("paradox_heat", 0.96),
+    FieldChannel("trail", 0.92),
+    FieldChannel("terrain"),
+    FieldChannel("fertility"),
+    FieldChannel("climate"),
+    FieldChannel("road", 0.995),
+    FieldChannel("settlement", 0.997),
+    FieldChannel("home", 0.996),
+    FieldChannel("farm", 0.996),
+    FieldChannel("market", 0.996),
+)
+
+
+class FieldRegistry:
+    """Named channels of a world's (F, H, W) field tensor."""
+
+    def __init__(self, channels: Iterable[FieldChannel] = BUILTIN_CHANNELS):
+        self.channels: List[FieldChannel] = []
+        self._index: Dict[str, int] = {}
+        for ch in channels:
+            self.add(ch)
+
+    def add(self, channel: FieldChannel) -> int:
+        if channel.name in self._index:
+            raise ValueError(f"duplicate field channel: {channel.name}")
+        self._index[channel.name] = len(self.channels)
+        self.channels.append(channel)
+        return self._index[channel.name]
+
+    def __len__(self) -> int:
+        return len(self.channels)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def index(self, name: str) -> int:
+        try:
+            return self._index[name]
+        except KeyError:
+            raise KeyError(f"unknown field channel: {name}") from None
+
+    @property
+    def names(self) -> List[str]:
+        return [ch.name for ch in self.channels]
+
+    def decay_vector(self, xp, dtype):
+        return xp.asarray([ch.decay for ch in self.channels], dtype=dtype)
+
+    def diffusing_runs(self) -> List[slice]:
+        # Maximal runs of consecutive diffusing channels, each blurred as one stacked array
+        runs: List[slice] = []
+        start = None
+        for i, ch in enumerate(self.channels + [FieldChannel("", diffuse=False)]):
+            if ch.diffuse and start is None:
+                start = i
+            elif not ch.diffuse and start is not None:
+                runs.append(slice(start, i))
+                start = None
+        return runs
@@ -1,29 +1,72 @@
 from __future__ import annotations
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Dict, Any, List, Tuple
 import math
 import random
-from .model import World, Entity
+import numpy as np
+from .model import ENV_FIELDS, WRITABLE_FIELDS, World, EntityView
 from .laws import Law
-from .safeexpr import eval_expr
+from .compiler import TICK_UNIFORMS, LawFunction, compile_law_function, law_names
+from .safeexpr import eval_expr, rng_stream
 from .paradox import dynamic_instability_flags
+from .selectors import SelectorCache
+from .spatial import SpatialIndex
+from .vector import NeighborContext, VectorLaw, compile_vector_law
+
+_FIELD_INDEX = {f: i for i, f in enumerate(ENV_FIELDS)}
+_ALIVE = _FIELD_INDEX["alive"]
+_FIELD_CASTS = {f: float for f in ENV_FIELDS}
+_FIELD_CASTS.update({"alive": bool, "color": str})
 
 @dataclass
 class RuntimeConfig:
     max_speed: float = 4.0
     substeps: int = 1
+    vectorize: bool = False
+    bilinear_fields: bool = False
 
 class Kernel:
-    def __init__(self, world: World, consts: Dict[str, Any], laws: List[Law]):
+    def __init__(self, world: World, consts: Dict[str, Any], laws: List[Law], vectorize: bool | None = None,
+                 seed: int | None = None):
         self.world = world
+        # rand()/randint() in laws and consts draw from this stream, so a seeded kernel replays exactly
+        self.rng = random.Random(seed)
+        self.ticks = 0
         self.consts_expr = consts
         self.laws = sorted(laws, key=lambda l: l.priority, reverse=True)
         self.consts: Dict[str, Any] = {}
         self.cfg = RuntimeConfig()
-        # Optimization: Spatial Grid
-        self.grid: Dict[Tuple[int, int], List[Entity]] = {}
+        self._vectorize_override = vectorize
+        # Per-law column programs for vector mode (None -> scalar fallback)
+        self.vector_laws: List[VectorLaw | None] = []
+        # Per-law generated functions for the scalar path (None -> eval_expr)
+        self.law_fns: List[LawFunction | None] = []
+        self.sample_names: List[str] = []
+        # Field samples per entity index for the current substep, as Python lists
+        self._sample_rows: Dict[str, List[float]] = {}
+        # Names laws assign that are not entity fields, and their values per entity index for
+        # the current substep: one law's scratch value is visible to that entity's later laws
+        self.scratch_names: Tuple[str, ...] = ()
+        self._scratch: Dict[int, Dict[str, Any]] = {}
+        # Optimization: Spatial Grid (cell list rebuilt once per substep)
         self.grid_cell_size = 32
-        self._compile_consts()
+        self.spatial = SpatialIndex(self.grid_cell_size)
+        # Neighbor selector masks, rebuilt only when the columns they read change
+        self.selectors = SelectorCache()
+        with rng_stream(self.rng):
+            self._compile_consts()
+
+    def checkpoint(self, path) -> "Path":
+        """Save entity columns, fields, time, consts, laws and RNG state to one file (engine/checkpoint.py)."""
+        from .checkpoint import write_checkpoint
+        return write_checkpoint(self, path)
+
+    @classmethod
+    def restore(cls, path, backend=None) -> "Kernel":
+        """Kernel rebuilt from a checkpoint file, resuming exactly where it was saved."""
+        from .checkpoint import read_checkpoint
+        return read_checkpoint(path, backend)
 
     def _compile_consts(self):
         env = {"true": True, "false": False}
@@ -33,10 +76,25 @@ class Kernel:
         
         self.cfg.max_speed = float(self.consts.get("MAX_SPEED", 4.0))
         self.cfg.substeps = max(1, int(float(self.consts.get("SUBSTEPS", 1))))
+        if self._vectorize_override is not None:
+            self.cfg.vectorize = bool(self._vectorize_override)
+        else:
+            self.cfg.vectorize = bool(self.consts.get("VECTORIZE", False))
+        self.cfg.bilinear_fields = bool(self.consts.get("BILINEAR_FIELDS", False))
+        # Field channels the laws read by name, sampled once per substep for all entities
+        read = set().union(*(law_names(law) for law in self.laws))
+        self.sample_names = [n for n in self.world.sample_names() if n in read]
+        self.scratch_names = tuple(sorted({
+            a.name for law in self.laws for a in law.actions if a.kind == "assign" and a.name not in WRITABLE_FIELDS
+        }))
+        self.vector_laws = [compile_vector_law(law, self.consts, self.sample_names) for law in self.laws]
+        self.law_fns = [compile_law_function(law, self.consts, self.sample_names) for law in self.laws]
         
         for k in ["W", "H"]: 
             if k in self.consts: setattr(self.world, k.lower(), int(float(self.consts[k])))
         if "DT" in self.consts: self.world.dt = float(self.consts["DT"])
+        for k in ["DAY_CYCLE", "WEATHER_CYCLE", "SEASON_CYCLE", "WIND_X", "WIND_Y"]:
+            if k in self.consts: setattr(self.world, k.lower(), float(self.consts[k]))
         
         # Initialize fields if needed (omitted for brevity, handled by world usually or previous init)
         # Using existing field logic...
@@ -50,26 +108,19 @@ class Kernel:
         pass
 
     def _build_grid(self):
-        self.grid.clear()
-        cs = self.grid_cell_size
-        for e in self.world.entities:
-            if not e.alive: continue
-            k = (int(e.x // cs), int(e.y // cs))
-            if k not in self.grid: self.grid[k] = []
-            self.grid[k].append(e)
-
-    def _get_neighbors(self, x: float, y: float, radius: float) -> List[Entity]:
-        cs = self.grid_cell_size
-        cx, cy = int(x // cs), int(y // cs)
-        r_cells = int(math.ceil(radius / cs))
-        neighbors = []
-        for dy in range(-r_cells, r_cells + 1):
-            for dx in range(-r_cells, r_cells + 1):
-                cell = self.grid.get((cx + dx, cy + dy))
-                if cell: neighbors.extend(cell)
-        return neighbors
+        store = self.world.entities
+        self.spatial.build(store.x, store.y, store.alive_indices())
+
+    def _get_neighbors(self, x: float, y: float, radius: float) -> np.ndarray:
+        # Candidate entity indices from the cells around (x, y); callers filter by distance
+        return self.spatial.candidates(x, y, radius)
 
     def tick(self, observer_xy: Tuple[int,int] | None = None, observer_radius: int = 55):
+        with rng_stream(self.rng):
+            self._tick(observer_xy, observer_radius)
+        self.ticks += 1
+
+    def _tick(self, observer_xy: Tuple[int,int] | None, observer_radius: int):
         # 1. Update visibility
         if observer_xy:
             ox, oy = observer_xy
@@ -81,48 +132,129 @@ class Kernel:
         substeps = max(1, self.cfg.substeps)
         step_dt = self.world.dt / substeps
         
-        base_env = {"true": True, "false": False}
-        base_env.update(self.consts)
-
         for _ in range(substeps):
             self._build_grid() # O(N)
-            
-            for e in self.world.entities:
-                if not e.alive: continue
-                
-                # Shallow copy is faster than update for every entity
-                env = base_env.copy()
-                # Inject entity props
-                env.update(e.as_env()) 
-                # ... (Field sampling would go here)
-                
-                for law in self.laws:
-                    if not e.alive: break
-                    if not eval_expr(law.when, env): continue
-                    
-                    for a in law.actions:
-                        if a.kind == "assign":
-                            val = eval_expr(a.expr, env)
-                            curr = env.get(a.name, 0.0)
-                            if a.op == "=": env[a.name] = val
-                            elif a.op == "+=": env[a.name] = curr + val
-                            elif a.op == "-=": env[a.name] = curr - val
-                            elif a.op == "*=": env[a.name] = curr * val
-                            elif a.op == "/=": env[a.name] = curr / val if val != 0 else curr
-                        else:
-                            self._call(a.name, a.args, env, e)
-                    
-                    e.apply_env(env)
-            
+            self._sample_fields()
+            # Tick-uniform inputs (season, rain) are computed once per substep
+            uniforms = self.world.uniform_env()
+            base_env = {"true": True, "false": False}
+            base_env.update(self.consts)
+            base_env.update(uniforms)
+            self.selectors.begin_substep(self.world.entities, base_env, self.sample_names)
+            self._scratch.clear()
+            if self.cfg.vectorize:
+                self._run_vectorized(base_env)
+            else:
+                self._run_scalar(base_env, self._prepare_laws(uniforms))
             self.world.step_integrate(dt=step_dt)
             
         # Paradox/Heat update (simplified)
         pass
 
-    def _call(self, name: str, args, env: Dict[str, Any], e: Entity):
+    def _sample_fields(self):
+        # One gather per substep instead of a lookup per entity, law and field
+        if not self.sample_names:
+            return
+        store = self.world.entities
+        self.world.sample_entities(self.sample_names, self.cfg.bilinear_fields)
+        self._sample_rows = {n: store.column(n).tolist() for n in self.sample_names}
+
+    def _prepare_laws(self, uniforms: Dict[str, float]) -> List[Tuple[Law, LawFunction | None, List[Any] | None]]:
+        # Drops laws whose condition is false for everyone this substep and
+        # evaluates their hoisted tick-uniform sub-expressions once.
+        uvals = [uniforms[k] for k in TICK_UNIFORMS]
+        active = []
+        for law, lf in zip(self.laws, self.law_fns):
+            if lf is None:
+                active.append((law, None, None))
+                continue
+            hoisted = lf.prepare(*uvals)
+            if hoisted is not None:
+                active.append((law, lf, hoisted))
+        return active
+
+    def _run_scalar(self, base_env: Dict[str, Any], active):
+        store = self.world.entities
+        rows = store.rows()
+        for i in store.alive_indices().tolist():
+            e = store[i]
+            row = rows[i]
+            for law, lf, hoisted in active:
+                if not row[_ALIVE]: break
+                self._run_law_on(law, lf, hoisted, base_env, e, row)
+
+    def _run_vectorized(self, base_env: Dict[str, Any]):
+        # Law-major: each law runs over all entities before the next one
+        store = self.world.entities
+        for law, vlaw, lf in zip(self.laws, self.vector_laws, self.law_fns):
+            if vlaw is not None:
+                vlaw.apply(store, base_env, NeighborContext(self.spatial, self.selectors))
+            else:
+                self._run_law_rows(law, lf, base_env)
+
+    def _run_law_rows(self, law: Law, lf: LawFunction | None, base_env: Dict[str, Any]):
+        # A law with no column form, entity by entity over everyone alive
+        hoisted = None
+        if lf is not None:
+            hoisted = lf.prepare(*[base_env[k] for k in TICK_UNIFORMS])
+            if hoisted is None: return
+        store = self.world.entities
+        rows = store.rows()
+        for i in store.alive_indices().tolist():
+            self._run_law_on(law, lf, hoisted, base_env, store[i], rows[i])
+
+    def _run_law_on(self, law: Law, lf: LawFunction | None, hoisted: List[Any] | None,
+                    base_env: Dict[str, Any], e: EntityView, row: List[Any]):
+        # row mirrors e's fields in ENV_FIELDS order and is kept in sync with the store
+        if lf is None:
+            env = base_env.copy()
+            env.update(zip(ENV_FIELDS, row))
+            for n, col in self._sample_rows.items():
+                env[n] = col[e.index]
+            if self.scratch_names:
+                scratch = self._scratch.get(e.index)
+                if scratch:
+                    env.update(scratch)
+                self._apply_law(law, env, e)
+                self._scratch[e.index] = {n: env[n] for n in self.scratch_names if n in env}
+            else:
+                self._apply_law(law, env, e)
+            row[:] = [getattr(e, f) for f in ENV_FIELDS]
+            return
+        if lf.samples:
+            samples = self._sample_rows
+            changes = lf.fn(*row, e, self._call_values, hoisted, *[samples[n][e.index] for n in lf.samples])
+        else:
+            changes = lf.fn(*row, e, self._call_values, hoisted)
+        if changes:
+            for k, v in changes.items():
+                v = _FIELD_CASTS[k](v)
+                row[_FIELD_INDEX[k]] = v
+                setattr(e, k, v)
+
+    def _apply_law(self, law: Law, env: Dict[str, Any], e: EntityView):
+        if not eval_expr(law.when, env): return
+        
+        for a in law.actions:
+            if a.kind == "assign":
+                val = eval_expr(a.expr, env)
+                curr = env.get(a.name, 0.0)
+                if a.op == "=": env[a.name] = val
+                elif a.op == "+=": env[a.name] = curr + val
+                elif a.op == "-=": env[a.name] = curr - val
+                elif a.op == "*=": env[a.name] = curr * val
+                elif a.op == "/=": env[a.name] = curr / val if val != 0 else curr
+            else:
+                self._call(a.name, a.args, env, e)
+        
+        e.apply_env(env)
+
+    def _call(self, name: str, args, env: Dict[str, Any], e: EntityView):
         # Eval args
         avals = [eval_expr(x, env) for x in args]
-        
+        self._call_values(name, avals, args, env, e)
+
+    def _call_values(self, name: str, avals: List[Any], args, env: Dict[str, Any], e: EntityView):
         # ... (Most handlers same as before)
         
         # Optimizing spatial calls:
@@ -150,70 +282,52 @@ class Kernel:
             env["sound"] = env.get("sound", 0.0) + amt
             # (Field update omitted for brevity, assumes standard impl)
 
+    def _near(self, e, neighbors: np.ndarray, radius: float, selector=None):
+        # Alive neighbors other than e within radius that match the selector; returns (indices, dx, dy, d2)
+        store = self.world.entities
+        keep = (neighbors != e.index) & store.alive[neighbors]
+        if selector is not None:
+            keep &= self.selectors.mask(selector)[neighbors]
+        nb = neighbors[keep]
+        dx = store.x[nb] - e.x
+        dy = store.y[nb] - e.y
+        d2 = dx*dx + dy*dy
+        keep = d2 <= radius*radius
+        return nb[keep], dx[keep], dy[keep], d2[keep]
+
     def _boid_logic(self, env, e, neighbors, radius, strength, selector, mode):
-        r2 = radius*radius
-        ex, ey = e.x, e.y
-        count = 0
-        sx, sy = 0.0, 0.0
-        
-        for other in neighbors:
-            if other.id == e.id or not other.alive: continue
-            dx = other.x - ex
-            dy = other.y - ey
-            d2 = dx*dx + dy*dy
-            if d2 > r2: continue
-            
-            # Selector check? (Requires passing AST and evaling per neighbor - slow but supported)
-            
-            if mode == "cohere":
-                sx += other.x
-                sy += other.y
-                count += 1
-            elif mode == "align":
-                sx += other.vx
-                sy += other.vy
-                count += 1
-            elif mode == "separate":
-                if d2 < 0.001: d2 = 0.001
-                inv = 1.0 / math.sqrt(d2)
-                sx += -dx * inv
-                sy += -dy * inv
-                count += 1
-
-        if count > 0:
-            if mode == "cohere":
-                self._seek(env, e, sx/count, sy/count, strength)
-            elif mode == "align":
-                vx, vy = env.get("vx", e.vx), env.get("vy", e.vy)
-                env["vx"] = vx + ((sx/count) - e.vx) * strength
-                env["vy"] = vy + ((sy/count) - e.vy) * strength
-            elif mode == "separate":
-                env["vx"] = env.get("vx", e.vx) + sx * strength
-                env["vy"] = env.get("vy", e.vy) + sy * strength
+        nb, dx, dy, d2 = self._near(e, neighbors, radius, selector)
+        count = nb.size
+        if count == 0: return
+        store = self.world.entities
+        # sum() over lists accumulates left to right like the scalar loop did
+        if mode == "cohere":
+            sx, sy = sum(store.x[nb].tolist()), sum(store.y[nb].tolist())
+            self._seek(env, e, sx/count, sy/count, strength)
+        elif mode == "align":
+            sx, sy = sum(store.vx[nb].tolist()), sum(store.vy[nb].tolist())
+            vx, vy = env.get("vx", e.vx), env.get("vy", e.vy)
+            env["vx"] = vx + ((sx/count) - e.vx) * strength
+            env["vy"] = vy + ((sy/count) - e.vy) * strength
+        elif mode == "separate":
+            inv = 1.0 / np.sqrt(np.maximum(d2, 0.001))
+            sx, sy = sum((-dx * inv).tolist()), sum((-dy * inv).tolist())
+            env["vx"] = env.get("vx", e.vx) + sx * strength
+            env["vy"] = env.get("vy", e.vy) + sy * strength
 
     def _field_pull(self, env, e, neighbors, radius, strength, selector, mode):
-        r2 = radius*radius
-        ex, ey = e.x, e.y
         vx, vy = env.get("vx", e.vx), env.get("vy", e.vy)
         mass = env.get("mass", e.mass)
-        
-        for other in neighbors:
-            if other.id == e.id or not other.alive: continue
-            dx = other.x - ex
-            dy = other.y - ey
-            d2 = dx*dx + dy*dy
-            if d2 > r2 or d2 < 0.001: continue
-            
-            inv = 1.0 / (d2 + 8.0)
-            fx = dx * inv * strength
-            fy = dy * inv * strength
-            if mode == "repel": fx, fy = -fx, -fy
-            
-            vx += fx / max(0.1, mass)
-            vy += fy / max(0.1, mass)
-            
-        env["vx"] = vx
-        env["vy"] = vy
+        nb, dx, dy, d2 = self._near(e, neighbors, radius, selector)
+        keep = d2 >= 0.001
+        dx, dy, d2 = dx[keep], dy[keep], d2[keep]
+        inv = 1.0 / (d2 + 8.0)
+        fx = dx * inv * strength
+        fy = dy * inv * strength
+        if mode == "repel": fx, fy = -fx, -fy
+        m = max(0.1, mass)
+        env["vx"] = sum((fx / m).tolist(), vx)
+        env["vy"] = sum((fy / m).tolist(), vy)
 
     def _seek(self, env, e, tx, ty, strength):
         dx = tx - e.x
@@ -1,10 +1,23 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List
+
+import numpy as np
 
 from .backend import Backend, get_backend
+from .fields import BUILTIN_CHANNELS, FieldChannel, FieldRegistry, FieldScratch, diffuse, flow_water
 import math
 
+# Fields visible to law expressions (Entity.as_env order) and the subset apply_env writes back.
+ENV_FIELDS = (
+    "x", "y", "z", "vx", "vy", "vz", "mass", "hardness", "color",
+    "age", "seen", "alive", "sound", "energy", "wealth",
+)
+WRITABLE_FIELDS = (
+    "x", "y", "z", "vx", "vy", "vz", "mass", "hardness",
+    "seen", "alive", "sound", "energy", "wealth", "color",
+)
+
 @dataclass
 class Entity:
     id: int
@@ -51,155 +64,439 @@ class Entity:
         if "color" in env:
             self.color = str(env["color"])
 
+# Field channels laws read by name as per-entity samples (plus worldpack channels and latitude).
+SAMPLED_CHANNELS = (
+    "terrain", "water", "fertility", "climate", "road", "settlement", "home", "farm", "market",
+)
+
+# Column name -> dtype for the struct-of-arrays entity store.
+ENTITY_COLUMNS: Dict[str, Any] = {
+    "id": np.int64,
+    "x": np.float64,
+    "y": np.float64,
+    "z": np.float64,
+    "vx": np.float64,
+    "vy": np.float64,
+    "vz": np.float64,
+    "mass": np.float64,
+    "hardness": np.float64,
+    "age": np.float64,
+    "seen": np.float64,
+    "alive": np.bool_,
+    "sound": np.float64,
+    "energy": np.float64,
+    "wealth": np.float64,
+    "color_code": np.int32,
+}
+
+FLOAT_COLUMNS = tuple(k for k, v in ENTITY_COLUMNS.items() if v is np.float64)
+
+
+def _view_property(name: str, cast):
+    def fget(self):
+        return cast(self.store._cols[name][self.index])
+
+    def fset(self, value):
+        store = self.store
+        col = store._cols[name]
+        old = col[self.index]
+        col[self.index] = value
+        # Row-wise laws write back every field; only real changes invalidate cached selectors
+        if col[self.index] != old:
+            store.versions[name] += 1
+
+    return property(fget, fset)
+
+
+class EntityView:
+    """Entity-like handle onto one row of an EntityStore; reads and writes go to the columns."""
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, store: "EntityStore", index: int):
+        self.store = store
+        self.index = index
+
+    id = _view_property("id", int)
+    alive = _view_property("alive", bool)
+
+    @property
+    def color(self) -> str:
+        return self.store.colors[self.store._cols["color_code"][self.index]]
+
+    @color.setter
+    def color(self, value: str) -> None:
+        store = self.store
+        code = store.intern_color(value)
+        col = store._cols["color_code"]
+        if col[self.index] != code:
+            col[self.index] = code
+            store.versions["color_code"] += 1
+
+    as_env = Entity.as_env
+    apply_env = Entity.apply_env
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, EntityView) and other.store is self.store and other.index == self.index
+
+    def __hash__(self) -> int:
+        return hash((id(self.store), self.index))
+
+    def __repr__(self) -> str:
+        return f"EntityView(id={self.id}, x={self.x:.3f}, y={self.y:.3f}, color={self.color!r}, alive={self.alive})"
+
+
+for _name in FLOAT_COLUMNS:
+    setattr(EntityView, _name, _view_property(_name, float))
+
+
+def _column_property(name: str):
+    def fget(self):
+        return self._cols[name][: self._n]
+
+    def fset(self, value):
+        self._cols[name][: self._n] = value
+        self.versions[name] += 1
+
+    return property(fget, fset)
+
+
+class EntityStore:
+    """Struct-of-arrays entity storage: one contiguous NumPy column per attribute.
+
+    Column attributes (``store.x``, ``store.alive`` ...) are views of length
+    ``len(store)`` and stay valid until the next append grows the capacity.
+    Iterating yields :class:`EntityView` rows for code that needs per-object access.
+    ``versions`` counts writes per column; code that writes through the column
+    arrays directly calls :meth:`touch` so caches keyed on columns can tell.
+    """
+
+    def __init__(self, capacity: int = 16):
+        self._n = 0
+        self._cap = max(1, int(capacity))
+        self._cols: Dict[str, np.ndarray] = {
+            name: np.zeros(self._cap, dtype=dtype) for name, dtype in ENTITY_COLUMNS.items()
+        }
+        self.colors: List[str] = []
+        self._color_codes: Dict[str, int] = {}
+        self.versions: Dict[str, int] = dict.fromkeys(ENTITY_COLUMNS, 0)
+        # Read-only per-entity values recomputed by the kernel each substep (field samples)
+        self._derived: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_entities(cls, entities: Iterable[Any]) -> "EntityStore":
+        items = list(entities)
+        store = cls(capacity=len(items))
+        for e in items:
+            store.append(e)
+        return store
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray], colors: Iterable[str]) -> "EntityStore":
+        """Store over copies of saved columns (all of ENTITY_COLUMNS, equal lengths)."""
+        n = len(columns["id"])
+        store = cls(capacity=n)
+        for name, dtype in ENTITY_COLUMNS.items():
+            store._cols[name][:n] = np.asarray(columns[name], dtype=dtype)
+        for color in colors:
+            store.intern_color(color)
+        store._n = n
+        return store
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __iter__(self) -> Iterator[EntityView]:
+        for i in range(self._n):
+            yield EntityView(self, i)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [EntityView(self, i) for i in range(*key.indices(self._n))]
+        i = int(key)
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("entity index out of range")
+        return EntityView(self, i)
+
+    def column(self, name: str) -> np.ndarray:
+        col = self._cols.get(name)
+        if col is None:
+            return self._derived[name]
+        return col[: self._n]
+
+    def set_derived(self, name: str, values: np.ndarray) -> None:
+        if name in self._cols:
+            raise ValueError(f"{name} is a stored column")
+        self._derived[name] = values
+
+    def touch(self, *names: str) -> None:
+        versions = self.versions
+        for name in names or ENTITY_COLUMNS:
+            versions[name] += 1
+
+    def intern_color(self, color: str) -> int:
+        color = str(color)
+        code = self._color_codes.get(color)
+        if code is None:
+            code = len(self.colors)
+            self.colors.append(color)
+            self._color_codes[color] = code
+        return code
+
+    def color_names(self, codes: np.ndarray | None = None) -> List[str]:
+        codes = self.color_code if codes is None else codes
+        return [self.colors[c] for c in codes.tolist()]
+
+    def rows(self, names: Iterable[str] = ENV_FIELDS) -> List[List[Any]]:
+        cols = [
+            self.color_names() if name == "color" else self.column(name).tolist()
+            for name in names
+        ]
+        return [list(r) for r in zip(*cols)]
+
+    def alive_indices(self) -> np.ndarray:
+        return np.flatnonzero(self.alive)
+
+    def _reserve(self, n: int) -> None:
+        if n <= self._cap:
+            return
+        cap = max(n, self._cap * 2)
+        for name, arr in self._cols.items():
+            grown = np.zeros(cap, dtype=arr.dtype)
+            grown[: self._n] = arr[: self._n]
+            self._cols[name] = grown
+        self._cap = cap
+
+    def append(self, e: Any) -> EntityView:
+        self._reserve(self._n + 1)
+        i = self._n
+        cols = self._cols
+        for name in FLOAT_COLUMNS:
+            cols[name][i] = getattr(e, name)
+        cols["id"][i] = e.id
+        cols["alive"][i] = e.alive
+        cols["color_code"][i] = self.intern_color(e.color)
+        self._n += 1
+        self.touch()
+        return EntityView(self, i)
+
+
+for _name in ENTITY_COLUMNS:
+    setattr(EntityStore, _name, _column_property(_name))
+
+
+def gather_channels(backend: Backend, fields, sel: List[int], xs: np.ndarray, ys: np.ndarray,
+                    bilinear: bool = False, worlds: np.ndarray | None = None) -> np.ndarray:
+    """Channels ``sel`` of a field tensor at positions (xs, ys): float64 (len(sel), len(xs)).
+
+    ``fields`` is (F, H, W), or (F, K, H, W) for stacked worlds with
+    ``worlds`` giving each position's world.
+    """
+    b = backend
+    sel = b.asarray(np.asarray(sel, dtype=np.intp))
+    k = int(sel.shape[0])
+    h, w = fields.shape[-2:]
+    lead = () if worlds is None else (np.asarray(worlds, dtype=np.intp),)
+    if not bilinear:
+        ix = np.clip(np.rint(xs), 0, w - 1).astype(np.intp)
+        iy = np.clip(np.rint(ys), 0, h - 1).astype(np.intp)
+        vals = fields[(sel[:, None],) + tuple(b.asarray(a)[None, :] for a in lead + (iy, ix))]
+        return np.asarray(b.asnumpy(vals), dtype=np.float64).reshape(k, len(xs))
+    fx = np.clip(xs, 0, w - 1)
+    fy = np.clip(ys, 0, h - 1)
+    x0 = np.minimum(np.floor(fx).astype(np.intp), max(0, w - 2))
+    y0 = np.minimum(np.floor(fy).astype(np.intp), max(0, h - 2))
+    x1, y1 = np.minimum(x0 + 1, w - 1), np.minimum(y0 + 1, h - 1)
+    corners = tuple(np.broadcast_to(a, (4, len(xs))) for a in lead) + (np.stack([y0, y0, y1, y1]), np.stack([x0, x1, x0, x1]))
+    c = np.asarray(b.asnumpy(fields[(sel[:, None, None],) + tuple(b.asarray(a)[None] for a in corners)]), dtype=np.float64)
+    c = c.reshape(k, 4, len(xs))
+    tx, ty = fx - x0, fy - y0
+    top = c[:, 0] + (c[:, 1] - c[:, 0]) * tx
+    bottom = c[:, 2] + (c[:, 3] - c[:, 2]) * tx
+    return top + (bottom - top) * ty
+
+
+def integrate_fields(fields, channels: FieldRegistry, decay, scratch: FieldScratch, season: float, rain: float) -> None:
+    """One substep of decay, diffusion, growth and water flow, in place.
+
+    ``fields`` is (F, H, W), or (F, K, H, W) for stacked worlds, with
+    ``decay`` shaped to broadcast against it; every op is per cell, so a
+    stacked tensor steps exactly like its worlds would one by one.
+    """
+    # Per-channel decay in one broadcast multiply, then blur the diffusing channels
+    fields *= decay
+    for run in channels.diffusing_runs():
+        diffuse(fields[run], scratch)
+
+    backend = scratch.backend
+    xp = backend.xp
+    food, water = fields[channels.index("food")], fields[channels.index("water")]
+    fertility, climate = fields[channels.index("fertility")], fields[channels.index("climate")]
+    tmp = scratch.get(food.shape, food.dtype, slot=1)
+    food += xp.multiply(fertility, 0.012 + 0.02 * season, out=tmp)
+    backend.clip(food, 0.0, 2.0, out=food)
+
+    water += xp.multiply(climate, 0.004 + 0.012 * rain, out=tmp)
+    flow_water(fields[channels.index("terrain")], water, scratch)
+    backend.clip(water, 0.0, 2.0, out=water)
+    tmp2 = scratch.get(tmp.shape, tmp.dtype, slot=2)
+    xp.multiply(water, 0.01, out=tmp)
+    tmp -= xp.multiply(fertility, 0.004, out=tmp2)
+    fertility += tmp
+    backend.clip(fertility, 0.0, 1.5, out=fertility)
+
+
 @dataclass
 class World:
     w: int
     h: int
     dt: float
     time: float = 0.0
-    entities: List[Entity] = None
-    sound_field: Any = None
-    paradox_heat: Any = None
+    entities: EntityStore = None
     backend: Backend | None = None
-    trail_field: Any = None
-    food_field: Any = None
-    terrain_field: Any = None
-    water_field: Any = None
-    fertility_field: Any = None
-    climate_field: Any = None
-    road_field: Any = None
-    settlement_field: Any = None
-    home_field: Any = None
-    farm_field: Any = None
-    market_field: Any = None
     day_cycle: float = 0.0
     weather_cycle: float = 0.0
     season_cycle: float = 0.0
     wind_x: float = 0.0
     wind_y: float = 0.0
+    # Extra field channels beyond BUILTIN_CHANNELS (FieldChannel or worldpack specs)
+    extra_channels: List[Any] | None = None
 
     def __post_init__(self):
         if self.backend is None:
             self.backend = get_backend(False)
         if self.entities is None:
-            self.entities = []
-        if self.sound_field is None:
-            self.sound_field = self.backend.zeros((self.h, self.w), dtype=self.backend.xp.float32)
-        if self.paradox_heat is None:
-            self.paradox_heat = self.backend.zeros((self.h, self.w), dtype=self.backend.xp.float32)
-        if self.trail_field is None:
-            self.trail_field = self.backend.zeros((self.h, self.w), dtype=self.backend.xp.float32)
-        if self.food_field is None:
-            self.food_field = self.backend.zeros((self.h, self.w), dtype=self.backend.xp.float32)
-        if self.terrain_field is None:
-            self.terrain_field = self.backend.zeros((self.h, self.w), dtype=self.backend.xp.float32)
-        if self.water_field is None:
-            self.water_field = self.backend.zeros((self.h, self.w), dtype=self.backend.xp.float32)
-        if self.fertility_field is None:
-            self.fertility_field = self.backend.zeros((self.h, self.w), dtype=self.backend.xp.float32)
-        if self.climate_field is None:
-            self.climate_field = self.backend.zeros((self.h, self.w), dtype=self.backend.xp.float32)
-        if self.road_field is None:
-            self.road_field = self.backend.zeros((self.h, self.w), dtype=self.backend.xp.float32)
-        if self.settlement_field is None:
-            self.settlement_field = self.backend.zeros((self.h, self.w), dtype=self.backend.xp.float32)
-        if self.home_field is None:
-            self.home_field = self.backend.zeros((self.h, self.w), dtype=self.backend.xp.float32)
-        if self.farm_field is None:
-            self.farm_field = self.backend.zeros((self.h, self.w), dtype=self.backend.xp.float32)
-        if self.market_field is None:
-            self.market_field = self.backend.zeros((self.h, self.w), dtype=self.backend.xp.float32)
+            self.entities = EntityStore()
+        elif not isinstance(self.entities, EntityStore):
+            self.entities = EntityStore.from_entities(self.entities)
+        # Every scalar field is one channel of a single (F, H, W) float32 tensor;
+        # sound_field, food_field ... are views of their channel.
+        self.channels = FieldRegistry()
+        for spec in self.extra_channels or []:
+            self.channels.add(spec if isinstance(spec, FieldChannel) else FieldChannel.from_spec(spec))
+        xp = self.backend.xp
+        self.fields = self.backend.zeros((len(self.channels), self.h, self.w), dtype=xp.float32)
+        self._decay = self.channels.decay_vector(xp, xp.float32)[:, None, None]
+        self._scratch = FieldScratch(self.backend)
+        # Bumped whenever a channel may have changed; step_integrate covers the
+        # channels it decays, blurs or grows, so static ones (terrain, climate) stay put
+        self.field_versions: Dict[str, int] = {name: 0 for name in self.channels.names}
+        self._stepped = tuple(dict.fromkeys(
+            [ch.name for ch in self.channels.channels if ch.decay != 1.0 or ch.diffuse]
+            + ["food", "water", "fertility", "trail"]
+        ))
+
+    def field(self, name: str):
+        """View of one named channel of the field tensor; call touch_fields after writing through it."""
+        return self.fields[self.channels.index(name)]
+
+    def touch_fields(self, *names: str) -> None:
+        """Mark channels as changed (all of them when no names are given)."""
+        versions = self.field_versions
+        for name in names or tuple(versions):
+            versions[name] += 1
+
+    def sample_names(self) -> List[str]:
+        """Names laws can read as per-entity field samples."""
+        extra = self.channels.names[len(BUILTIN_CHANNELS):]
+        return list(SAMPLED_CHANNELS) + extra + ["latitude"]
+
+    def cell_index(self, xs: np.ndarray, ys: np.ndarray):
+        """Nearest grid cell (iy, ix) for positions, clamped to the field bounds."""
+        h, w = self.fields.shape[-2:]
+        ix = np.clip(np.rint(xs), 0, w - 1).astype(np.intp)
+        iy = np.clip(np.rint(ys), 0, h - 1).astype(np.intp)
+        return iy, ix
+
+    def sample_channels(self, names: Iterable[str], xs: np.ndarray, ys: np.ndarray,
+                        bilinear: bool = False) -> np.ndarray:
+        """Gather channels at many positions with one fancy index: returns float64 (len(names), len(xs))."""
+        sel = [self.channels.index(n) for n in names]
+        return gather_channels(self.backend, self.fields, sel, xs, ys, bilinear)
+
+    def sample_entities(self, names: Iterable[str], bilinear: bool = False) -> None:
+        """Store field samples at every live entity as derived columns of the entity store."""
+        names = list(names)
+        ents = self.entities
+        idx = ents.alive_indices()
+        xs, ys = ents.x[idx], ents.y[idx]
+        channels = [n for n in names if n in self.channels]
+        vals = self.sample_channels(channels, xs, ys, bilinear)
+        for k, name in enumerate(channels):
+            col = np.zeros(len(ents))
+            col[idx] = vals[k]
+            ents.set_derived(name, col)
+        if "latitude" in names:
+            ents.set_derived("latitude", ents.y / max(1.0, float(self.h)))
+
+    def season_level(self) -> float:
+        if self.season_cycle and self.season_cycle > 0:
+            return 0.5 + 0.5 * math.sin((self.time / self.season_cycle) * 2.0 * math.pi)
+        return 0.7
+
+    def rain_level(self) -> float:
+        if self.weather_cycle and self.weather_cycle > 0:
+            return 0.5 + 0.5 * math.sin((self.time / self.weather_cycle) * 2.0 * math.pi)
+        return 0.2
+
+    def uniform_env(self) -> Dict[str, float]:
+        # Values every entity sees identically within a substep
+        return {"season": self.season_level(), "rain": self.rain_level()}
 
     def step_integrate(self, dt: float | None = None):
         step_dt = self.dt if dt is None else float(dt)
         self.time += step_dt
 
-        self.sound_field *= 0.92
-        sf = self.sound_field
-        sf[:] = (
-            sf
-            + self.backend.roll(sf, 1, 0)
-            + self.backend.roll(sf, -1, 0)
-            + self.backend.roll(sf, 1, 1)
-            + self.backend.roll(sf, -1, 1)
-        ) / 5.0
-
-        self.food_field *= 0.95
-        ff = self.food_field
-        ff[:] = (
-            ff
-            + self.backend.roll(ff, 1, 0)
-            + self.backend.roll(ff, -1, 0)
-            + self.backend.roll(ff, 1, 1)
-            + self.backend.roll(ff, -1, 1)
-        ) / 5.0
-        if self.season_cycle and self.season_cycle > 0:
-            season = 0.5 + 0.5 * math.sin((self.time / self.season_cycle) * 2.0 * math.pi)
-        else:
-            season = 0.7
-        self.food_field += self.fertility_field * (0.012 + 0.02 * season)
-        self.food_field[:] = self.backend.clip(self.food_field, 0.0, 2.0)
-
-        self.water_field *= 0.985
-        wf = self.water_field
-        wf[:] = (
-            wf
-            + self.backend.roll(wf, 1, 0)
-            + self.backend.roll(wf, -1, 0)
-            + self.backend.roll(wf, 1, 1)
-            + self.backend.roll(wf, -1, 1)
-        ) / 5.0
-        if self.weather_cycle and self.weather_cycle > 0:
-            rain = 0.5 + 0.5 * math.sin((self.time / self.weather_cycle) * 2.0 * math.pi)
-        else:
-            rain = 0.2
-        self.water_field += self.climate_field * (0.004 + 0.012 * rain)
-        self._flow_water()
-        self.water_field[:] = self.backend.clip(self.water_field, 0.0, 2.0)
-        self.fertility_field += (self.water_field * 0.01) - (self.fertility_field * 0.004)
-        self.fertility_field[:] = self.backend.clip(self.fertility_field, 0.0, 1.5)
-        self.road_field *= 0.995
-        self.settlement_field *= 0.997
-        self.home_field *= 0.996
-        self.farm_field *= 0.996
-        self.market_field *= 0.996
-
-        self.paradox_heat *= 0.96
-        self.trail_field *= 0.92
-
-        for e in self.entities:
-            if not e.alive:
-                continue
-            e.x += e.vx * step_dt
-            e.y += e.vy * step_dt
-            e.z += e.vz * step_dt
-            e.age += step_dt
-            e.seen = max(0.0, e.seen - 0.01)
-
-            ix = int(max(0, min(self.w-1, round(e.x))))
-            iy = int(max(0, min(self.h-1, round(e.y))))
-            e.sound = float(self.backend.asnumpy(self.sound_field[iy, ix]))
-            self.trail_field[iy, ix] += 0.35
-
-    def _flow_water(self):
-        t = self.terrain_field
-        w = self.water_field
-        xp = self.backend.xp
-        t_up = self.backend.roll(t, 1, 0)
-        t_down = self.backend.roll(t, -1, 0)
-        t_left = self.backend.roll(t, 1, 1)
-        t_right = self.backend.roll(t, -1, 1)
-        neighbors = xp.stack([t_up, t_down, t_left, t_right], axis=0)
-        min_idx = xp.argmin(neighbors, axis=0)
-        min_val = xp.min(neighbors, axis=0)
-        mask = min_val < t
-        flow = w * 0.04
-        w[:] = w - flow * mask
-        flow_up = flow * ((min_idx == 0) & mask)
-        flow_down = flow * ((min_idx == 1) & mask)
-        flow_left = flow * ((min_idx == 2) & mask)
-        flow_right = flow * ((min_idx == 3) & mask)
-        w[:] = w + self.backend.roll(flow_up, -1, 0)
-        w[:] = w + self.backend.roll(flow_down, 1, 0)
-        w[:] = w + self.backend.roll(flow_left, -1, 1)
-        w[:] = w + self.backend.roll(flow_right, 1, 1)
+        integrate_fields(self.fields, self.channels, self._decay, self._scratch, self.season_level(), self.rain_level())
+        self.touch_fields(*self._stepped)
+
+        ents = self.entities
+        idx = ents.alive_indices()
+        if idx.size == 0:
+            return
+        ents.x[idx] += ents.vx[idx] * step_dt
+        ents.y[idx] += ents.vy[idx] * step_dt
+        ents.z[idx] += ents.vz[idx] * step_dt
+        ents.age[idx] += step_dt
+        ents.seen[idx] = np.maximum(0.0, ents.seen[idx] - 0.01)
+        ents.touch("x", "y", "z", "age", "seen", "sound")
+
+        iy, ix = self.cell_index(ents.x[idx], ents.y[idx])
+        iy, ix = self.backend.asarray(iy), self.backend.asarray(ix)
+        ents.sound[idx] = self.backend.asnumpy(self.sound_field[iy, ix])
+        self.backend.scatter_add(self.trail_field, (iy, ix), 0.35)
+
+
+# Attribute name -> channel for the built-in fields
+FIELD_ATTRS = {
+    "sound_field": "sound",
+    "paradox_heat": "paradox_heat",
+    "trail_field": "trail",
+    "food_field": "food",
+    "terrain_field": "terrain",
+    "water_field": "water",
+    "fertility_field": "fertility",
+    "climate_field": "climate",
+    "road_field": "road",
+    "settlement_field": "settlement",
+    "home_field": "home",
+    "farm_field": "farm",
+    "market_field": "market",
+}
+
+
+def _channel_property(name: str):
+    def fget(self):
+        return self.fields[self.channels.index(name)]
+
+    def fset(self, value):
+        self.fields[self.channels.index(name)] = value
+        self.touch_fields(name)
+
+    return property(fget, fset)
+
+
+for _attr, _channel in FIELD_ATTRS.items():
+    setattr(World, _attr, _channel_property(_channel))
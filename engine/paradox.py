@@ -138,17 +138,14 @@ def static_check(consts: Dict[str, Any], laws: List[Law]) -> ParadoxReport:
     return ParadoxReport(static_errors=errs, warnings=warns)
 
 def dynamic_instability_flags(world, max_speed: float) -> Tuple[float, float]:
-    speeds = []
-    sounds = []
-    for e in world.entities:
-        if not e.alive:
-            continue
-        speeds.append((e.vx*e.vx + e.vy*e.vy) ** 0.5)
-        sounds.append(e.sound)
-    if not speeds:
+    ents = world.entities
+    idx = ents.alive_indices()
+    if idx.size == 0:
         return (0.0, 0.0)
-    vmax = float(np.max(speeds))
-    smax = float(np.max(sounds)) if sounds else 0.0
+    vx = ents.vx[idx]
+    vy = ents.vy[idx]
+    vmax = float(np.max(np.sqrt(vx*vx + vy*vy)))
+    smax = float(np.max(ents.sound[idx]))
     speed_score = max(0.0, (vmax - max_speed) / max_speed)
     sound_score = max(0.0, (smax - 1.5) / 1.5)
     return (speed_score, sound_score)
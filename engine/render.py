@@ -24,6 +24,18 @@ COLOR_MAP = {
 def color_rgb(color: str) -> tuple[int, int, int]:
     return COLOR_MAP.get(color, (220, 220, 220))
 
+
+_DISK_MASKS: dict[int, np.ndarray] = {}
+
+
+def _disk_mask(r: int) -> np.ndarray:
+    mask = _DISK_MASKS.get(r)
+    if mask is None:
+        d = np.arange(-r, r + 1)
+        mask = (d[:, None] ** 2 + d[None, :] ** 2) <= r * r
+        _DISK_MASKS[r] = mask
+    return mask
+
 def render(
     world,
     show_sound: bool = True,
@@ -43,9 +55,12 @@ def render(
     h, w = world.h, world.w
     img = np.zeros((h, w, 3), dtype=np.uint8)
     backend = world.backend or get_backend(False)
+    # One transfer for every field layer
+    fields = backend.asnumpy(world.fields)
+    ch = world.channels.index
 
     if show_terrain:
-        t = backend.asnumpy(world.terrain_field)
+        t = fields[ch("terrain")]
         t = np.clip(t, 0.0, 1.0)
         base = np.zeros((h, w, 3), dtype=np.uint8)
         base[..., 1] = (60 + t * 120).astype(np.uint8)
@@ -54,84 +69,81 @@ def render(
         img = np.maximum(img, base)
 
     if show_sound:
-        s = backend.asnumpy(world.sound_field)
+        s = fields[ch("sound")]
         s = np.clip(s, 0.0, 2.0) / 2.0
         img[..., 2] = (s * 140).astype(np.uint8)
         img[..., 1] = (s * 40).astype(np.uint8)
 
     if show_food:
-        f = backend.asnumpy(world.food_field)
+        f = fields[ch("food")]
         f = np.clip(f, 0.0, 2.0) / 2.0
         img[..., 1] = np.maximum(img[..., 1], (f * 160).astype(np.uint8))
         img[..., 0] = np.maximum(img[..., 0], (f * 40).astype(np.uint8))
 
     if show_water:
-        wv = backend.asnumpy(world.water_field)
+        wv = fields[ch("water")]
         wv = np.clip(wv, 0.0, 2.0) / 2.0
         img[..., 2] = np.maximum(img[..., 2], (80 + wv * 160).astype(np.uint8))
 
     if show_fertility:
-        fz = backend.asnumpy(world.fertility_field)
+        fz = fields[ch("fertility")]
         fz = np.clip(fz, 0.0, 1.5) / 1.5
         img[..., 1] = np.maximum(img[..., 1], (60 + fz * 150).astype(np.uint8))
 
     if show_roads:
-        rd = backend.asnumpy(world.road_field)
+        rd = fields[ch("road")]
         rd = np.clip(rd, 0.0, 1.0)
         img[..., 0] = np.maximum(img[..., 0], (80 + rd * 160).astype(np.uint8))
         img[..., 2] = np.maximum(img[..., 2], (40 + rd * 80).astype(np.uint8))
 
     if show_settlements:
-        st = backend.asnumpy(world.settlement_field)
+        st = fields[ch("settlement")]
         st = np.clip(st, 0.0, 1.0)
         img[..., 0] = np.maximum(img[..., 0], (120 + st * 120).astype(np.uint8))
         img[..., 1] = np.maximum(img[..., 1], (80 + st * 120).astype(np.uint8))
 
     if show_homes:
-        hm = backend.asnumpy(world.home_field)
+        hm = fields[ch("home")]
         hm = np.clip(hm, 0.0, 1.0)
         img[..., 2] = np.maximum(img[..., 2], (100 + hm * 120).astype(np.uint8))
 
     if show_farms:
-        fm = backend.asnumpy(world.farm_field)
+        fm = fields[ch("farm")]
         fm = np.clip(fm, 0.0, 1.0)
         img[..., 1] = np.maximum(img[..., 1], (90 + fm * 140).astype(np.uint8))
 
     if show_markets:
-        mk = backend.asnumpy(world.market_field)
+        mk = fields[ch("market")]
         mk = np.clip(mk, 0.0, 1.0)
         img[..., 0] = np.maximum(img[..., 0], (130 + mk * 110).astype(np.uint8))
 
-    for e in world.entities:
-        if not e.alive:
-            continue
-        x = int(max(0, min(w-1, round(e.x))))
-        y = int(max(0, min(h-1, round(e.y))))
-        base = color_rgb(e.color)
-        img[y, x, :] = base
-
-        r = int(max(1, min(6, 1 + e.hardness * 0.6)))
-        for dy in range(-r, r+1):
-            yy = y + dy
-            if yy < 0 or yy >= h:
-                continue
-            for dx in range(-r, r+1):
-                xx = x + dx
-                if xx < 0 or xx >= w:
-                    continue
-                if dx*dx + dy*dy <= r*r:
-                    a = 0.20
-                    img[yy, xx, 0] = int(img[yy, xx, 0] * (1-a) + base[0] * a)
-                    img[yy, xx, 1] = int(img[yy, xx, 1] * (1-a) + base[1] * a)
-                    img[yy, xx, 2] = int(img[yy, xx, 2] * (1-a) + base[2] * a)
+    ents = world.entities
+    idx = ents.alive_indices()
+    if idx.size:
+        xs = np.clip(np.rint(ents.x[idx]), 0, w - 1).astype(np.intp)
+        ys = np.clip(np.rint(ents.y[idx]), 0, h - 1).astype(np.intp)
+        radii = np.clip(1 + ents.hardness[idx] * 0.6, 1, 6).astype(np.intp)
+        palette = [color_rgb(c) for c in ents.colors]
+        codes = ents.color_code[idx]
+        a = 0.20
+        # Halos overlap, so blend entity by entity to keep the painter's order.
+        for x, y, r, code in zip(xs.tolist(), ys.tolist(), radii.tolist(), codes.tolist()):
+            base = palette[code]
+            img[y, x, :] = base
+            y0, y1 = max(0, y - r), min(h, y + r + 1)
+            x0, x1 = max(0, x - r), min(w, x + r + 1)
+            disk = _disk_mask(r)[y0 - (y - r):y1 - (y - r), x0 - (x - r):x1 - (x - r)]
+            patch = img[y0:y1, x0:x1]
+            blended = (patch * (1 - a) + np.asarray(base, dtype=np.float64) * a).astype(np.uint8)
+            patch[disk] = blended[disk]
 
     if show_trails:
-        t = np.clip(backend.asnumpy(world.trail_field), 0.0, 2.0) / 2.0
+        t = np.clip(fields[ch("trail")], 0.0, 2.0) / 2.0
         img[..., 0] = np.maximum(img[..., 0], (t * 60).astype(np.uint8))
         img[..., 1] = np.maximum(img[..., 1], (t * 120).astype(np.uint8))
 
     if show_paradox:
-        p = np.clip(backend.asnumpy(world.paradox_heat), 0.0, 1.0)
+        p = np.clip(fields[ch("paradox_heat")], 0.0, 1.0)
         img[..., 0] = np.maximum(img[..., 0], (p * 255).astype(np.uint8))
         img[..., 1] = (img[..., 1] * (1.0 - 0.35*p)).astype(np.uint8)
         img[..., 2] = (img[..., 2] * (1.0 - 0.35*p)).astype(np.uint8)
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from .backend import Backend
+from .kernel import Kernel
+
+INPUTS_FILE = "inputs.jsonl"
+
+
+def _checkpoint_name(tick: int) -> str:
+    return f"tick-{tick:09d}.ckpt"
+
+
+class Recorder:
+    """Records a run so that any past tick can be rebuilt.
+
+    The kernel is checkpointed every ``every`` ticks and each external input
+    is appended to ``inputs.jsonl`` with the kernel tick it arrived at.
+    Observer changes are inputs to ``Kernel.tick``; everything else logged
+    (applies, run toggles, rate changes) is there to explain the run. Since
+    ``rand()`` draws from the kernel's own seeded stream, restoring the newest
+    checkpoint at or before a tick and re-running the logged inputs lands on
+    exactly the same state.
+
+    ``keep`` bounds the number of checkpoints on disk (0 keeps all); the
+    first one is never dropped so every logged tick stays reachable.
+    """
+
+    def __init__(self, kernel: Kernel, directory: str | Path, every: int = 300, keep: int = 0):
+        self.kernel = kernel
+        self.directory = Path(directory)
+        self.every = max(1, int(every))
+        self.keep = max(0, int(keep))
+        self.events: List[Dict[str, Any]] = []
+        self.checkpoints: Dict[int, Path] = {}
+        self._observer: Tuple[Any, int] = (None, 55)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path in self.directory.glob("tick-*.ckpt"):
+            path.unlink()
+        (self.directory / INPUTS_FILE).write_text("", encoding="utf-8")
+        self.checkpoint()
+
+    @classmethod
+    def open(cls, directory: str | Path, backend: Backend | None = None, every: int = 300) -> "Recorder":
+        """Load a recording from disk, positioned at its first checkpoint."""
+        self = cls.__new__(cls)
+        self.directory = Path(directory)
+        self.every, self.keep = max(1, int(every)), 0
+        text = (self.directory / INPUTS_FILE).read_text(encoding="utf-8")
+        self.events = [json.loads(line) for line in text.splitlines() if line.strip()]
+        self.checkpoints = {int(p.stem.split("-")[1]): p for p in self.directory.glob("tick-*.ckpt")}
+        if not self.checkpoints:
+            raise ValueError(f"no checkpoints in {directory}")
+        self.kernel = Kernel.restore(self.checkpoints[min(self.checkpoints)], backend)
+        self._observer = self._observer_at(self.kernel.ticks - 1)
+        return self
+
+    @property
+    def tick(self) -> int:
+        return self.kernel.ticks
+
+    def log(self, kind: str, **data: Any) -> None:
+        event = {"tick": self.kernel.ticks, "kind": kind, **data}
+        self.events.append(event)
+        with open(self.directory / INPUTS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+
+    def checkpoint(self) -> Path:
+        tick = self.kernel.ticks
+        path = self.kernel.checkpoint(self.directory / _checkpoint_name(tick))
+        self.checkpoints[tick] = path
+        if self.keep and len(self.checkpoints) > self.keep:
+            ticks = sorted(self.checkpoints)
+            for old in ticks[1:len(ticks) - self.keep + 1]:
+                self.checkpoints.pop(old).unlink(missing_ok=True)
+        return path
+
+    def step(self, observer_xy: Tuple[int, int] | None = None, observer_radius: int = 55) -> None:
+        """One recorded ``Kernel.tick``."""
+        observer = (list(observer_xy) if observer_xy is not None else None, int(observer_radius))
+        if observer != self._observer:
+            self.log("observer", xy=observer[0], radius=observer[1])
+            self._observer = observer
+        self.kernel.tick(observer_xy=observer_xy, observer_radius=observer_radius)
+        if self.kernel.ticks % self.every == 0:
+            self.checkpoint()
+
+    def _observer_at(self, tick: int) -> Tuple[Any, int]:
+        observer: Tuple[Any, int] = (None, 55)
+        for event in self.events:
+            if event["tick"] > tick:
+                break
+            if event["kind"] == "observer":
+                observer = (event["xy"], event["radius"])
+        return observer
+
+    def seek(self, target: int) -> Kernel:
+        """Rebuild the world at ``target`` and continue recording from there.
+
+        Inputs and checkpoints after ``target`` belong to the abandoned future
+        and are discarded.
+        """
+        target = int(target)
+        usable = [t for t in self.checkpoints if t <= target]
+        if target < 0 or not usable:
+            raise ValueError(f"tick {target} is before the first checkpoint")
+        base = max(usable)
+        kernel = Kernel.restore(self.checkpoints[base], self.kernel.world.backend)
+        by_tick: Dict[int, List[Dict[str, Any]]] = {}
+        for event in self.events:
+            if base <= event["tick"] < target and event["kind"] == "observer":
+                by_tick.setdefault(event["tick"], []).append(event)
+        xy, radius = self._observer_at(base - 1) if base else (None, 55)
+        while kernel.ticks < target:
+            for event in by_tick.get(kernel.ticks, ()):
+                xy, radius = event["xy"], event["radius"]
+            kernel.tick(observer_xy=tuple(xy) if xy is not None else None, observer_radius=radius)
+        self.kernel = kernel
+        self.events = [e for e in self.events if e["tick"] < target]
+        for tick in [t for t in self.checkpoints if t > target]:
+            self.checkpoints.pop(tick).unlink(missing_ok=True)
+        with open(self.directory / INPUTS_FILE, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(e) + "\n" for e in self.events)
+        self._observer = self._observer_at(target - 1) if target else (None, 55)
+        return kernel
@@ -3,7 +3,9 @@ from dataclasses import dataclass
 import ast
 import math
 import random
-from typing import Any, Dict, Mapping, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Mapping, Optional
 
 @dataclass(frozen=True)
 class CompiledExpr:
@@ -30,11 +32,22 @@ def clamp(x, lo, hi):
 def lerp(a, b, t):
     return a + (b - a) * t
 
+# Stream rand()/randint() draw from; kernels install their own seeded one while they tick.
+_RNG: ContextVar[random.Random] = ContextVar("mythos_rng", default=random._inst)
+
+@contextmanager
+def rng_stream(rng: random.Random) -> Iterator[random.Random]:
+    token = _RNG.set(rng)
+    try:
+        yield rng
+    finally:
+        _RNG.reset(token)
+
 def rand():
-    return random.random()
+    return _RNG.get().random()
 
 def randint(a, b):
-    return random.randint(int(a), int(b))
+    return _RNG.get().randint(int(a), int(b))
 
 _SAFE_IMPL: Dict[str, Any] = {
     "min": min, "max": max, "abs": abs, "round": round,
@@ -0,0 +1,88 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Dict, Sequence, Tuple
+import ast
+
+import numpy as np
+
+from .compiler import TICK_UNIFORMS
+from .model import ENV_FIELDS, EntityStore
+from .safeexpr import CompiledExpr, eval_expr
+from .vector import NotVectorizable, vectorize_expr
+
+
+@dataclass
+class _Entry:
+    mask: np.ndarray
+    reads: Tuple[str, ...]   # store columns the selector depends on
+    versions: Tuple[int, ...]
+    volatile: bool           # reads tick uniforms or could not be analysed
+
+
+def _reads(expr: CompiledExpr, samples: Tuple[str, ...] = ()) -> Tuple[Tuple[str, ...], bool]:
+    try:
+        tree = ast.parse(expr.src or "", mode="eval")
+    except SyntaxError:
+        return tuple(), True
+    names = {n.id for n in ast.walk(tree) if isinstance(n, ast.Name)}
+    cols = tuple(sorted("color_code" if n == "color" else n for n in names if n in ENV_FIELDS))
+    # Field samples are re-gathered every substep, so selectors reading one are too
+    volatile = names & (set(TICK_UNIFORMS) | set(samples) | {"rand", "randint"})
+    return cols, bool(volatile)
+
+
+class SelectorCache:
+    """Neighbor selectors evaluated for the whole store, one boolean mask per expression.
+
+    Masks are built lazily on first use in a substep and kept until one of the
+    columns the selector reads is written (tracked by ``EntityStore.versions``).
+    Selectors that read season/rain, field samples (``samples``, the derived
+    columns the kernel gathers each substep) or draw random numbers are
+    rebuilt every substep.
+    """
+
+    def __init__(self):
+        self._store: EntityStore | None = None
+        self._env: Dict[str, Any] = {}
+        self._samples: Tuple[str, ...] = ()
+        self._entries: Dict[str, _Entry] = {}
+
+    def begin_substep(self, store: EntityStore, env: Dict[str, Any], samples: Sequence[str] = ()) -> None:
+        if store is not self._store:
+            self._store = store
+            self._entries.clear()
+        self._env = env
+        self._samples = tuple(samples)
+        versions = store.versions
+        n = len(store)
+        for key, entry in list(self._entries.items()):
+            if (entry.volatile or entry.mask.size != n
+                    or entry.versions != tuple(versions[c] for c in entry.reads)):
+                del self._entries[key]
+
+    def mask(self, expr: CompiledExpr) -> np.ndarray:
+        key = expr.src or str(id(expr))
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = self._build(expr)
+        return entry.mask
+
+    def _build(self, expr: CompiledExpr) -> _Entry:
+        store = self._store
+        n = len(store)
+        samples = self._samples
+        reads, volatile = _reads(expr, samples)
+        try:
+            vexpr = vectorize_expr(expr, self._env, samples)
+            m = vexpr.evaluate(store, np.arange(n), self._env)
+            mask = np.broadcast_to(np.asarray(m, dtype=bool), (n,)).copy()
+        except NotVectorizable:
+            mask = np.zeros(n, dtype=bool)
+            cols = {name: store.column(name) for name in samples}
+            for i, other in enumerate(store):
+                oenv = other.as_env()
+                oenv.update(self._env)
+                for name, col in cols.items():
+                    oenv[name] = col[i]
+                mask[i] = bool(eval_expr(expr, oenv))
+        return _Entry(mask, reads, tuple(store.versions[c] for c in reads), volatile)
@@ -6,36 +6,31 @@ import json
 import time
 
 from .kernel import Kernel
-from .model import World, Entity
+from .model import World, EntityStore
 
 
-def _entity_to_dict(e: Entity) -> Dict[str, Any]:
-    return {
-        "id": e.id,
-        "x": e.x,
-        "y": e.y,
-        "vx": e.vx,
-        "vy": e.vy,
-        "mass": e.mass,
-        "hardness": e.hardness,
-        "color": e.color,
-        "age": e.age,
-        "seen": e.seen,
-        "alive": e.alive,
-        "sound": e.sound,
-    }
+_SNAPSHOT_COLUMNS = ("id", "x", "y", "vx", "vy", "mass", "hardness", "color", "age", "seen", "alive", "sound")
+
+
+def _entity_rows(store: EntityStore, count: int) -> List[Dict[str, Any]]:
+    cols = []
+    for name in _SNAPSHOT_COLUMNS:
+        if name == "color":
+            cols.append(store.color_names(store.color_code[:count]))
+        else:
+            cols.append(store.column(name)[:count].tolist())
+    return [dict(zip(_SNAPSHOT_COLUMNS, row)) for row in zip(*cols)]
 
 
 def world_snapshot(world: World, max_entities: Optional[int] = None) -> Dict[str, Any]:
     ents = world.entities
-    if max_entities is not None:
-        ents = ents[:max_entities]
+    count = len(ents) if max_entities is None else max(0, min(len(ents), max_entities))
     return {
         "time": world.time,
         "w": world.w,
         "h": world.h,
         "dt": world.dt,
-        "entities": [_entity_to_dict(e) for e in ents],
+        "entities": _entity_rows(ents, count),
     }
 
 
@@ -44,11 +39,16 @@ class Simulation:
     kernel: Kernel
     metrics: List[Dict[str, Any]] = field(default_factory=list)
     snapshots: List[Dict[str, Any]] = field(default_factory=list)
+    # Optional engine.replay.Recorder; when set, ticks go through it so observer moves are logged
+    recorder: Any = None
 
     def step(self, steps: int = 1, observer_xy: Tuple[int, int] | None = None, observer_radius: int = 55):
         start = time.perf_counter()
         for _ in range(max(1, steps)):
-            self.kernel.tick(observer_xy=observer_xy, observer_radius=observer_radius)
+            if self.recorder is not None:
+                self.recorder.step(observer_xy=observer_xy, observer_radius=observer_radius)
+            else:
+                self.kernel.tick(observer_xy=observer_xy, observer_radius=observer_radius)
         elapsed = time.perf_counter() - start
         self.metrics.append(
             {
@@ -0,0 +1,256 @@
+from __future__ import annotations
+from typing import Sequence, Tuple
+import math
+
+import numpy as np
+
+# Above this many cells per indexed entity the bounding box is clamped instead of grown.
+_MAX_CELLS_PER_ENTITY = 64
+
+
+def _expand_ranges(starts: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # For ranges [starts[i], starts[i] + counts[i]) returns (owner i, position) for every element.
+    owner = np.repeat(np.arange(counts.size), counts)
+    offsets = np.arange(owner.size) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, starts[owner] + offsets
+
+
+class SpatialIndex:
+    """Uniform cell list over entity positions, stored as flat arrays.
+
+    `build` assigns every indexed entity a cell id and counting-sorts them:
+    `order` holds entity indices grouped by cell (store order within a cell),
+    and `starts`/`counts` give each cell's slice of `order`. Cells cover the
+    bounding box of the indexed positions, so unbounded coordinates work as
+    they did with the dict grid.
+    """
+
+    def __init__(self, cell_size: float = 32.0):
+        self.cell_size = float(cell_size)
+        self.order = np.zeros(0, dtype=np.intp)
+        self.starts = np.zeros(0, dtype=np.intp)
+        self.counts = np.zeros(0, dtype=np.intp)
+        self.origin = (0, 0)
+        self.shape = (0, 0)  # (cells_y, cells_x)
+        self.clamped = False
+
+    def __len__(self) -> int:
+        return int(self.order.size)
+
+    def _cells(self, x, y) -> Tuple[np.ndarray, np.ndarray]:
+        cs = self.cell_size
+        return np.floor(np.asarray(x) / cs).astype(np.int64), np.floor(np.asarray(y) / cs).astype(np.int64)
+
+    def build(self, x: np.ndarray, y: np.ndarray, idx: np.ndarray) -> None:
+        """Index the entities `idx`, reading their positions from the columns `x`, `y`."""
+        idx = np.asarray(idx, dtype=np.intp)
+        px, py = x[idx], y[idx]
+        finite = np.isfinite(px) & np.isfinite(py)
+        if not finite.all():
+            idx, px, py = idx[finite], px[finite], py[finite]
+        if idx.size == 0:
+            self.order = idx
+            self.starts = self.counts = np.zeros(0, dtype=np.intp)
+            self.origin, self.shape = (0, 0), (0, 0)
+            self.clamped = False
+            return
+        cx, cy = self._cells(px, py)
+        x0, y0 = int(cx.min()), int(cy.min())
+        nx, ny = int(cx.max()) - x0 + 1, int(cy.max()) - y0 + 1
+        limit = _MAX_CELLS_PER_ENTITY * idx.size + 1024
+        self.clamped = nx * ny > limit
+        if self.clamped:
+            # A few far-flung entities: clamp them (and later the queries) into the
+            # border cells. Clamping never moves two cells apart, so queries still
+            # return a superset of the true neighbors.
+            side = max(1, int(math.sqrt(limit)))
+            mx, my = int(np.median(cx)), int(np.median(cy))
+            x0, y0 = max(x0, mx - side // 2), max(y0, my - side // 2)
+            nx, ny = min(nx, side), min(ny, side)
+            cx = np.clip(cx, x0, x0 + nx - 1)
+            cy = np.clip(cy, y0, y0 + ny - 1)
+        cell = (cy - y0) * nx + (cx - x0)
+        self.counts = np.bincount(cell, minlength=nx * ny).astype(np.intp)
+        self.starts = np.cumsum(self.counts) - self.counts
+        self.order = idx[np.argsort(cell, kind="stable")]
+        self.origin, self.shape = (x0, y0), (ny, nx)
+
+    def _window(self, cx: np.ndarray, cy: np.ndarray, r_cells: int):
+        # Yields (cell ids, valid mask) for each offset of the query window, rows first.
+        x0, y0 = self.origin
+        ny, nx = self.shape
+        gx, gy = cx - x0, cy - y0
+        if self.clamped:
+            gx, gy = np.clip(gx, 0, nx - 1), np.clip(gy, 0, ny - 1)
+        for dy in range(-r_cells, r_cells + 1):
+            yy = gy + dy
+            for dx in range(-r_cells, r_cells + 1):
+                xx = gx + dx
+                ok = (xx >= 0) & (xx < nx) & (yy >= 0) & (yy < ny)
+                yield np.where(ok, yy * nx + xx, 0), ok
+
+    def candidates(self, x: float, y: float, radius: float) -> np.ndarray:
+        """Entity indices in the cells overlapping the square of `radius` around (x, y)."""
+        if self.order.size == 0:
+            return self.order
+        cs = self.cell_size
+        r_cells = int(math.ceil(radius / cs))
+        ny, nx = self.shape
+        gx, gy = math.floor(x / cs) - self.origin[0], math.floor(y / cs) - self.origin[1]
+        if self.clamped:
+            gx, gy = min(max(gx, 0), nx - 1), min(max(gy, 0), ny - 1)
+        if gx + r_cells < 0 or gy + r_cells < 0 or gx - r_cells >= nx or gy - r_cells >= ny:
+            return self.order[:0]
+        parts = []
+        for yy in range(max(0, gy - r_cells), min(ny, gy + r_cells + 1)):
+            lo = yy * nx + max(0, gx - r_cells)
+            hi = yy * nx + min(nx - 1, gx + r_cells)
+            # Cells of one row are contiguous in `order`
+            parts.append(self.order[self.starts[lo]:self.starts[hi] + self.counts[hi]])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def query_rect(self, x0: float, y0: float, x1: float, y1: float,
+                   x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Indexed entities with x0 <= x <= x1 and y0 <= y <= y1, in ascending index order."""
+        if self.order.size == 0 or not (x0 <= x1 and y0 <= y1):
+            return self.order[:0]
+        cs = self.cell_size
+        ny, nx = self.shape
+        ox, oy = self.origin
+        gx0, gx1 = math.floor(x0 / cs) - ox, math.floor(x1 / cs) - ox
+        gy0, gy1 = math.floor(y0 / cs) - oy, math.floor(y1 / cs) - oy
+        if not self.clamped and (gx1 < 0 or gy1 < 0 or gx0 >= nx or gy0 >= ny):
+            return self.order[:0]
+        # Clamped layouts keep far entities in the border cells, so clamp the range too
+        gx0, gx1 = min(max(gx0, 0), nx - 1), min(max(gx1, 0), nx - 1)
+        gy0, gy1 = min(max(gy0, 0), ny - 1), min(max(gy1, 0), ny - 1)
+        parts = []
+        for yy in range(gy0, gy1 + 1):
+            lo, hi = yy * nx + gx0, yy * nx + gx1
+            parts.append(self.order[self.starts[lo]:self.starts[hi] + self.counts[hi]])
+        cand = np.concatenate(parts)
+        px, py = x[cand], y[cand]
+        keep = (px >= x0) & (px <= x1) & (py >= y0) & (py <= y1)
+        return np.sort(cand[keep])
+
+    def query_radius(self, qx, qy, radius, x: np.ndarray, y: np.ndarray,
+                     exclude: np.ndarray | None = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Batched radius query.
+
+        Returns pair arrays (qi, nj): query qi has indexed entity nj within
+        `radius` (scalar or per-query), using positions from the columns `x`, `y`.
+        `exclude` gives an entity index per query to leave out (usually itself).
+        Pairs are grouped by query, each group in cell order.
+        """
+        qx = np.atleast_1d(np.asarray(qx, dtype=np.float64))
+        qy = np.atleast_1d(np.asarray(qy, dtype=np.float64))
+        radius = np.broadcast_to(np.asarray(radius, dtype=np.float64), qx.shape)
+        empty = np.zeros(0, dtype=np.intp)
+        if self.order.size == 0 or qx.size == 0:
+            return empty, empty
+        r_max = float(radius.max()) if radius.size else 0.0
+        if not math.isfinite(r_max) or r_max < 0:
+            return empty, empty
+        cx, cy = self._cells(qx, qy)
+        r_cells = int(math.ceil(r_max / self.cell_size))
+        qis, njs = [], []
+        for cell, ok in self._window(cx, cy, r_cells):
+            counts = np.where(ok, self.counts[cell], 0)
+            qi, pos = _expand_ranges(self.starts[cell], counts)
+            qis.append(qi)
+            njs.append(self.order[pos])
+        qi = np.concatenate(qis)
+        nj = np.concatenate(njs)
+        dx = x[nj] - qx[qi]
+        dy = y[nj] - qy[qi]
+        r = radius[qi]
+        keep = dx * dx + dy * dy <= r * r
+        if exclude is not None:
+            keep &= nj != np.asarray(exclude)[qi]
+        qi, nj = qi[keep], nj[keep]
+        by_query = np.argsort(qi, kind="stable")
+        return qi[by_query], nj[by_query]
+
+
+class StackedIndex:
+    """Radius queries over several worlds' indexes at once, never pairing across worlds.
+
+    ``build`` concatenates the cell lists of already built ``SpatialIndex``
+    objects whose entities are rows ``k * stride + i`` of one stacked store;
+    ``query_radius`` then answers every world's queries in one pass, with
+    each world's own cell layout, so pairs come back exactly as its index
+    would return them.
+    """
+
+    def __init__(self, stride: int):
+        self.stride = int(stride)
+        self.cell_size = 32.0
+        self.order = np.zeros(0, dtype=np.intp)
+
+    def build(self, indexes: Sequence[SpatialIndex]) -> None:
+        """Stack ``indexes`` (one per world, all with the same cell size) for querying."""
+        self.cell_size = indexes[0].cell_size
+        cells = np.asarray([ix.shape[0] * ix.shape[1] for ix in indexes], dtype=np.intp)
+        self.base = np.cumsum(cells) - cells
+        sizes = np.asarray([ix.order.size for ix in indexes], dtype=np.intp)
+        offsets = np.cumsum(sizes) - sizes
+        self.order = np.concatenate(
+            [ix.order + k * self.stride for k, ix in enumerate(indexes)] + [np.zeros(0, dtype=np.intp)]
+        )
+        self.starts = np.concatenate(
+            [ix.starts + offsets[k] for k, ix in enumerate(indexes)] + [np.zeros(0, dtype=np.intp)]
+        )
+        self.counts = np.concatenate([ix.counts for ix in indexes] + [np.zeros(0, dtype=np.intp)])
+        self.origin = np.asarray([ix.origin for ix in indexes], dtype=np.int64).reshape(-1, 2)
+        self.shape = np.asarray([ix.shape for ix in indexes], dtype=np.int64).reshape(-1, 2)
+        self.clamped = np.asarray([ix.clamped for ix in indexes], dtype=bool)
+
+    def query_radius(self, qx, qy, radius, x: np.ndarray, y: np.ndarray,
+                     exclude: np.ndarray | None = None) -> Tuple[np.ndarray, np.ndarray]:
+        """``SpatialIndex.query_radius`` for rows of any world; ``exclude`` (the query rows) says which."""
+        if exclude is None:
+            raise ValueError("stacked queries are placed by their rows (exclude)")
+        qx = np.atleast_1d(np.asarray(qx, dtype=np.float64))
+        qy = np.atleast_1d(np.asarray(qy, dtype=np.float64))
+        radius = np.broadcast_to(np.asarray(radius, dtype=np.float64), qx.shape)
+        exclude = np.asarray(exclude)
+        empty = np.zeros(0, dtype=np.intp)
+        if self.order.size == 0 or qx.size == 0:
+            return empty, empty
+        world = exclude // self.stride
+        # A world skips all its queries when its largest radius is unusable, as SpatialIndex does
+        first = np.flatnonzero(np.r_[True, world[1:] != world[:-1]])
+        r_max = np.maximum.reduceat(radius, first)
+        usable = np.isfinite(r_max) & (r_max >= 0)
+        if not usable.any():
+            return empty, empty
+        valid = np.repeat(usable, np.diff(np.r_[first, world.size]))
+        r_cells = int(math.ceil(float(r_max[usable].max()) / self.cell_size))
+        cs = self.cell_size
+        cx = np.floor(qx / cs).astype(np.int64) - self.origin[world, 0]
+        cy = np.floor(qy / cs).astype(np.int64) - self.origin[world, 1]
+        ny, nx = self.shape[world, 0], self.shape[world, 1]
+        clamped = self.clamped[world]
+        cx = np.where(clamped, np.clip(cx, 0, np.maximum(nx - 1, 0)), cx)
+        cy = np.where(clamped, np.clip(cy, 0, np.maximum(ny - 1, 0)), cy)
+        base = self.base[world]
+        qis, njs = [], []
+        for dy in range(-r_cells, r_cells + 1):
+            yy = cy + dy
+            for dx in range(-r_cells, r_cells + 1):
+                xx = cx + dx
+                ok = valid & (xx >= 0) & (xx < nx) & (yy >= 0) & (yy < ny)
+                cell = np.where(ok, base + yy * nx + xx, 0)
+                counts = np.where(ok, self.counts[cell], 0)
+                qi, pos = _expand_ranges(self.starts[cell], counts)
+                qis.append(qi)
+                njs.append(self.order[pos])
+        qi = np.concatenate(qis)
+        nj = np.concatenate(njs)
+        dx = x[nj] - qx[qi]
+        dy = y[nj] - qy[qi]
+        r = radius[qi]
+        keep = (dx * dx + dy * dy <= r * r) & (nj != exclude[qi])
+        qi, nj = qi[keep], nj[keep]
+        by_query = np.argsort(qi, kind="stable")
+        return qi[by_query], nj[by_query]
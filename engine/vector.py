@@ -0,0 +1,399 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import ast
+
+import numpy as np
+
+from .compiler import TICK_UNIFORMS, _Uncompilable, specialize_expr
+from .laws import Law, Action
+from .model import ENV_FIELDS, WRITABLE_FIELDS, EntityStore
+from .safeexpr import CompiledExpr, eval_expr, rand
+from .spatial import SpatialIndex
+
+# Columns a law may read, and the subset an assignment may write (color goes through color_code).
+READ_COLUMNS = set(ENV_FIELDS) - {"color"}
+WRITE_COLUMNS = set(WRITABLE_FIELDS) - {"color"}
+_LITERALS = {"true": True, "false": False, "True": True, "False": False}
+
+
+class NotVectorizable(Exception):
+    pass
+
+
+def _v_and(a, b):
+    return np.where(a, b, a)
+
+
+def _v_or(a, b):
+    return np.where(a, a, b)
+
+
+def _v_min(*args):
+    out = args[0]
+    for a in args[1:]:
+        out = np.where(a < out, a, out)
+    return out
+
+
+def _v_max(*args):
+    out = args[0]
+    for a in args[1:]:
+        out = np.where(a > out, a, out)
+    return out
+
+
+def _v_clamp(x, lo, hi):
+    return np.where(x < lo, lo, np.where(x > hi, hi, x))
+
+
+def _v_lerp(a, b, t):
+    return a + (b - a) * t
+
+
+def _v_rand(n):
+    return np.fromiter((rand() for _ in range(n)), dtype=np.float64, count=n)
+
+
+_VECTOR_FUNCS: Dict[str, Any] = {
+    "min": _v_min, "max": _v_max, "abs": np.abs, "round": np.rint,
+    "clamp": _v_clamp, "lerp": _v_lerp,
+    "sin": np.sin, "cos": np.cos, "tan": np.tan,
+    "sqrt": np.sqrt, "log": np.log, "exp": np.exp,
+}
+
+
+class _Rewriter(ast.NodeTransformer):
+    """Rewrites a DSL expression into NumPy operations over gathered entity columns."""
+
+    def __init__(self, consts: Dict[str, Any], samples=()):
+        self.consts = consts
+        self.samples = set(samples)
+        self.columns: set[str] = set()
+        self.colors: set[str] = set()
+
+    def visit_Name(self, node: ast.Name):
+        name = node.id
+        if name in _LITERALS:
+            return ast.copy_location(ast.Constant(_LITERALS[name]), node)
+        if name == "color":
+            raise NotVectorizable("color is only vectorized inside comparisons")
+        if name in READ_COLUMNS or name in self.samples:
+            self.columns.add(name)
+            return node
+        if name in self.consts or name in TICK_UNIFORMS:
+            return node
+        raise NotVectorizable(f"unknown name: {name}")
+
+    def _color_code(self, node: ast.AST) -> ast.AST:
+        if not (isinstance(node, ast.Constant) and isinstance(node.value, str)):
+            raise NotVectorizable("color compared to a non-literal")
+        self.colors.add(node.value)
+        return ast.Subscript(value=ast.Name("_colors", ast.Load()), slice=ast.Constant(node.value), ctx=ast.Load())
+
+    def visit_Compare(self, node: ast.Compare):
+        operands = [node.left] + list(node.comparators)
+        parts = []
+        for op, left, right in zip(node.ops, operands, operands[1:]):
+            lcol = isinstance(left, ast.Name) and left.id == "color"
+            rcol = isinstance(right, ast.Name) and right.id == "color"
+            if lcol or rcol:
+                if not isinstance(op, (ast.Eq, ast.NotEq)):
+                    raise NotVectorizable("only == and != on color")
+                self.columns.add("color_code")
+                code = ast.Name("color_code", ast.Load())
+                other = self._color_code(right if lcol else left)
+                left, right = (code, other) if lcol else (other, code)
+            else:
+                left, right = self.visit(left), self.visit(right)
+            parts.append(ast.Compare(left=left, ops=[op], comparators=[right]))
+        out = parts[0]
+        for p in parts[1:]:
+            out = ast.Call(func=ast.Name("_and", ast.Load()), args=[out, p], keywords=[])
+        return ast.copy_location(out, node)
+
+    def visit_BoolOp(self, node: ast.BoolOp):
+        fn = "_and" if isinstance(node.op, ast.And) else "_or"
+        values = [self.visit(v) for v in node.values]
+        out = values[0]
+        for v in values[1:]:
+            out = ast.Call(func=ast.Name(fn, ast.Load()), args=[out, v], keywords=[])
+        return ast.copy_location(out, node)
+
+    def visit_UnaryOp(self, node: ast.UnaryOp):
+        operand = self.visit(node.operand)
+        if isinstance(node.op, ast.Not):
+            return ast.copy_location(
+                ast.Call(func=ast.Name("_not", ast.Load()), args=[operand], keywords=[]), node
+            )
+        node.operand = operand
+        return node
+
+    def visit_Call(self, node: ast.Call):
+        name = node.func.id
+        args = [self.visit(a) for a in node.args]
+        if name == "rand" and not args:
+            return ast.copy_location(
+                ast.Call(func=ast.Name("_rand", ast.Load()), args=[ast.Name("_n", ast.Load())], keywords=[]), node
+            )
+        if name not in _VECTOR_FUNCS or (name == "round" and len(args) != 1):
+            raise NotVectorizable(f"call not vectorized: {name}()")
+        return ast.copy_location(
+            ast.Call(func=ast.Name("_f_" + name, ast.Load()), args=args, keywords=[]), node
+        )
+
+
+@dataclass
+class VectorExpr:
+    code: Any
+    columns: List[str]
+    colors: List[str]
+    source: CompiledExpr | None = None
+
+    def evaluate(self, store: EntityStore, idx: np.ndarray, consts: Dict[str, Any]) -> Any:
+        scope: Dict[str, Any] = dict(_SCOPE)
+        scope.update(consts)
+        for name in self.columns:
+            scope[name] = store.column(name)[idx]
+        if self.colors:
+            codes = store._color_codes
+            scope["_colors"] = {c: codes.get(c, -1) for c in self.colors}
+        scope["_n"] = idx.size
+        try:
+            with np.errstate(divide="raise", invalid="raise", over="raise"):
+                return eval(self.code, {"__builtins__": {}}, scope)
+        except FloatingPointError:
+            if self.source is None:
+                raise
+        # Both sides of and/or are computed for every row, so a division guarded by the
+        # other side can fail here without failing per entity: redo the rows one by one,
+        # which raises (ZeroDivisionError, math domain error ...) only where scalar mode would
+        return self._rows(store, idx, consts)
+
+    def _rows(self, store: EntityStore, idx: np.ndarray, consts: Dict[str, Any]) -> np.ndarray:
+        samples = [name for name in self.columns if name not in READ_COLUMNS and name != "color_code"]
+        out = []
+        for i in idx.tolist():
+            env = dict(consts)
+            env.update(store[i].as_env())
+            for name in samples:
+                env[name] = store.column(name)[i]
+            out.append(eval_expr(self.source, env))
+        return np.asarray(out)
+
+
+_SCOPE: Dict[str, Any] = {
+    "_and": _v_and, "_or": _v_or, "_not": np.logical_not, "_rand": _v_rand,
+}
+_SCOPE.update({"_f_" + k: v for k, v in _VECTOR_FUNCS.items()})
+
+
+def vectorize_expr(compiled: CompiledExpr, consts: Dict[str, Any], samples=()) -> VectorExpr:
+    # Consts are inlined and folded first, so the rewriter only sees columns and uniforms.
+    # `samples` names per-substep field sample columns (EntityStore.set_derived).
+    try:
+        body, _, _ = specialize_expr(compiled, consts, samples=samples)
+    except (SyntaxError, _Uncompilable) as e:
+        raise NotVectorizable(str(e))
+    rw = _Rewriter(consts, samples)
+    tree = ast.fix_missing_locations(rw.visit(ast.Expression(body)))
+    return VectorExpr(
+        code=compile(tree, "<vector>", "eval"),
+        columns=sorted(rw.columns),
+        colors=sorted(rw.colors),
+        source=compiled,
+    )
+
+
+@dataclass
+class NeighborContext:
+    """Per-substep neighbor state the kernel shares with vector actions."""
+    spatial: SpatialIndex
+    selectors: Any = None  # SelectorCache
+
+
+VectorAction = Callable[[EntityStore, np.ndarray, Dict[str, Any], Optional[NeighborContext]], None]
+
+
+def _assign_action(a: Action, consts: Dict[str, Any], samples=()) -> VectorAction:
+    expr = vectorize_expr(a.expr, consts, samples)
+    name, op = a.name, a.op
+    if name == "color":
+        try:
+            color = eval(expr.code, {"__builtins__": {}}, dict(consts)) if not expr.columns else None
+        except Exception:
+            color = None
+        if op != "=" or not isinstance(color, str):
+            raise NotVectorizable("color only takes a string literal")
+
+        def set_color(store: EntityStore, idx: np.ndarray, cs: Dict[str, Any], ctx: Optional[NeighborContext]) -> None:
+            store.color_code[idx] = store.intern_color(color)
+            store.touch("color_code")
+
+        return set_color
+    if name == "alive" and op != "=":
+        raise NotVectorizable("alive only supports '='")
+    if name not in WRITE_COLUMNS:
+        raise NotVectorizable(f"cannot vectorize assignment to {name}")
+
+    def assign(store: EntityStore, idx: np.ndarray, cs: Dict[str, Any], ctx: Optional[NeighborContext]) -> None:
+        val = expr.evaluate(store, idx, cs)
+        col = store.column(name)
+        if name == "alive":
+            val = np.asarray(val).astype(bool)
+        with np.errstate(all="ignore"):
+            if op == "=":
+                col[idx] = val
+            elif op == "+=":
+                col[idx] = col[idx] + val
+            elif op == "-=":
+                col[idx] = col[idx] - val
+            elif op == "*=":
+                col[idx] = col[idx] * val
+            elif op == "/=":
+                cur = col[idx]
+                col[idx] = np.where(val != 0, cur / np.where(val != 0, val, 1), cur)
+        store.touch(name)
+
+    return assign
+
+
+def _emit_sound(args: List[VectorExpr]) -> VectorAction:
+    def emit(store: EntityStore, idx: np.ndarray, cs: Dict[str, Any], ctx: Optional[NeighborContext]) -> None:
+        amt = args[0].evaluate(store, idx, cs) if args else 0.1
+        store.sound[idx] = store.sound[idx] + amt
+        store.touch("sound")
+
+    return emit
+
+
+# Call name -> builder taking the vectorized args; extend as kernel calls gain batched forms.
+VECTOR_CALLS: Dict[str, Callable[[List[VectorExpr]], VectorAction]] = {
+    "emit_sound": _emit_sound,
+}
+
+BOID_CALLS = ("cohere", "align", "separate")
+
+
+def _selector_mask(ctx: NeighborContext, store: EntityStore, sel: CompiledExpr, cs: Dict[str, Any]) -> np.ndarray:
+    if ctx.selectors is None:
+        from .selectors import SelectorCache
+
+        ctx.selectors = SelectorCache()
+        ctx.selectors.begin_substep(store, cs)
+    return ctx.selectors.mask(sel)
+
+
+def _per_entity(expr: VectorExpr, store: EntityStore, idx: np.ndarray, cs: Dict[str, Any]) -> np.ndarray:
+    return np.broadcast_to(np.asarray(expr.evaluate(store, idx, cs), dtype=np.float64), idx.shape)
+
+
+def _boids(calls: List[Tuple[str, VectorExpr, VectorExpr, Optional[CompiledExpr]]]) -> VectorAction:
+    """Batched cohere/align/separate for a run of consecutive boid calls.
+
+    One radius query (at the largest radius) feeds every call; per-call sums
+    are bincount reductions over the (entity, neighbor) pairs, which add in the
+    same neighbor order as the scalar path. Neighbor velocities are read as of
+    the start of the law; selectors filter pairs through the cached masks.
+    """
+
+    def steer(store: EntityStore, idx: np.ndarray, cs: Dict[str, Any], ctx: Optional[NeighborContext]) -> None:
+        n = idx.size
+        radii = [_per_entity(r, store, idx, cs) for _, r, _, _ in calls]
+        strengths = [_per_entity(s, store, idx, cs) for _, _, s, _ in calls]
+        if ctx is None:
+            ctx = NeighborContext(SpatialIndex())
+            ctx.spatial.build(store.x, store.y, store.alive_indices())
+        sp = ctx.spatial
+        ex, ey = store.x[idx], store.y[idx]
+        ovx, ovy = store.vx[idx], store.vy[idx]
+        qi, nj = sp.query_radius(ex, ey, np.max(radii, axis=0), store.x, store.y, exclude=idx)
+        live = store.alive[nj]
+        qi, nj = qi[live], nj[live]
+        dx = store.x[nj] - ex[qi]
+        dy = store.y[nj] - ey[qi]
+        d2 = dx*dx + dy*dy
+        vx, vy = ovx.copy(), ovy.copy()
+        with np.errstate(all="ignore"):
+            for (name, _, _, sel), r, s in zip(calls, radii, strengths):
+                m = d2 <= (r*r)[qi]
+                if sel is not None:
+                    m &= _selector_mask(ctx, store, sel, cs)[nj]
+                q = qi[m]
+                count = np.bincount(q, minlength=n)
+                has = count > 0
+                count = np.where(has, count, 1)
+                if name == "cohere":
+                    tx = np.bincount(q, weights=store.x[nj[m]], minlength=n) / count
+                    ty = np.bincount(q, weights=store.y[nj[m]], minlength=n) / count
+                    sdx, sdy = tx - ex, ty - ey
+                    d = np.sqrt(sdx*sdx + sdy*sdy)
+                    ok = has & (d > 0.001)
+                    vx = np.where(ok, vx + (sdx/d)*s, vx)
+                    vy = np.where(ok, vy + (sdy/d)*s, vy)
+                elif name == "align":
+                    ax = np.bincount(q, weights=store.vx[nj[m]], minlength=n) / count
+                    ay = np.bincount(q, weights=store.vy[nj[m]], minlength=n) / count
+                    vx = np.where(has, vx + (ax - ovx)*s, vx)
+                    vy = np.where(has, vy + (ay - ovy)*s, vy)
+                else:
+                    inv = 1.0 / np.sqrt(np.maximum(d2[m], 0.001))
+                    sx = np.bincount(q, weights=-dx[m]*inv, minlength=n)
+                    sy = np.bincount(q, weights=-dy[m]*inv, minlength=n)
+                    vx = np.where(has, vx + sx*s, vx)
+                    vy = np.where(has, vy + sy*s, vy)
+        store.vx[idx] = vx
+        store.vy[idx] = vy
+        store.touch("vx", "vy")
+
+    return steer
+
+
+@dataclass
+class VectorLaw:
+    law: Law
+    when: VectorExpr
+    actions: List[VectorAction]
+
+    def mask(self, store: EntityStore, idx: np.ndarray, consts: Dict[str, Any]) -> np.ndarray:
+        m = self.when.evaluate(store, idx, consts)
+        if np.ndim(m) == 0:
+            return idx if bool(m) else idx[:0]
+        return idx[np.asarray(m, dtype=bool)]
+
+    def apply(self, store: EntityStore, consts: Dict[str, Any], ctx: Optional[NeighborContext] = None) -> None:
+        sel = self.mask(store, store.alive_indices(), consts)
+        if sel.size == 0:
+            return
+        for act in self.actions:
+            act(store, sel, consts, ctx)
+
+
+def compile_vector_law(law: Law, consts: Dict[str, Any], samples=()) -> Optional[VectorLaw]:
+    """Compile a law to column operations, or return None if it needs the scalar path."""
+    try:
+        when = vectorize_expr(law.when, consts, samples)
+        actions: List[VectorAction] = []
+        boids: List[Tuple[str, VectorExpr, VectorExpr, Optional[CompiledExpr]]] = []
+        for a in law.actions:
+            if a.kind != "assign" and a.name in BOID_CALLS:
+                if len(a.args or []) < 2:
+                    raise NotVectorizable(f"{a.name}() needs radius and strength")
+                sel = a.args[2] if len(a.args) > 2 else None
+                boids.append((a.name, vectorize_expr(a.args[0], consts, samples),
+                              vectorize_expr(a.args[1], consts, samples), sel))
+                continue
+            if boids:
+                actions.append(_boids(boids))
+                boids = []
+            if a.kind == "assign":
+                actions.append(_assign_action(a, consts, samples))
+            elif a.name in VECTOR_CALLS:
+                actions.append(VECTOR_CALLS[a.name]([vectorize_expr(x, consts, samples) for x in a.args or []]))
+            else:
+                raise NotVectorizable(f"call not vectorized: {a.name}()")
+        if boids:
+            actions.append(_boids(boids))
+    except NotVectorizable:
+        return None
+    return VectorLaw(law=law, when=when, actions=actions)
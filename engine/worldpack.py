@@ -75,5 +75,6 @@ def load_worldpack(name: str) -> Dict[str, Any]:
         "description": data.get("description", ""),
         "dsl": worldpack_to_dsl(data),
         "profiles": data.get("profiles", []),
+        "channels": data.get("channels", []),
         "seed": data.get("seed", 42)
     }
@@ -1,6 +1,7 @@
 import React, { useEffect, useMemo, useState, useRef } from "react";
 import EngineView from "./components/EngineView";
 import { AmbientAudio } from "./engine/ambientAudio";
+import { decodeGrids } from "./engine/frameProtocol";
 
 const DEFAULT_API_BASE = "http://127.0.0.1:8000";
 const DEFAULT_PRESET_ID = "living_world.json";
@@ -27,6 +28,12 @@ const API_BASE = normalizeApiBase(
   import.meta.env.VITE_API_URL || (typeof window !== "undefined" ? window.location.origin : "")
 );
 
+// ?session=<name> picks which world on the server this tab drives
+const SESSION = (
+  (typeof window !== "undefined" ? new URLSearchParams(window.location.search).get("session") : null) || "default"
+).trim();
+const SESSION_QUERY = `session=${encodeURIComponent(SESSION)}`;
+
 type Preset = {
   id: string;
   name: string;
@@ -39,6 +46,7 @@ type PresetDetail = {
   description: string;
   dsl: string;
   profiles: unknown[];
+  channels?: unknown[];
   seed: number;
 };
 
@@ -100,6 +108,7 @@ export default function App() {
   const [activePreset, setActivePreset] = useState<string>("");
   const [dsl, setDsl] = useState("");
   const [profiles, setProfiles] = useState<unknown[] | null>(null);
+  const [channels, setChannels] = useState<unknown[] | null>(null);
   const [seed, setSeed] = useState(42);
   const [n, setN] = useState(240);
   const [tickMs, setTickMs] = useState(33);
@@ -121,6 +130,7 @@ export default function App() {
   const [status, setStatus] = useState("Idle");
   const [initialFrame, setInitialFrame] = useState<FramePayload | null>(null);
   const [fields, setFields] = useState<FieldPayload | null>(null);
+  const fieldsEtagRef = useRef<string | null>(null);
   const [lastFrame, setLastFrame] = useState<FramePayload | null>(null);
   const [selectedId, setSelectedId] = useState<number | null>(null);
   const [autoStarted, setAutoStarted] = useState(false);
@@ -180,7 +190,7 @@ export default function App() {
   }, []);
 
   const wsDisplay = useMemo(() => {
-    return `${API_BASE.replace(/^http/, "ws")}/ws/stream`;
+    return `${API_BASE.replace(/^http/, "ws")}/ws/stream?${SESSION_QUERY}`;
   }, []);
 
   useEffect(() => {
@@ -223,6 +233,7 @@ export default function App() {
       setActivePreset(id);
       setDsl(data.dsl);
       setProfiles(data.profiles || null);
+      setChannels(data.channels || null);
       setSeed(data.seed || 42);
       setStatus("Preset loaded");
       return data;
@@ -237,15 +248,16 @@ export default function App() {
   const applyProgram = async (payload?: {
     dsl: string;
     profiles: unknown[] | null;
+    channels?: unknown[] | null;
     seed: number;
     n: number;
     backend: string;
   }) => {
     setApplying(true);
     setStatus("Applying program...");
-    const nextPayload = payload || { dsl, profiles, seed, n, backend };
+    const nextPayload = payload || { dsl, profiles, channels, seed, n, backend };
     try {
-      const res = await fetch(`${API_BASE}/api/apply`, {
+      const res = await fetch(`${API_BASE}/api/apply?${SESSION_QUERY}`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify(nextPayload),
@@ -281,7 +293,7 @@ export default function App() {
     setRunningUpdate(true);
     setStatus(value ? "Running..." : "Paused");
     try {
-      const res = await fetch(`${API_BASE}/api/run`, {
+      const res = await fetch(`${API_BASE}/api/run?${SESSION_QUERY}`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ run: value, tick_ms: tickMs, steps }),
@@ -296,11 +308,15 @@ export default function App() {
 
   const fetchFields = async () => {
     try {
-      const res = await fetch(`${API_BASE}/api/fields?step=4`);
-      if (!res.ok) return;
-      if (res.status === 204) return;
-      const payload = (await res.json()) as FieldPayload;
-      setFields(payload);
+      // Quantized grids; the ETag turns polls of unchanged fields into empty 304s
+      const headers: Record<string, string> = fieldsEtagRef.current ? { "If-None-Match": fieldsEtagRef.current } : {};
+      const res = await fetch(`${API_BASE}/api/fields?step=4&format=u16&${SESSION_QUERY}`, { headers });
+      if (res.status === 304 || res.status === 204 || !res.ok) return;
+      const decoded = decodeGrids(await res.arrayBuffer());
+      if (!decoded) return;
+      const { grids, ...meta } = decoded;
+      fieldsEtagRef.current = res.headers.get("ETag");
+      setFields({ ...meta, ...grids } as FieldPayload);
     } catch {
       return;
     }
@@ -324,6 +340,7 @@ export default function App() {
       await applyProgram({
         dsl: detail.dsl,
         profiles: detail.profiles || null,
+        channels: detail.channels || null,
         seed: detail.seed || 42,
         n,
         backend,
@@ -342,6 +359,7 @@ export default function App() {
     await applyProgram({
       dsl: detail.dsl,
       profiles: detail.profiles || null,
+      channels: detail.channels || null,
       seed: detail.seed || 42,
       n,
       backend,
@@ -580,6 +598,7 @@ export default function App() {
               theme={pickTheme(activePreset)}
               assetStyle={assetStyle}
               showDiagnostics={showDiagnostics}
+              session={SESSION}
             />
           </div>
         </main>
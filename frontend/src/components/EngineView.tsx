@@ -1,5 +1,7 @@
 import React, { useEffect, useMemo, useRef } from "react";
 import { Renderer, Entity } from "../engine/Renderer";
+import { DeltaState, decodeFrame, frameEntities, isDeltaMessage, isTablesMessage } from "../engine/frameProtocol";
+import type { BinaryFrame, FrameColumns, FrameTables } from "../engine/frameProtocol";
 import type { AssetStyle } from "../engine/assets";
 
 type FramePayload = {
@@ -31,6 +33,8 @@ type Props = {
   theme?: string;
   assetStyle?: AssetStyle;
   showDiagnostics?: boolean;
+  stream?: "binary" | "delta";
+  session?: string;
 };
 
 const DEFAULT_API_BASE = "http://127.0.0.1:8000";
@@ -54,16 +58,19 @@ const normalizeApiBase = (value?: string) => {
   }
 };
 
-const normalizeWsUrl = (apiBase?: string) => {
+const sessionQuery = (session = "default") => `session=${encodeURIComponent(session)}`;
+
+const normalizeWsUrl = (apiBase?: string, stream = "binary", session = "default") => {
   const base = normalizeApiBase(apiBase);
   if (!base) return "";
   try {
     const parsed = new URL(base);
     parsed.protocol = parsed.protocol === "https:" ? "wss:" : "ws:";
     parsed.pathname = "/ws/stream";
+    parsed.search = `?format=${stream}&${sessionQuery(session)}`;
     return parsed.toString();
   } catch {
-    return base.replace(/^http/, "ws").replace(/\/+$/, "") + "/ws/stream";
+    return base.replace(/^http/, "ws").replace(/\/+$/, "") + `/ws/stream?format=${stream}&${sessionQuery(session)}`;
   }
 };
 
@@ -77,6 +84,8 @@ export default function EngineView({
   theme,
   assetStyle = "assets",
   showDiagnostics = false,
+  stream = "binary",
+  session = "default",
 }: Props) {
   const canvasRef = useRef<HTMLCanvasElement | null>(null);
   const rendererRef = useRef<Renderer | null>(null);
@@ -99,8 +108,8 @@ export default function EngineView({
   const lastFrameTime = useRef<number | null>(null);
 
   const normalizedWsUrl = useMemo(() => {
-    return normalizeWsUrl(apiBase);
-  }, [apiBase]);
+    return normalizeWsUrl(apiBase, stream, session);
+  }, [apiBase, stream, session]);
 
   const httpBase = useMemo(() => {
     return normalizeApiBase(apiBase);
@@ -245,8 +254,12 @@ export default function EngineView({
     let lastMessage = 0;
     let closed = false;
     const hasWs = Boolean(normalizedWsUrl);
+    let tables: FrameTables | null = null;
+    let delta = new DeltaState();
+    let viewportTimer: number | null = null;
+    let sentViewport = "";
 
-    const applyPayload = (payload: FramePayload) => {
+    const applyPayload = (payload: FramePayload, columns?: FrameColumns) => {
       const renderer = rendererRef.current;
       if (!renderer || !rendererReady) {
         pendingFrameRef.current = payload;
@@ -260,12 +273,22 @@ export default function EngineView({
       const fps = prev ? 1000 / Math.max(1, now - prev) : 0;
       lastFrameTime.current = now;
       const count = payload.entities.length || 1;
-      const speedSum = payload.entities.reduce(
-        (sum, entity) => sum + Math.hypot(entity.vx || 0, entity.vy || 0),
-        0
-      );
-      const energySum = payload.entities.reduce((sum, entity) => sum + (entity.energy ?? 0.6), 0);
-      const wealthSum = payload.entities.reduce((sum, entity) => sum + (entity.wealth ?? 0), 0);
+      let speedSum = 0;
+      let energySum = 0;
+      let wealthSum = 0;
+      if (columns) {
+        for (let i = 0; i < columns.id.length; i++) {
+          speedSum += Math.hypot(columns.vx[i], columns.vy[i]);
+          energySum += columns.energy[i];
+          wealthSum += columns.wealth[i];
+        }
+      } else {
+        for (const entity of payload.entities) {
+          speedSum += Math.hypot(entity.vx || 0, entity.vy || 0);
+          energySum += entity.energy ?? 0.6;
+          wealthSum += entity.wealth ?? 0;
+        }
+      }
       setDiagnostics({
         fps: Number.isFinite(fps) ? fps : 0,
         avgSpeed: speedSum / count,
@@ -280,7 +303,7 @@ export default function EngineView({
     const fetchFrame = async () => {
       if (!httpBase) return;
       try {
-        const res = await fetch(`${httpBase}/api/frame`);
+        const res = await fetch(`${httpBase}/api/frame?${sessionQuery(session)}`);
         if (!res.ok) return;
         if (res.status === 204) return;
         const payload = (await res.json()) as FramePayload;
@@ -306,15 +329,37 @@ export default function EngineView({
     const connect = () => {
       if (closed || !normalizedWsUrl) return;
       ws = new WebSocket(normalizedWsUrl);
+      ws.binaryType = "arraybuffer";
+      delta = new DeltaState();
       ws.onopen = () => {
         lastMessage = Date.now();
+        sentViewport = "";
       };
       ws.onmessage = (ev) => {
         try {
-          const payload = JSON.parse(ev.data) as { w: number; h: number; entities: Entity[] };
           lastMessage = Date.now();
+          if (ev.data instanceof ArrayBuffer) {
+            let frame: BinaryFrame | null;
+            if (isDeltaMessage(ev.data)) {
+              frame = delta.apply(ev.data) ? delta.toFrame() : null;
+            } else {
+              frame = decodeFrame(ev.data);
+            }
+            if (!frame) return;
+            stopPolling();
+            applyPayload(
+              { t: frame.t, w: frame.w, h: frame.h, entities: frameEntities(frame, tables) },
+              frame.columns
+            );
+            return;
+          }
+          const message = JSON.parse(ev.data);
+          if (isTablesMessage(message)) {
+            tables = message;
+            return;
+          }
           stopPolling();
-          applyPayload(payload);
+          applyPayload(message as FramePayload);
         } catch {
           return;
         }
@@ -330,9 +375,21 @@ export default function EngineView({
       };
     };
 
+    // Binary streams only carry what the camera can see (plus a margin)
+    const sendViewport = () => {
+      const renderer = rendererRef.current;
+      if (stream !== "binary" || !renderer || !ws || ws.readyState !== WebSocket.OPEN) return;
+      const rect = renderer.visibleRect().map((v) => Math.round(v / 8) * 8);
+      const key = rect.join(",");
+      if (key === sentViewport) return;
+      sentViewport = key;
+      ws.send(JSON.stringify({ type: "viewport", rect, margin: 32, lod: 0 }));
+    };
+
     startPolling();
     if (hasWs) {
       connect();
+      viewportTimer = window.setInterval(sendViewport, 500);
     }
     healthTimer = window.setInterval(() => {
       if (!hasWs) {
@@ -351,10 +408,11 @@ export default function EngineView({
       closed = true;
       if (timer) window.clearTimeout(timer);
       if (healthTimer) window.clearInterval(healthTimer);
+      if (viewportTimer) window.clearInterval(viewportTimer);
       stopPolling();
       ws?.close();
     };
-  }, [normalizedWsUrl, httpBase, rendererReady]);
+  }, [normalizedWsUrl, httpBase, rendererReady, stream]);
 
   useEffect(() => {
     if (!initialFrame) return;
@@ -22,7 +22,17 @@ export default function Viewer() {
   const assetStyle = (params.get("assets") || "assets").trim() as "assets" | "procedural";
   const modeParam = (params.get("mode") || "3d").trim();
   const mode = modeParam === "2d" ? "2d" : "3d";
+  const stream = params.get("stream") === "delta" ? "delta" : "binary";
+  const session = (params.get("session") || "default").trim();
   return (
-    <EngineView mode={mode} apiBase={base} assetStyle={assetStyle} showDiagnostics={false} theme={theme} />
+    <EngineView
+      mode={mode}
+      apiBase={base}
+      assetStyle={assetStyle}
+      showDiagnostics={false}
+      theme={theme}
+      stream={stream}
+      session={session}
+    />
   );
 }
@@ -15,6 +15,7 @@ export type Entity = {
   size: number;
   energy?: number;
   wealth?: number;
+  mass?: number;
   hardness?: number;
   kind?: string;
 };
@@ -1355,6 +1356,28 @@ export class Renderer {
     return typeof id === "number" ? id : null;
   }
 
+  // World-space rectangle [x0, y0, x1, y1] of the ground the active camera can see.
+  // Corner rays that miss the ground (above the horizon) count as the whole world.
+  visibleRect(): [number, number, number, number] {
+    const ground = new THREE.Plane(new THREE.Vector3(0, 1, 0), 0);
+    const hit = new THREE.Vector3();
+    let x0 = Infinity;
+    let z0 = Infinity;
+    let x1 = -Infinity;
+    let z1 = -Infinity;
+    for (const [nx, ny] of [[-1, -1], [1, -1], [1, 1], [-1, 1]]) {
+      this.raycaster.setFromCamera(new THREE.Vector2(nx, ny), this.activeCamera);
+      if (!this.raycaster.ray.intersectPlane(ground, hit)) return [0, 0, this.w, this.h];
+      x0 = Math.min(x0, hit.x);
+      x1 = Math.max(x1, hit.x);
+      z0 = Math.min(z0, hit.z);
+      z1 = Math.max(z1, hit.z);
+    }
+    const cx = this.w * 0.5;
+    const cz = this.h * 0.5;
+    return [x0 + cx, z0 + cz, x1 + cx, z1 + cz];
+  }
+
   render(worldW: number, worldH: number) {
     if (worldW !== this.w || worldH !== this.h || this.needsTerrainRebuild) {
       this.w = worldW;
@@ -0,0 +1,247 @@
+import type { Entity } from "./Renderer";
+
+// Mirror of server/protocol.py. Little-endian; every column is 4-byte aligned
+// so each one is a typed-array view straight over the message buffer.
+const MAGIC = "MYF1";
+const HEADER_BYTES = 32;
+const FLOAT_COLUMNS = ["x", "y", "z", "vx", "vy", "vz", "mass", "hardness", "energy", "wealth"] as const;
+
+export type FloatColumn = (typeof FLOAT_COLUMNS)[number];
+
+export type FrameTables = {
+  version: number;
+  colors: string[];
+  kinds: string[];
+};
+
+export type FrameColumns = { id: Uint32Array; kind: Uint16Array; color: Uint16Array } & Record<
+  FloatColumn,
+  Float32Array
+>;
+
+export type BinaryFrame = {
+  seq: number;
+  t: number;
+  w: number;
+  h: number;
+  n: number;
+  tables: number;
+  columns: FrameColumns;
+};
+
+export const isTablesMessage = (value: unknown): value is FrameTables & { type: "tables" } =>
+  Boolean(value && typeof value === "object" && (value as { type?: string }).type === "tables");
+
+const readMagic = (view: DataView) =>
+  String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+
+export function decodeFrame(buffer: ArrayBuffer): BinaryFrame | null {
+  if (buffer.byteLength < HEADER_BYTES) return null;
+  const view = new DataView(buffer);
+  if (readMagic(view) !== MAGIC) return null;
+  const n = view.getUint32(24, true);
+  let offset = HEADER_BYTES;
+  const id = new Uint32Array(buffer, offset, n);
+  offset += n * 4;
+  const floats = {} as Record<FloatColumn, Float32Array>;
+  for (const name of FLOAT_COLUMNS) {
+    floats[name] = new Float32Array(buffer, offset, n);
+    offset += n * 4;
+  }
+  const kind = new Uint16Array(buffer, offset, n);
+  offset += n * 2;
+  const color = new Uint16Array(buffer, offset, n);
+  return {
+    seq: view.getUint32(4, true),
+    t: view.getFloat64(8, true),
+    w: view.getUint32(16, true),
+    h: view.getUint32(20, true),
+    n,
+    tables: view.getUint32(28, true),
+    columns: { id, kind, color, ...floats },
+  };
+}
+
+// The renderer still works on entity objects; build them from the columns
+// without any JSON parsing.
+export function frameEntities(frame: BinaryFrame, tables: FrameTables | null): Entity[] {
+  const { columns: c, n } = frame;
+  const colors = tables?.colors ?? [];
+  const kinds = tables?.kinds ?? [];
+  const out: Entity[] = new Array(n);
+  for (let i = 0; i < n; i++) {
+    const hardness = c.hardness[i];
+    out[i] = {
+      id: c.id[i],
+      x: c.x[i],
+      y: c.y[i],
+      z: c.z[i],
+      vx: c.vx[i],
+      vy: c.vy[i],
+      vz: c.vz[i],
+      color: colors[c.color[i]] ?? "",
+      kind: kinds[c.kind[i]],
+      size: 3.0 + hardness * 0.6,
+      energy: c.energy[i],
+      wealth: c.wealth[i],
+      mass: c.mass[i],
+      hardness,
+    };
+  }
+  return out;
+}
+
+// Delta stream (server/protocol.py "MYD1"): keyframes plus quantized diffs.
+const DELTA_MAGIC = "MYD1";
+const DELTA_HEADER_BYTES = 56;
+const DELTA_COLUMNS = [...FLOAT_COLUMNS, "kind", "color"] as const;
+
+const pad4 = (n: number) => n + ((4 - (n % 4)) % 4);
+
+export const isDeltaMessage = (buffer: ArrayBuffer) =>
+  buffer.byteLength >= 4 && readMagic(new DataView(buffer)) === DELTA_MAGIC;
+
+export class DeltaState {
+  seq = 0;
+  t = 0;
+  w = 1;
+  h = 1;
+  precision = 0.01;
+  private rows = new Map<number, Int32Array>();
+
+  // Returns false when the message is a diff against a frame we do not hold.
+  apply(buffer: ArrayBuffer): boolean {
+    if (buffer.byteLength < DELTA_HEADER_BYTES) return false;
+    const view = new DataView(buffer);
+    if (readMagic(view) !== DELTA_MAGIC) return false;
+    const keyframe = (view.getUint8(4) & 1) === 1;
+    const seq = view.getUint32(8, true);
+    const baseSeq = view.getUint32(12, true);
+    if (!keyframe && baseSeq !== this.seq) return false;
+    if (keyframe) this.rows.clear();
+    const nSpawned = view.getUint32(48, true);
+    const nDespawned = view.getUint32(52, true);
+    let offset = DELTA_HEADER_BYTES;
+
+    const despawned = new Uint32Array(buffer, offset, nDespawned);
+    offset += nDespawned * 4;
+    for (const id of despawned) this.rows.delete(id);
+    const kept = Array.from(this.rows.keys()).sort((a, b) => a - b);
+
+    const spawned = new Uint32Array(buffer, offset, nSpawned);
+    offset += nSpawned * 4;
+    const spawnedCols: Int32Array[] = [];
+    for (let j = 0; j < DELTA_COLUMNS.length; j++) {
+      spawnedCols.push(new Int32Array(buffer, offset, nSpawned));
+      offset += nSpawned * 4;
+    }
+
+    for (let j = 0; j < DELTA_COLUMNS.length; j++) {
+      const width = view.getUint8(offset);
+      offset += 4;
+      if (!width) continue;
+      const mask = new Uint8Array(buffer, offset, Math.ceil(kept.length / 8));
+      offset += pad4(mask.length);
+      let changed = 0;
+      for (let r = 0; r < kept.length; r++) {
+        if (!(mask[r >> 3] & (1 << (r & 7)))) continue;
+        const delta =
+          width === 1
+            ? view.getInt8(offset + changed)
+            : width === 2
+              ? view.getInt16(offset + changed * 2, true)
+              : view.getInt32(offset + changed * 4, true);
+        const row = this.rows.get(kept[r]);
+        if (row) row[j] += delta; // Int32Array wraps like the server's int32 deltas
+        changed++;
+      }
+      offset += pad4(changed * width);
+    }
+
+    for (let k = 0; k < nSpawned; k++) {
+      const row = new Int32Array(DELTA_COLUMNS.length);
+      for (let j = 0; j < DELTA_COLUMNS.length; j++) row[j] = spawnedCols[j][k];
+      this.rows.set(spawned[k], row);
+    }
+    this.seq = seq;
+    this.t = view.getFloat64(16, true);
+    this.precision = view.getFloat64(24, true);
+    this.w = view.getUint32(32, true);
+    this.h = view.getUint32(36, true);
+    return true;
+  }
+
+  toFrame(): BinaryFrame {
+    const ids = Array.from(this.rows.keys()).sort((a, b) => a - b);
+    const n = ids.length;
+    const id = new Uint32Array(ids);
+    const kind = new Uint16Array(n);
+    const color = new Uint16Array(n);
+    const floats = {} as Record<FloatColumn, Float32Array>;
+    for (const name of FLOAT_COLUMNS) floats[name] = new Float32Array(n);
+    for (let i = 0; i < n; i++) {
+      const row = this.rows.get(ids[i])!;
+      FLOAT_COLUMNS.forEach((name, j) => {
+        floats[name][i] = row[j] * this.precision;
+      });
+      kind[i] = row[FLOAT_COLUMNS.length];
+      color[i] = row[FLOAT_COLUMNS.length + 1];
+    }
+    return { seq: this.seq, t: this.t, w: this.w, h: this.h, n, tables: 0, columns: { id, kind, color, ...floats } };
+  }
+}
+
+// Quantized field grids (server/protocol.py "MYG1", /api/fields?format=u8|u16).
+const GRID_MAGIC = "MYG1";
+const GRID_HEADER_BYTES = 28;
+const GRID_FIELD_BYTES = 32;
+
+export type FieldGrids = {
+  step: number;
+  w: number;
+  h: number;
+  grid_w: number;
+  grid_h: number;
+  versions: Record<string, number>;
+  grids: Record<string, number[][]>;
+};
+
+export function decodeGrids(buffer: ArrayBuffer): FieldGrids | null {
+  if (buffer.byteLength < GRID_HEADER_BYTES) return null;
+  const view = new DataView(buffer);
+  if (readMagic(view) !== GRID_MAGIC) return null;
+  const gridW = view.getUint32(16, true);
+  const gridH = view.getUint32(20, true);
+  const count = view.getUint32(24, true);
+  const out: FieldGrids = {
+    step: view.getUint32(4, true),
+    w: view.getUint32(8, true),
+    h: view.getUint32(12, true),
+    grid_w: gridW,
+    grid_h: gridH,
+    versions: {},
+    grids: {},
+  };
+  let offset = GRID_HEADER_BYTES;
+  for (let k = 0; k < count; k++) {
+    const raw = new Uint8Array(buffer, offset, 16);
+    const end = raw.indexOf(0);
+    const name = new TextDecoder().decode(end < 0 ? raw : raw.subarray(0, end));
+    const version = view.getUint32(offset + 16, true);
+    const bits = view.getUint8(offset + 20);
+    const lo = view.getFloat32(offset + 24, true);
+    const scale = view.getFloat32(offset + 28, true);
+    offset += GRID_FIELD_BYTES;
+    const q = bits === 8 ? new Uint8Array(buffer, offset, gridW * gridH) : new Uint16Array(buffer, offset, gridW * gridH);
+    offset += pad4(q.byteLength);
+    const rows: number[][] = new Array(gridH);
+    for (let y = 0; y < gridH; y++) {
+      const row = new Array<number>(gridW);
+      for (let x = 0; x < gridW; x++) row[x] = lo + q[y * gridW + x] * scale;
+      rows[y] = row;
+    }
+    out.versions[name] = version;
+    out.grids[name] = rows;
+  }
+  return out;
+}
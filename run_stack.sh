@@ -11,6 +11,8 @@ export DATABASE_URL="${DATABASE_URL:-sqlite:///$HOME/.mythos/data.sqlite3}"
 export VITE_API_URL="${BACKEND_URL}"
 mkdir -p "$HOME/.mythos"
 BACKEND_RELOAD="${BACKEND_RELOAD:-0}"
+# BACKEND_WORKERS>1 runs the simulation in its own process (server/simd.py) behind N API workers
+BACKEND_WORKERS="${BACKEND_WORKERS:-1}"
 PORT_PID=""
 PORT_CMD=""
 
@@ -112,7 +114,13 @@ PY
 
 start_backend() {
   echo "[INFO] Backend reload: $([[ "$BACKEND_RELOAD" == "1" ]] && echo on || echo off)"
-  if [[ "$BACKEND_RELOAD" == "1" ]]; then
+  if [[ "$BACKEND_WORKERS" -gt 1 ]]; then
+    export MYTHOS_SIM_ADDRESS="${MYTHOS_SIM_ADDRESS:-$HOME/.mythos/sim.sock}"
+    echo "[INFO] Simulation process on ${MYTHOS_SIM_ADDRESS}, ${BACKEND_WORKERS} API workers"
+    python -m server.simd &
+    SIM_PID=$!
+    python -m uvicorn server.main:app --workers "$BACKEND_WORKERS" --host "$BACKEND_HOST" --port "$BACKEND_PORT" &
+  elif [[ "$BACKEND_RELOAD" == "1" ]]; then
     python -m uvicorn server.main:app --reload --host "$BACKEND_HOST" --port "$BACKEND_PORT" &
   else
     python -m uvicorn server.main:app --host "$BACKEND_HOST" --port "$BACKEND_PORT" &
@@ -122,6 +130,7 @@ start_backend() {
 
 echo "[INFO] Starting backend..."
 BACK_PID=""
+SIM_PID=""
 if pgrep -f "uvicorn server.main:app" >/dev/null 2>&1; then
   if check_health; then
     echo "[INFO] Backend already running."
@@ -162,6 +171,9 @@ cleanup() {
     echo "[INFO] Stopping backend..."
     kill "$BACK_PID" >/dev/null 2>&1 || true
   fi
+  if [[ -n "${SIM_PID:-}" ]]; then
+    kill "$SIM_PID" >/dev/null 2>&1 || true
+  fi
 }
 trap cleanup EXIT
 
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from . import protocol
+from .sim_service import Frame, FrameBuffer
+
+logger = logging.getLogger("mythos")
+
+FORMATS = ("json", "binary", "delta")
+
+
+@dataclass(frozen=True)
+class Viewport:
+    """A client's region of interest, in world units.
+
+    Entities inside the rectangle grown by ``margin`` are sent. With ``lod`` > 0
+    the client is zoomed out and gets cluster counts over ``lod``-sized cells
+    instead of individual entities.
+    """
+
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    margin: float = 0.0
+    lod: float = 0.0
+
+    @classmethod
+    def from_message(cls, msg: Dict[str, Any]) -> "Viewport | None":
+        # {"type": "viewport", "rect": [x0, y0, x1, y1], "margin": 32, "lod": 0}; rect null clears it
+        rect = msg.get("rect")
+        if rect is None:
+            return None
+        x0, y0, x1, y1 = (float(v) for v in rect)
+        margin, lod = float(msg.get("margin", 0.0)), float(msg.get("lod", 0.0))
+        if not all(math.isfinite(v) for v in (x0, y0, x1, y1, margin, lod)):
+            raise ValueError("viewport values must be finite")
+        return cls(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1), max(0.0, margin), max(0.0, lod))
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        m = self.margin
+        return self.x0 - m, self.y0 - m, self.x1 + m, self.y1 + m
+
+
+class DeltaEncoder:
+    """Shared delta stream: one keyframe every ``keyframe_every`` ticks, diffs in between.
+
+    Each published frame is diffed against the previous one exactly once. A
+    client whose last frame is not that base (it just joined, or skipped
+    frames while slow) gets a keyframe for the frame instead, also encoded at
+    most once.
+    """
+
+    def __init__(self, keyframe_every: int = 30, precision: float = 0.01, keep: int = 8):
+        self.keyframe_every = max(1, int(keyframe_every))
+        self.precision = float(precision)
+        self._keep = keep
+        self._lock = threading.Lock()
+        self._prev: protocol.QuantizedState | None = None
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+
+    def on_frame(self, frame: Frame) -> None:
+        with self._lock:
+            self._entry(frame, self._prev)
+
+    def message(self, frame: Frame, client_seq: int) -> bytes:
+        with self._lock:
+            entry = self._entries.get(frame.seq) or self._entry(frame, None)
+            if client_seq and entry["base"] == client_seq:
+                return entry["delta"]
+            if "key" not in entry:
+                entry["key"] = protocol.encode_delta(frame, entry["state"], None, self.precision)
+            return entry["key"]
+
+    def _entry(self, frame: Frame, base: protocol.QuantizedState | None) -> Dict[str, Any]:
+        state = protocol.quantize(frame, self.precision)
+        if base is not None and (base.seq >= frame.seq or frame.seq % self.keyframe_every == 0):
+            base = None
+        msg = protocol.encode_delta(frame, state, base, self.precision)
+        entry = {"state": state, "base": base.seq if base is not None else 0, "delta": msg}
+        if base is None:
+            entry["key"] = msg
+        if self._prev is None or state.seq >= self._prev.seq:
+            self._prev = state
+        self._entries[frame.seq] = entry
+        while len(self._entries) > self._keep:
+            self._entries.popitem(last=False)
+        return entry
+
+
+class Subscription:
+    """One client's mailbox: holds only the newest undelivered frame.
+
+    A client that falls behind skips straight to the latest frame; the skipped
+    ones are counted in ``dropped``. Lives on the event loop thread.
+    """
+
+    def __init__(self, fmt: str):
+        self.format = fmt
+        self.viewport: Viewport | None = None
+        self.delivered = 0
+        self.dropped = 0
+        self.last_seq = 0
+        self._latest: Frame | None = None
+        self._ready = asyncio.Event()
+
+    def offer(self, frame: Frame, force: bool = False) -> None:
+        # force: resend an already-seen frame (e.g. after the viewport moved)
+        if frame.seq <= self.last_seq and not force:
+            return
+        if self._latest is not None and self._latest is not frame:
+            self.dropped += 1
+        self.last_seq = max(self.last_seq, frame.seq)
+        self._latest = frame
+        self._ready.set()
+
+    async def next(self) -> Frame:
+        await self._ready.wait()
+        self._ready.clear()
+        frame, self._latest = self._latest, None
+        self.delivered += 1
+        return frame
+
+
+class FrameHub:
+    """Fans published frames out to WebSocket subscribers.
+
+    Each frame is encoded once per requested format, on the simulation thread
+    as it is published (``Frame.json_text`` / ``Frame.binary`` are cached), and
+    then handed to every subscriber on the event loop. Frames carry their
+    ``seq``, and subscribers only wake for new ones. The spatial index behind
+    viewport culling is also built at publish time; the per-viewport encode
+    itself is left to a worker thread (see ``viewport_message``).
+    """
+
+    def __init__(self, frames: FrameBuffer, delta: DeltaEncoder | None = None):
+        self.frames = frames
+        self.delta = delta or DeltaEncoder()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._subs: Tuple[Subscription, ...] = ()
+        # Clients with the same viewport share one encoding per frame
+        self._views: "OrderedDict[Tuple[int, Viewport], bytes]" = OrderedDict()
+        self._views_lock = threading.Lock()
+        frames.listeners.append(self._on_publish)
+
+    def viewport_message(self, frame: Frame, viewport: Viewport) -> bytes:
+        """Binary frame with only the entities in view, or cluster counts when zoomed out.
+
+        Safe to call from worker threads; callers on the event loop should not
+        call it directly.
+        """
+        key = (frame.seq, viewport)
+        with self._views_lock:
+            msg = self._views.get(key)
+            if msg is not None:
+                self._views.move_to_end(key)
+                return msg
+        cols = frame.columns
+        if not cols:
+            return frame.binary
+        x0, y0, x1, y1 = viewport.bounds()
+        rows = frame.index.query_rect(x0, y0, x1, y1, cols["x"], cols["y"])
+        if viewport.lod > 0:
+            clusters = protocol.cluster_columns(cols["x"][rows], cols["y"][rows], cols["kind_code"][rows], viewport.lod)
+            msg = protocol.encode_clusters(frame, clusters, viewport.lod)
+        else:
+            msg = frame.subset(rows).binary
+        with self._views_lock:
+            self._views[key] = msg
+            while len(self._views) > 64:
+                self._views.popitem(last=False)
+        return msg
+
+    @property
+    def subscribers(self) -> Tuple[Subscription, ...]:
+        return self._subs
+
+    def subscribe(self, fmt: str = "json") -> Subscription:
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown frame format: {fmt}")
+        self._loop = asyncio.get_running_loop()
+        sub = Subscription(fmt)
+        current = self.frames.read()
+        if current is not None:
+            if fmt != "delta":
+                self._encode(current, fmt)
+            sub.offer(current)
+        # Replaced, never mutated, so the publishing thread can iterate a snapshot
+        self._subs = self._subs + (sub,)
+        return sub
+
+    def set_viewport(self, sub: Subscription, viewport: Viewport | None) -> None:
+        sub.viewport = viewport
+        current = self.frames.read()
+        if current is not None:
+            sub.offer(current, force=True)
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self._subs = tuple(s for s in self._subs if s is not sub)
+
+    def _on_publish(self, frame: Frame) -> None:
+        # Simulation thread
+        subs, loop = self._subs, self._loop
+        if not subs or loop is None:
+            return
+        for fmt in {s.format for s in subs}:
+            self._encode(frame, fmt)
+        if frame.columns and any(s.viewport is not None and s.format == "binary" for s in subs):
+            frame.index
+        try:
+            loop.call_soon_threadsafe(self._deliver, frame)
+        except RuntimeError:
+            # Event loop already closed (shutdown)
+            self._loop = None
+
+    def _deliver(self, frame: Frame) -> None:
+        for sub in self._subs:
+            sub.offer(frame)
+
+    def _encode(self, frame: Frame, fmt: str) -> None:
+        if fmt == "binary":
+            frame.binary
+        elif fmt == "delta":
+            self.delta.on_frame(frame)
+        else:
+            frame.json_text
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import os
+import secrets
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable
+
+from .broadcast import DeltaEncoder, FrameHub
+from .db import DEFAULT_DB_DIR, SessionLocal, init_db
+from .history import parse_retention, thin_history
+from .persistence import WriteBehindQueue
+from .scheduler import Scheduler
+from .sessions import Session, SessionManager
+from .sim_service import SimulationService
+
+# Environment-driven construction shared by the API process (server/main.py)
+# and the standalone simulation process (server/simd.py).
+
+
+def make_persistence() -> WriteBehindQueue:
+    return WriteBehindQueue(
+        SessionLocal,
+        max_rows=int(os.getenv("MYTHOS_PERSIST_QUEUE", "1024")),
+        batch_size=int(os.getenv("MYTHOS_PERSIST_BATCH", "64")),
+        flush_ms=float(os.getenv("MYTHOS_PERSIST_FLUSH_MS", "1000")),
+        drop=os.getenv("MYTHOS_PERSIST_DROP", "oldest"),
+        maintenance=partial(thin_history, tiers=parse_retention(os.getenv("MYTHOS_SNAPSHOT_RETENTION", "3600:10,86400:60"))),
+    )
+
+
+def make_service(name: str, persistence: WriteBehindQueue) -> SimulationService:
+    # "off" disables recording; see engine/replay.py
+    replay_dir = os.getenv("MYTHOS_REPLAY_DIR", str(DEFAULT_DB_DIR / "replay"))
+    return SimulationService(
+        persistence,
+        snapshot_fields=tuple(f for f in os.getenv("MYTHOS_SNAPSHOT_FIELDS", "").split(",") if f),
+        checkpoint_dir=os.getenv("MYTHOS_CHECKPOINT_DIR"),
+        replay_dir=None if replay_dir == "off" else Path(replay_dir) / name,
+        replay_every=int(os.getenv("MYTHOS_REPLAY_EVERY", "300")),
+        replay_keep=int(os.getenv("MYTHOS_REPLAY_KEEP", "16")),
+        name=name,
+    )
+
+
+def make_hub(service) -> FrameHub:
+    return FrameHub(
+        service.frames,
+        DeltaEncoder(
+            keyframe_every=int(os.getenv("MYTHOS_KEYFRAME_EVERY", "30")),
+            precision=float(os.getenv("MYTHOS_DELTA_PRECISION", "0.01")),
+        ),
+    )
+
+
+def make_sessions(
+    on_service: Callable[[SimulationService], None] | None = None,
+    keepalive: Callable[[Session], bool] | None = None,
+) -> SessionManager:
+    # Schema migrations run here, at startup, rather than when a session is created
+    init_db()
+    persistence = make_persistence()
+
+    def build(name: str) -> SimulationService:
+        service = make_service(name, persistence)
+        if on_service is not None:
+            on_service(service)
+        return service
+
+    return SessionManager(
+        build,
+        make_hub,
+        Scheduler(
+            cpu_budget=float(os.getenv("MYTHOS_CPU_BUDGET", "1.0")),
+            idle_after=float(os.getenv("MYTHOS_IDLE_AFTER", "300")),
+        ),
+        persistence,
+        max_sessions=int(os.getenv("MYTHOS_MAX_SESSIONS", "32")),
+        keepalive=keepalive,
+    )
+
+
+def sim_address() -> str | None:
+    """Where the simulation process listens (``host:port`` or a socket path); unset runs it in-process."""
+    return os.getenv("MYTHOS_SIM_ADDRESS") or None
+
+
+# Shared by the API workers and the simulation process on one machine when MYTHOS_SIM_AUTHKEY is unset
+SIM_KEY_FILE = DEFAULT_DB_DIR / "sim.key"
+_LOOPBACK = ("127.0.0.1", "localhost", "::1")
+
+
+def sim_authkey(address: Any = None, key_file: Path = SIM_KEY_FILE) -> bytes:
+    """Key for the simulation process's command socket at ``address`` (as parsed by server.simd).
+
+    Every message on that socket is unpickled, so the key must be secret:
+    ``MYTHOS_SIM_AUTHKEY`` when set, otherwise a random key created once in
+    ``key_file`` (mode 0600). A TCP address other than loopback requires
+    ``MYTHOS_SIM_AUTHKEY``, since the processes need not share a filesystem.
+    """
+    key = os.getenv("MYTHOS_SIM_AUTHKEY")
+    if key:
+        return key.encode("utf-8")
+    if isinstance(address, tuple) and address[0] not in _LOOPBACK:
+        raise RuntimeError(f"MYTHOS_SIM_AUTHKEY must be set to serve the simulation on {address[0]}")
+    key_file = Path(key_file)
+    if not key_file.exists():
+        key_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = key_file.with_name(f"{key_file.name}.{os.getpid()}")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            os.write(fd, secrets.token_hex(32).encode("ascii"))
+        finally:
+            os.close(fd)
+        try:
+            # Whoever links first wins; a concurrent starter reads that key instead of its own
+            os.link(tmp, key_file)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp)
+    return key_file.read_bytes().strip()
+
+
+def shm_prefix() -> str:
+    return os.getenv("MYTHOS_SHM_PREFIX", "mythos")
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import os
+import threading
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 
+from .models import Base
+
 DEFAULT_DB_DIR = Path.home() / ".mythos"
 DEFAULT_DB_DIR.mkdir(parents=True, exist_ok=True)
 DB_URL = os.getenv("DATABASE_URL", f"sqlite:///{(DEFAULT_DB_DIR / 'data.sqlite3').as_posix()}")
@@ -15,3 +18,26 @@ if DB_URL.startswith("sqlite:///"):
 
 engine = create_engine(DB_URL, future=True)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+_migrated: set = set()
+_migrate_lock = threading.Lock()
+
+
+def init_db(bind=None) -> None:
+    """Create missing tables and migrate older ones in place; runs once per engine and process."""
+    bind = engine if bind is None else bind
+    with _migrate_lock:
+        if bind in _migrated:
+            return
+        inspector = inspect(bind)
+        if not set(inspector.get_table_names()).issuperset(Base.metadata.tables):
+            Base.metadata.create_all(bind=bind)
+        columns = {c["name"] for c in inspect(bind).get_columns("snapshot_blobs")}
+        with bind.begin() as conn:
+            if "session" not in columns:
+                # Databases from before sessions: add the column in place, with the index models.py declares
+                conn.execute(text("ALTER TABLE snapshot_blobs ADD COLUMN session VARCHAR(64)"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_snapshot_blobs_session ON snapshot_blobs (session)"))
+            if "ordinal" not in columns:
+                conn.execute(text("ALTER TABLE snapshot_blobs ADD COLUMN ordinal INTEGER"))
+        _migrated.add(bind)
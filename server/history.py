@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import json
+import struct
+import zlib
+from typing import Any, Dict, Iterable, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func
+
+from .models import SnapshotBlob
+
+# Stored snapshot ("MYS1"), zlib-compressed as a whole:
+#   magic 4s, meta_len u32, meta JSON (utf-8), then the arrays in meta order.
+# meta: {"t", "seq", "w", "h", "colors", "kinds", "step",
+#        "columns": [[name, dtype, n], ...], "fields": [[name, dtype, gh, gw], ...]}
+# Every array is byte-shuffled (all first bytes, then all second bytes, ...),
+# which lets zlib find the runs in slowly varying floats. Float columns are
+# stored as f32, the precision the binary stream already uses.
+
+SNAPSHOT_MAGIC = b"MYS1"
+SNAPSHOT_HEAD = struct.Struct("<4sI")
+
+# (age in seconds, keep every Nth) -- see thin_history
+DEFAULT_RETENTION = ((3600.0, 10), (86400.0, 60))
+
+
+def _shuffle(values: np.ndarray) -> bytes:
+    raw = np.ascontiguousarray(values).view(np.uint8).reshape(-1, values.dtype.itemsize)
+    return raw.T.tobytes()
+
+
+def _unshuffle(data: bytes, offset: int, dtype: str, count: int) -> Tuple[np.ndarray, int]:
+    size = np.dtype(dtype).itemsize
+    raw = np.frombuffer(data, dtype=np.uint8, count=count * size, offset=offset)
+    values = np.ascontiguousarray(raw.reshape(size, count).T).view(dtype).reshape(count)
+    return values, offset + count * size
+
+
+def encode_snapshot(frame: Any, fields: Dict[str, np.ndarray] | None = None, step: int = 1, level: int = 6) -> bytes:
+    """Compress a published frame, plus optional (strided) field grids, into one blob."""
+    arrays = []
+    columns = []
+    for name, values in frame.columns.items():
+        if values.dtype.kind == "f":
+            values = values.astype("<f4")
+        values = values.astype(values.dtype.newbyteorder("<"), copy=False)
+        columns.append([name, values.dtype.str, int(values.shape[0])])
+        arrays.append(values)
+    grids = []
+    for name, grid in (fields or {}).items():
+        grid = np.asarray(grid, dtype="<f4")
+        grids.append([name, grid.dtype.str, int(grid.shape[0]), int(grid.shape[1])])
+        arrays.append(grid.reshape(-1))
+    meta = json.dumps({
+        "t": frame.t,
+        "seq": frame.seq,
+        "w": frame.w,
+        "h": frame.h,
+        "colors": list(frame.colors),
+        "kinds": list(frame.kinds),
+        "step": int(step),
+        "columns": columns,
+        "fields": grids,
+    }).encode("utf-8")
+    body = b"".join([SNAPSHOT_HEAD.pack(SNAPSHOT_MAGIC, len(meta)), meta] + [_shuffle(a) for a in arrays])
+    return zlib.compress(body, level)
+
+
+def decode_snapshot(blob: bytes) -> Dict[str, Any]:
+    """Inverse of encode_snapshot: the meta dict plus "columns" and "fields" as arrays."""
+    data = zlib.decompress(blob)
+    magic, meta_len = SNAPSHOT_HEAD.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("not a stored snapshot")
+    offset = SNAPSHOT_HEAD.size
+    meta = json.loads(data[offset:offset + meta_len].decode("utf-8"))
+    offset += meta_len
+    columns: Dict[str, np.ndarray] = {}
+    for name, dtype, n in meta["columns"]:
+        columns[name], offset = _unshuffle(data, offset, dtype, n)
+    fields: Dict[str, np.ndarray] = {}
+    for name, dtype, gh, gw in meta["fields"]:
+        grid, offset = _unshuffle(data, offset, dtype, gh * gw)
+        fields[name] = grid.reshape(gh, gw)
+    meta["columns"], meta["fields"] = columns, fields
+    return meta
+
+
+def parse_retention(spec: str) -> Tuple[Tuple[float, int], ...]:
+    """"3600:10,86400:60" -> ((3600.0, 10), (86400.0, 60)); an empty spec keeps everything."""
+    tiers = []
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        age, every = part.split(":")
+        tiers.append((float(age), max(1, int(every))))
+    return tuple(sorted(tiers))
+
+
+def thin_history(session: Any, now: float, tiers: Iterable[Tuple[float, int]] = DEFAULT_RETENTION) -> int:
+    """Delete stored snapshots older than each tier's age unless their ordinal is a multiple of its N.
+
+    Ordinals number each session's snapshots on their own, so sessions that
+    share the table are thinned independently; rows from before ordinals
+    (one stream, written before sessions) fall back to their id. Selecting
+    by a stored number keeps the thinning idempotent, and when the N of an
+    older tier is a multiple of a younger one's, it only removes rows the
+    younger tier kept. Returns the number of rows deleted.
+    """
+    number = func.coalesce(SnapshotBlob.ordinal, SnapshotBlob.id)
+    removed = 0
+    for age, every in tiers:
+        if every <= 1:
+            continue
+        result = session.execute(
+            delete(SnapshotBlob)
+            .where(SnapshotBlob.created < now - age)
+            .where(number % every != 0)
+        )
+        removed += result.rowcount or 0
+    return removed
@@ -3,18 +3,49 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+import os
 from typing import Any, Dict, List
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Response
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from .sim_service import SimulationService
+from . import config, protocol
+from .broadcast import FORMATS, FrameHub, Subscription, Viewport
+from .remote import RemoteSessions
+from .sessions import DEFAULT_SESSION, Session
+from .simd import parse_address
 from engine.backend import gpu_available
 
 logger = logging.getLogger("mythos")
 
 app = FastAPI(title="Mythos Engine")
-service = SimulationService()
+if config.sim_address():
+    # The simulation runs in its own process (python -m server.simd); frames arrive through shared memory
+    address = parse_address(config.sim_address())
+    sessions = RemoteSessions(
+        address,
+        config.sim_authkey(address),
+        config.make_hub,
+        prefix=config.shm_prefix(),
+        poll_ms=float(os.getenv("MYTHOS_SHM_POLL_MS", "5")),
+    )
+else:
+    sessions = config.make_sessions()
+# The default session, for callers that predate sessions
+service = sessions.get(DEFAULT_SESSION).service
+hub = sessions.get(DEFAULT_SESSION).hub
+
+
+async def _session(name: str, create: bool = False) -> Session:
+    # Off the event loop: creating a session builds its service (and touches the database),
+    # and with a separate simulation process an unknown name is looked up over RPC
+    try:
+        return await asyncio.to_thread(sessions.get, name, create)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"no session named {name}") from None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,17 +53,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Field-Min", "X-Field-Scale", "X-Field-Version"],
 )
 
 
 @app.on_event("startup")
 async def _startup():
-    asyncio.create_task(service.loop())
+    sessions.start()
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    sessions.stop()
 
 
 @app.get("/api/presets")
 async def presets() -> List[Dict[str, Any]]:
-    return service.list_presets()
+    # Forwarded to the simulation process when it runs apart (server/remote.py), so never on the loop
+    return await asyncio.to_thread(service.list_presets)
 
 @app.get("/")
 async def root() -> Dict[str, Any]:
@@ -43,38 +81,137 @@ async def health() -> Dict[str, Any]:
     return {"ok": True, "gpu": gpu_available()}
 
 
+@app.get("/api/metrics")
+async def metrics() -> Dict[str, Any]:
+    return await asyncio.to_thread(sessions.metrics)
+
+
+@app.get("/api/sessions")
+async def list_sessions() -> List[Dict[str, Any]]:
+    return await asyncio.to_thread(sessions.list)
+
+
+@app.post("/api/sessions")
+async def create_session(payload: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        created = await asyncio.to_thread(sessions.create, str(payload.get("name", "")), float(payload.get("weight", 1.0)))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"ok": True, "name": created.name}
+
+
+@app.delete("/api/sessions/{name}")
+async def delete_session(name: str) -> Dict[str, Any]:
+    try:
+        await asyncio.to_thread(sessions.remove, name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"no session named {name}") from None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"ok": True}
+
+
+@app.get("/api/history")
+async def history(
+    t0: float | None = None, t1: float | None = None, limit: int = 500, session: str = DEFAULT_SESSION
+) -> List[Dict[str, Any]]:
+    service = (await _session(session)).service
+    return await asyncio.to_thread(service.list_history, t0, t1, limit)
+
+
+@app.get("/api/history/{snapshot_id}")
+async def history_snapshot(snapshot_id: int, fields: bool = False, session: str = DEFAULT_SESSION) -> Response:
+    service = (await _session(session)).service
+    loaded = await asyncio.to_thread(service.load_history, snapshot_id)
+    if loaded is None:
+        raise HTTPException(status_code=404, detail="snapshot not found")
+    frame, grids = loaded
+    if not fields or not grids:
+        return Response(content=frame.json_text, media_type="application/json")
+    payload = frame.payload()
+    payload["fields"] = {name: grid.astype(float).tolist() for name, grid in grids.items()}
+    return Response(content=json.dumps(payload, allow_nan=False), media_type="application/json")
+
+
 @app.get("/api/preset/{name}")
 async def preset(name: str) -> Dict[str, Any]:
-    return service.load_worldpack(name)
+    return await asyncio.to_thread(service.load_worldpack, name)
 
 
 @app.post("/api/apply")
-async def apply(payload: Dict[str, Any]) -> Dict[str, Any]:
+async def apply(payload: Dict[str, Any], session: str = DEFAULT_SESSION) -> Dict[str, Any]:
+    # Applying to a session that does not exist yet creates it
+    service = (await _session(session, create=True)).service
     try:
         dsl = payload.get("dsl", "")
         profiles = payload.get("profiles")
         seed = int(payload.get("seed", 42))
         n = int(payload.get("n", 200))
         backend = payload.get("backend", "cpu")
-        await service.apply_program(dsl, profiles, seed, n, backend)
+        channels = payload.get("channels")
+        await service.apply_program(dsl, profiles, seed, n, backend, channels=channels)
         return {
             "ok": True,
             "gpu": gpu_available(),
             "frame": service.frame_payload(),
-            "fields": service.fields_payload(),
+            "fields": await service.fields_payload(),
         }
     except Exception as exc:
         logger.exception("apply failed")
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
+@app.get("/api/checkpoints")
+async def checkpoints() -> List[Dict[str, Any]]:
+    # Checkpoints are shared: any session can restore one saved by another
+    return await asyncio.to_thread(service.list_checkpoints)
+
+
+@app.post("/api/checkpoint")
+async def checkpoint(payload: Dict[str, Any], session: str = DEFAULT_SESSION) -> Dict[str, Any]:
+    service = (await _session(session)).service
+    try:
+        return await service.save_checkpoint(str(payload.get("name", "")))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@app.post("/api/restore")
+async def restore(payload: Dict[str, Any], session: str = DEFAULT_SESSION) -> Dict[str, Any]:
+    service = (await _session(session, create=True)).service
+    try:
+        await service.restore_checkpoint(str(payload.get("name", "")))
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"ok": True, "frame": service.frame_payload(), "fields": await service.fields_payload()}
+
+
+@app.get("/api/replay")
+async def replay(session: str = DEFAULT_SESSION) -> Dict[str, Any]:
+    service = (await _session(session)).service
+    return await asyncio.to_thread(service.replay_status)
+
+
+@app.post("/api/seek")
+async def seek(payload: Dict[str, Any], session: str = DEFAULT_SESSION) -> Dict[str, Any]:
+    service = (await _session(session)).service
+    try:
+        await service.seek(int(payload.get("tick", 0)))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    status = await asyncio.to_thread(service.replay_status)
+    return {"ok": True, "tick": status["tick"], "frame": service.frame_payload()}
+
+
 @app.post("/api/run")
-async def run(payload: Dict[str, Any]) -> Dict[str, Any]:
+async def run(payload: Dict[str, Any], session: str = DEFAULT_SESSION) -> Dict[str, Any]:
+    service = (await _session(session)).service
     try:
-        service.set_run(bool(payload.get("run", False)))
-        service.set_rate(int(payload.get("tick_ms", 33)), int(payload.get("steps", 1)))
-        if service.running and service.last_frame is None and service.kernel is not None:
-            await service.step()
+        # Both return futures (RPCs to the simulation process when it runs apart); their errors are ours
+        await asyncio.wrap_future(service.set_rate(int(payload.get("tick_ms", 33)), int(payload.get("steps", 1))))
+        await asyncio.wrap_future(service.set_run(bool(payload.get("run", False))))
         return {"ok": True}
     except Exception as exc:
         logger.exception("run failed")
@@ -82,37 +219,91 @@ async def run(payload: Dict[str, Any]) -> Dict[str, Any]:
 
 
 @app.get("/api/frame")
-async def frame() -> Dict[str, Any]:
-    payload = service.frame_payload()
-    if payload is None:
+async def frame(session: str = DEFAULT_SESSION) -> Dict[str, Any]:
+    current = (await _session(session)).service.last_frame
+    if current is None:
         return Response(status_code=204)
-    return payload
+    return Response(content=current.json_text, media_type="application/json")
 
 
 @app.get("/api/fields")
-async def fields(step: int = 4) -> Dict[str, Any]:
-    payload = service.fields_payload(step=step)
-    if payload is None:
+async def fields(
+    request: Request, step: int = 4, format: str = "json", fields: str | None = None, session: str = DEFAULT_SESSION
+) -> Response:
+    # format: json | u8 | u16 (MYG1 quantized grids) | png (one field); fields: comma-separated channel names
+    names = tuple(name.strip() for name in fields.split(",") if name.strip()) if fields else None
+    try:
+        service = (await _session(session)).service
+        result = await service.fields_response(step=step, fmt=format, names=names)
+    except (ValueError, KeyError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if result is None:
         return Response(status_code=204)
-    return payload
+    headers = {"ETag": result.etag, "Cache-Control": "no-cache", **result.headers}
+    if result.etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=result.body, media_type=result.media_type, headers=headers)
+
+
+async def _read_controls(ws: WebSocket, hub: FrameHub, sub: Subscription) -> None:
+    # Client -> server messages; currently only {"type": "viewport", ...}
+    while True:
+        message = await ws.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        text = message.get("text")
+        if text is None:
+            continue
+        try:
+            msg = json.loads(text)
+            if isinstance(msg, dict) and msg.get("type") == "viewport":
+                hub.set_viewport(sub, Viewport.from_message(msg))
+        except (ValueError, TypeError):
+            logger.warning("Ignoring malformed stream control message")
+
+
+async def _send_frames(ws: WebSocket, hub: FrameHub, sub: Subscription) -> None:
+    tables_sent = -1
+    sent_seq = 0
+    while True:
+        frame = await sub.next()
+        if sub.format == "json":
+            await ws.send_text(frame.json_text)
+            continue
+        if frame.tables_version != tables_sent:
+            await ws.send_text(json.dumps(protocol.tables_message(frame)))
+            tables_sent = frame.tables_version
+        if sub.format == "delta":
+            await ws.send_bytes(hub.delta.message(frame, sent_seq))
+            sent_seq = frame.seq
+        elif sub.viewport is not None:
+            await ws.send_bytes(await asyncio.to_thread(hub.viewport_message, frame, sub.viewport))
+        else:
+            await ws.send_bytes(frame.binary)
 
 
 @app.websocket("/ws/stream")
-async def ws_stream(ws: WebSocket):
-    await ws.accept()
+async def ws_stream(ws: WebSocket, format: str = "json", session: str = DEFAULT_SESSION):
+    # format=binary: packed typed-array frames; format=delta: keyframes plus
+    # quantized diffs (see server/protocol.py). Both send the color/kind string
+    # tables as a JSON text message whenever they change. Binary clients may
+    # send a viewport message to receive only what they can see.
+    # session=<name> picks the world; unknown names are refused before accepting
     try:
-        while True:
-            payload = service.frame_payload()
-            if payload is None:
-                await asyncio.sleep(0.05)
-                continue
-            try:
-                await ws.send_text(json.dumps(payload, allow_nan=False))
-            except WebSocketDisconnect:
-                return
-            except Exception:
-                logger.exception("WebSocket frame serialization failed")
-                return
-            await asyncio.sleep(service.tick_ms / 1000.0)
-    except WebSocketDisconnect:
+        hub = (await asyncio.to_thread(sessions.get, session)).hub
+    except KeyError:
+        await ws.close(code=4404)
         return
+    await ws.accept()
+    sub = hub.subscribe(format if format in FORMATS else "json")
+    tasks = [asyncio.create_task(_send_frames(ws, hub, sub)), asyncio.create_task(_read_controls(ws, hub, sub))]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            exc = task.exception()
+            if exc is not None and not isinstance(exc, WebSocketDisconnect):
+                logger.error("WebSocket stream failed", exc_info=exc)
+    finally:
+        for task in tasks:
+            task.cancel()
+        hub.unsubscribe(sub)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import Column, Integer, Float, String, Text
+from sqlalchemy import Column, Integer, Float, LargeBinary, String, Text
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -13,6 +13,20 @@ class Snapshot(Base):
     payload = Column(Text, nullable=False)
 
 
+class SnapshotBlob(Base):
+    # Compressed columnar frame (server/history.py); `created` is wall-clock time for retention
+    __tablename__ = "snapshot_blobs"
+    id = Column(Integer, primary_key=True)
+    t = Column(Float, nullable=False, index=True)
+    created = Column(Float, nullable=False, index=True)
+    seq = Column(Integer, nullable=False)
+    n = Column(Integer, nullable=False)
+    session = Column(String(64), nullable=True, index=True)
+    # 1, 2, 3 ... per session; retention keeps every Nth of a session's stream by it
+    ordinal = Column(Integer, nullable=True)
+    data = Column(LargeBinary, nullable=False)
+
+
 class Metric(Base):
     __tablename__ = "metrics"
     id = Column(Integer, primary_key=True)
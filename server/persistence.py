@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+from sqlalchemy import insert
+
+logger = logging.getLogger("mythos")
+
+DROP_POLICIES = ("oldest", "newest")
+
+
+class WriteBehindQueue:
+    """Bounded queue of rows drained into bulk INSERTs by a background thread.
+
+    ``put`` never blocks: when the queue is full the ``drop`` policy discards
+    either the oldest queued row or the incoming one. The writer flushes once
+    ``batch_size`` rows are waiting or ``flush_ms`` has passed since the first
+    one arrived, one executemany INSERT per table and one commit per batch.
+
+    Row values may be zero-argument callables; they are called on the writer
+    thread, so expensive serialization stays off the caller's thread; a row
+    whose callable raises is logged, counted in ``failed`` and skipped.
+    ``maintenance(session, now)`` (e.g. retention) runs on the writer thread
+    after a batch, at most every ``maintenance_every`` seconds.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        max_rows: int = 1024,
+        batch_size: int = 64,
+        flush_ms: float = 1000.0,
+        drop: str = "oldest",
+        maintenance: Callable[[Any, float], Any] | None = None,
+        maintenance_every: float = 300.0,
+    ):
+        if drop not in DROP_POLICIES:
+            raise ValueError(f"unknown drop policy: {drop}")
+        self.session_factory = session_factory
+        self.max_rows = max(1, int(max_rows))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_ms = float(flush_ms)
+        self.drop = drop
+        self.maintenance = maintenance
+        self.maintenance_every = float(maintenance_every)
+        self._last_maintenance = 0.0
+        self._rows: Deque[Tuple[Any, Dict[str, Any], float]] = deque()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._closing = False
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.last_write_ms = 0.0
+        self.avg_write_ms = 0.0
+        self.max_lag_ms = 0.0
+
+    # -- producer side ---------------------------------------------------
+
+    def put(self, model: Any, **row: Any) -> bool:
+        """Queue one row for ``model``; False when the row (or an older one) was dropped."""
+        with self._cond:
+            kept = True
+            if len(self._rows) >= self.max_rows:
+                self.dropped += 1
+                if self.drop == "newest":
+                    return False
+                self._rows.popleft()
+                kept = False
+            self._rows.append((model, row, time.perf_counter()))
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, len(self._rows))
+            if len(self._rows) >= self.batch_size or len(self._rows) == 1:
+                self._cond.notify()
+            return kept
+
+    @property
+    def depth(self) -> int:
+        return len(self._rows)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "depth": len(self._rows),
+                "max_depth": self.max_depth,
+                "capacity": self.max_rows,
+                "drop": self.drop,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+                "last_write_ms": round(self.last_write_ms, 3),
+                "avg_write_ms": round(self.avg_write_ms, 3),
+                "max_lag_ms": round(self.max_lag_ms, 3),
+            }
+
+    # -- writer thread ---------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="mythos-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write out what is queued, then stop the writer."""
+        thread = self._thread
+        if thread is None:
+            return
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        thread.join(timeout)
+        self._thread = None
+
+    def flush(self) -> None:
+        """Write every queued row now, on the caller's thread (scripts and tests)."""
+        while True:
+            with self._cond:
+                batch = self._take()
+            if not batch:
+                return
+            self._write(batch)
+
+    def _take(self) -> List[Tuple[Any, Dict[str, Any], float]]:
+        n = min(self.batch_size, len(self._rows))
+        return [self._rows.popleft() for _ in range(n)]
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._closing or len(self._rows) >= self.batch_size:
+                        break
+                    if self._rows:
+                        wait = self.flush_ms / 1000.0 - (time.perf_counter() - self._rows[0][2])
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                batch = self._take()
+                if not batch and self._closing:
+                    return
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[Tuple[Any, Dict[str, Any], float]]) -> None:
+        start = time.perf_counter()
+        grouped: Dict[Any, List[Dict[str, Any]]] = {}
+        bad = 0
+        for model, row, _ in batch:
+            try:
+                values = {key: value() if callable(value) else value for key, value in row.items()}
+            except Exception:
+                # One row that fails to serialize must not take the writer thread (or its batch) down
+                logger.exception("Encoding a queued %s row failed; dropping it.", getattr(model, "__name__", model))
+                bad += 1
+                continue
+            grouped.setdefault(model, []).append(values)
+        if bad:
+            with self._cond:
+                self.failed += bad
+        written = len(batch) - bad
+        if not written:
+            return
+        try:
+            with self.session_factory() as session:
+                for model, rows in grouped.items():
+                    session.execute(insert(model), rows)
+                session.commit()
+        except Exception:
+            logger.exception("Persisting %d queued rows failed; dropping them.", written)
+            with self._cond:
+                self.failed += written
+            return
+        done = time.perf_counter()
+        elapsed = (done - start) * 1000.0
+        with self._cond:
+            self.written += written
+            self.batches += 1
+            self.last_write_ms = elapsed
+            self.avg_write_ms = elapsed if self.batches == 1 else self.avg_write_ms * 0.9 + elapsed * 0.1
+            self.max_lag_ms = max(self.max_lag_ms, (done - batch[0][2]) * 1000.0)
+        if self.maintenance is not None and time.time() - self._last_maintenance >= self.maintenance_every:
+            self.run_maintenance()
+
+    def run_maintenance(self) -> None:
+        self._last_maintenance = now = time.time()
+        try:
+            with self.session_factory() as session:
+                self.maintenance(session, now)
+                session.commit()
+        except Exception:
+            logger.exception("Persistence maintenance failed.")
@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+# Binary frame layout (little-endian), one WebSocket binary message per frame:
+#
+#   header   magic "MYF1", seq u32, t f64, w u32, h u32, n u32, tables u32   (32 bytes)
+#   id       u32[n]
+#   x y z vx vy vz mass hardness energy wealth    f32[n] each
+#   kind     u16[n]   index into the session's kind table
+#   color    u16[n]   index into the session's color table
+#
+# Every column starts on a 4-byte boundary, so a client can view each one as
+# a typed array directly over the message buffer. String tables travel as a
+# separate JSON text message whenever their version changes.
+
+MAGIC = b"MYF1"
+HEADER = struct.Struct("<4sIdIIII")
+FLOAT_COLUMNS: Tuple[str, ...] = ("x", "y", "z", "vx", "vy", "vz", "mass", "hardness", "energy", "wealth")
+CODE_COLUMNS: Tuple[str, ...] = ("kind_code", "color_code")
+LAYOUT: Tuple[Tuple[str, str], ...] = (
+    (("id", "<u4"),)
+    + tuple((name, "<f4") for name in FLOAT_COLUMNS)
+    + tuple((name, "<u2") for name in CODE_COLUMNS)
+)
+BYTES_PER_ENTITY = sum(np.dtype(dtype).itemsize for _, dtype in LAYOUT)
+
+
+def encode_frame(frame: Any) -> bytes:
+    cols = frame.columns
+    n = int(cols["id"].shape[0])
+    buf = bytearray(HEADER.size + n * BYTES_PER_ENTITY)
+    HEADER.pack_into(buf, 0, MAGIC, frame.seq & 0xFFFFFFFF, frame.t, frame.w, frame.h, n, frame.tables_version)
+    if n == 0:
+        return bytes(buf)
+    offset = HEADER.size
+    for name, dtype in LAYOUT:
+        view = np.frombuffer(buf, dtype=dtype, count=n, offset=offset)
+        view[...] = cols[name]
+        offset += view.nbytes
+    return bytes(buf)
+
+
+def tables_message(frame: Any) -> Dict[str, Any]:
+    return {
+        "type": "tables",
+        "version": frame.tables_version,
+        "colors": list(frame.colors),
+        "kinds": list(frame.kinds),
+    }
+
+
+def decode_frame(data: bytes) -> Dict[str, Any]:
+    """Inverse of ``encode_frame``; columns are read-only views over ``data``."""
+    magic, seq, t, w, h, n, tables = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("not a binary frame")
+    out: Dict[str, Any] = {"seq": seq, "t": t, "w": w, "h": h, "n": n, "tables": tables}
+    offset = HEADER.size
+    for name, dtype in LAYOUT:
+        out[name] = np.frombuffer(data, dtype=dtype, count=n, offset=offset)
+        offset += out[name].nbytes
+    return out
+
+
+# Delta stream ("MYD1"). Values are quantized to integers (floats: round(v /
+# precision); codes as-is) and every message is a diff between two quantized
+# states, so the client reconstructs the server's integers exactly and never
+# drifts. A keyframe is a diff against the empty state.
+#
+#   header     magic, flags u8 (1 = keyframe), pad x3, seq u32, base_seq u32,
+#              t f64, precision f64, w u32, h u32, tables u32, n u32,
+#              spawned u32, despawned u32                              (56 bytes)
+#   despawned  id u32[despawned]
+#   spawned    id u32[spawned], then i32[spawned] for each DELTA_COLUMNS entry
+#   changes    per DELTA_COLUMNS entry: width u8 (0, 1, 2 or 4), pad x3, then
+#              if width > 0: change bitmask over the kept entities (LSB first),
+#              and one signed delta of that width per set bit
+#
+# "Kept" entities are those in both states, in ascending id order, which the
+# client knows once it has dropped the despawned ids. Every section is padded
+# to 4 bytes. Deltas are int32 differences with wraparound, so the client
+# adds them into an Int32Array.
+
+DELTA_MAGIC = b"MYD1"
+DELTA_HEADER = struct.Struct("<4sB3xIIddIIIIII")
+KEYFRAME = 1
+DELTA_COLUMNS: Tuple[str, ...] = FLOAT_COLUMNS + CODE_COLUMNS
+_I32 = np.iinfo(np.int32)
+_WIDTHS = ((1, "<i1"), (2, "<i2"), (4, "<i4"))
+
+
+@dataclass
+class QuantizedState:
+    seq: int
+    ids: np.ndarray                 # int64, frame row order
+    values: Dict[str, np.ndarray]   # int32 per DELTA_COLUMNS entry
+
+
+def quantize(frame: Any, precision: float) -> QuantizedState:
+    cols = frame.columns
+    values: Dict[str, np.ndarray] = {}
+    for name in FLOAT_COLUMNS:
+        q = np.rint(np.asarray(cols[name], dtype=np.float64) / precision)
+        values[name] = np.clip(q, _I32.min, _I32.max).astype(np.int32)
+    for name in CODE_COLUMNS:
+        values[name] = np.asarray(cols[name]).astype(np.int32)
+    return QuantizedState(frame.seq, np.asarray(cols["id"], dtype=np.int64), values)
+
+
+def _pad4(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 4)
+
+
+def _delta_width(delta: np.ndarray) -> Tuple[int, str]:
+    lo, hi = int(delta.min()), int(delta.max())
+    for width, dtype in _WIDTHS:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return width, dtype
+    return _WIDTHS[-1]
+
+
+def encode_delta(frame: Any, state: QuantizedState, base: QuantizedState | None, precision: float) -> bytes:
+    n = state.ids.shape[0]
+    if base is None:
+        spawned = np.arange(n)
+        despawned = np.zeros(0, dtype=np.int64)
+        cur = prev = np.zeros(0, dtype=np.int64)
+    else:
+        # intersect1d returns the kept entities in ascending id order
+        _, cur, prev = np.intersect1d(state.ids, base.ids, assume_unique=True, return_indices=True)
+        spawned = np.setdiff1d(np.arange(n), cur, assume_unique=True)
+        despawned = np.delete(base.ids, prev)
+    parts = [
+        DELTA_HEADER.pack(
+            DELTA_MAGIC, KEYFRAME if base is None else 0, state.seq & 0xFFFFFFFF,
+            (base.seq if base is not None else 0) & 0xFFFFFFFF, frame.t, precision,
+            frame.w, frame.h, frame.tables_version, n, spawned.shape[0], despawned.shape[0],
+        ),
+        despawned.astype("<u4").tobytes(),
+        state.ids[spawned].astype("<u4").tobytes(),
+    ]
+    for name in DELTA_COLUMNS:
+        parts.append(state.values[name][spawned].astype("<i4").tobytes())
+    for name in DELTA_COLUMNS:
+        if base is None:
+            parts.append(struct.pack("<B3x", 0))
+            continue
+        delta = state.values[name][cur] - base.values[name][prev]
+        changed = delta != 0
+        if not changed.any():
+            parts.append(struct.pack("<B3x", 0))
+            continue
+        width, dtype = _delta_width(delta[changed])
+        parts.append(struct.pack("<B3x", width))
+        parts.append(_pad4(np.packbits(changed, bitorder="little").tobytes()))
+        parts.append(_pad4(delta[changed].astype(dtype).tobytes()))
+    return b"".join(parts)
+
+
+class DeltaDecoder:
+    """Reference client for the delta stream (the browser does the same in frameProtocol.ts)."""
+
+    def __init__(self):
+        self.seq = 0
+        self.header: Dict[str, Any] = {}
+        self.rows: Dict[int, np.ndarray] = {}
+
+    def apply(self, data: bytes) -> bool:
+        (magic, flags, seq, base_seq, t, precision, w, h, tables, n, n_spawned, n_despawned) = (
+            DELTA_HEADER.unpack_from(data, 0)
+        )
+        if magic != DELTA_MAGIC:
+            raise ValueError("not a delta frame")
+        keyframe = bool(flags & KEYFRAME)
+        if not keyframe and base_seq != self.seq:
+            return False
+        if keyframe:
+            self.rows = {}
+        offset = DELTA_HEADER.size
+
+        def take(dtype: str, count: int) -> np.ndarray:
+            nonlocal offset
+            out = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+            offset += out.nbytes + (-out.nbytes % 4)
+            return out
+
+        for i in take("<u4", n_despawned).tolist():
+            self.rows.pop(i, None)
+        kept = sorted(self.rows)
+        spawned = take("<u4", n_spawned).tolist()
+        cols = [take("<i4", n_spawned) for _ in DELTA_COLUMNS]
+        for j in range(len(DELTA_COLUMNS)):
+            (width,) = struct.unpack_from("<B3x", data, offset)
+            offset += 4
+            if not width:
+                continue
+            mask = np.unpackbits(take("u1", (len(kept) + 7) // 8), count=len(kept), bitorder="little")
+            rows = np.flatnonzero(mask)
+            deltas = take(dict(_WIDTHS)[width], rows.shape[0])
+            for r, d in zip(rows.tolist(), deltas.astype(np.int32)):
+                self.rows[kept[r]][j:j + 1] += d
+        for k, i in enumerate(spawned):
+            self.rows[i] = np.array([c[k] for c in cols], dtype=np.int32)
+        self.seq = seq
+        self.header = {"t": t, "w": w, "h": h, "tables": tables, "n": n, "precision": precision}
+        return True
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        ids = sorted(self.rows)
+        table = np.array([self.rows[i] for i in ids], dtype=np.int32).reshape(len(ids), len(DELTA_COLUMNS))
+        out: Dict[str, np.ndarray] = {"id": np.asarray(ids, dtype=np.int64)}
+        for j, name in enumerate(DELTA_COLUMNS):
+            col = table[:, j]
+            out[name] = col * self.header["precision"] if name in FLOAT_COLUMNS else col.astype(np.int64)
+        return out
+
+
+# Cluster summary ("MYC1") for zoomed-out viewports: entities binned into square
+# cells of ``cell`` world units, one row per non-empty cell.
+#
+#   header   magic, seq u32, t f64, w u32, h u32, cell f32, n u32     (32 bytes)
+#   x y      f32[n] each, mean position of the cell's entities
+#   count    u32[n]
+#   kind     u16[n], most common kind code in the cell (padded to 4 bytes)
+
+CLUSTER_MAGIC = b"MYC1"
+CLUSTER_HEADER = struct.Struct("<4sIdIIfI")
+
+
+def cluster_columns(x: np.ndarray, y: np.ndarray, kind: np.ndarray, cell: float) -> Dict[str, np.ndarray]:
+    cx = np.floor(x / cell).astype(np.int64)
+    cy = np.floor(y / cell).astype(np.int64)
+    keys, inv = np.unique(np.stack([cy, cx]), axis=1, return_inverse=True)
+    inv = inv.reshape(-1)
+    m = keys.shape[1]
+    count = np.bincount(inv, minlength=m)
+    n_kinds = int(kind.max()) + 1 if kind.size else 0
+    by_kind = np.zeros((max(1, n_kinds), m), dtype=np.int64)
+    np.add.at(by_kind, (kind, inv), 1)
+    return {
+        "x": np.bincount(inv, weights=x, minlength=m) / np.maximum(count, 1),
+        "y": np.bincount(inv, weights=y, minlength=m) / np.maximum(count, 1),
+        "count": count,
+        "kind": by_kind.argmax(axis=0),
+    }
+
+
+def encode_clusters(frame: Any, clusters: Dict[str, np.ndarray], cell: float) -> bytes:
+    n = int(clusters["count"].shape[0])
+    return b"".join([
+        CLUSTER_HEADER.pack(CLUSTER_MAGIC, frame.seq & 0xFFFFFFFF, frame.t, frame.w, frame.h, cell, n),
+        clusters["x"].astype("<f4").tobytes(),
+        clusters["y"].astype("<f4").tobytes(),
+        clusters["count"].astype("<u4").tobytes(),
+        _pad4(clusters["kind"].astype("<u2").tobytes()),
+    ])
+
+
+def decode_clusters(data: bytes) -> Dict[str, Any]:
+    magic, seq, t, w, h, cell, n = CLUSTER_HEADER.unpack_from(data, 0)
+    if magic != CLUSTER_MAGIC:
+        raise ValueError("not a cluster frame")
+    out: Dict[str, Any] = {"seq": seq, "t": t, "w": w, "h": h, "cell": cell, "n": n}
+    offset = CLUSTER_HEADER.size
+    for name, dtype in (("x", "<f4"), ("y", "<f4"), ("count", "<u4"), ("kind", "<u2")):
+        out[name] = np.frombuffer(data, dtype=dtype, count=n, offset=offset)
+        offset += out[name].nbytes
+    return out
+
+
+# Field grids ("MYG1"), quantized to 8 or 16 bits per cell: value = lo + q * scale.
+#
+#   header   magic, step u32, w u32, h u32, grid_w u32, grid_h u32, count u32   (28 bytes)
+#   fields   per field: name 16s (utf-8, NUL padded), version u32, bits u8, pad x3,
+#            lo f32, scale f32, then u8/u16[grid_h * grid_w] row-major (padded to 4 bytes)
+
+GRID_MAGIC = b"MYG1"
+GRID_HEADER = struct.Struct("<4sIIIIII")
+GRID_FIELD = struct.Struct("<16sIB3xff")
+
+
+def quantize_grid(grid: np.ndarray, bits: int) -> Tuple[np.ndarray, float, float]:
+    grid = np.asarray(grid, dtype=np.float64)
+    finite = np.isfinite(grid)
+    lo = float(grid[finite].min()) if finite.any() else 0.0
+    hi = float(grid[finite].max()) if finite.any() else 0.0
+    top = (1 << bits) - 1
+    scale = (hi - lo) / top if hi > lo else 1.0
+    q = np.clip(np.rint((np.where(finite, grid, lo) - lo) / scale), 0, top)
+    return q.astype("<u1" if bits == 8 else "<u2"), lo, scale
+
+
+def encode_grid_field(name: str, version: int, grid: np.ndarray, bits: int) -> bytes:
+    q, lo, scale = quantize_grid(grid, bits)
+    head = GRID_FIELD.pack(name.encode("utf-8")[:16], version & 0xFFFFFFFF, bits, lo, scale)
+    return head + _pad4(q.tobytes())
+
+
+def encode_grids(step: int, w: int, h: int, grid_w: int, grid_h: int, blocks: Any) -> bytes:
+    blocks = list(blocks)
+    return GRID_HEADER.pack(GRID_MAGIC, step, w, h, grid_w, grid_h, len(blocks)) + b"".join(blocks)
+
+
+def decode_grids(data: bytes) -> Dict[str, Any]:
+    magic, step, w, h, grid_w, grid_h, count = GRID_HEADER.unpack_from(data, 0)
+    if magic != GRID_MAGIC:
+        raise ValueError("not a field grid message")
+    out: Dict[str, Any] = {"step": step, "w": w, "h": h, "grid_w": grid_w, "grid_h": grid_h, "versions": {}}
+    offset = GRID_HEADER.size
+    for _ in range(count):
+        raw, version, bits, lo, scale = GRID_FIELD.unpack_from(data, offset)
+        offset += GRID_FIELD.size
+        name = raw.rstrip(b"\0").decode("utf-8")
+        q = np.frombuffer(data, dtype="<u1" if bits == 8 else "<u2", count=grid_w * grid_h, offset=offset)
+        offset += q.nbytes + (-q.nbytes % 4)
+        out[name] = (lo + q.astype(np.float64) * scale).reshape(grid_h, grid_w)
+        out["versions"][name] = version
+    return out
+
+
+def encode_grid_png(grid: np.ndarray, bits: int) -> Tuple[bytes, float, float]:
+    """Grayscale PNG of one field (8-bit "L" or 16-bit "I;16"), plus its lo and scale."""
+    import io
+
+    from PIL import Image
+
+    q, lo, scale = quantize_grid(grid, bits)
+    image = Image.fromarray(q)  # uint8 -> "L", little-endian uint16 -> "I;16"
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return buf.getvalue(), lo, scale
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
+from multiprocessing.connection import Client, Connection
+from typing import Any, Callable, Dict, List, Tuple
+
+from .broadcast import FrameHub
+from .sessions import DEFAULT_SESSION, Session
+from .shm import SharedFrameReader
+from .sim_service import FieldCache, FieldsResult, Frame, FrameBuffer
+from .simd import ring_name
+
+logger = logging.getLogger("mythos")
+
+
+class RpcClient:
+    """Sends commands to the simulation process (server/simd.py) over pooled connections."""
+
+    def __init__(self, address: Any, authkey: bytes, on_restart: Callable[[], None] | None = None):
+        self.address = address
+        self.authkey = authkey
+        self.on_restart = on_restart
+        self.instance: str | None = None
+        self._idle: List[Connection] = []
+        self._lock = threading.Lock()
+
+    def call(self, session: str | None, method: str, *args: Any, **kwargs: Any) -> Any:
+        retry = True
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            pooled = conn is not None
+            try:
+                if conn is None:
+                    conn = Client(self.address, authkey=self.authkey)
+                conn.send((session, method, args, kwargs))
+                instance, ok, value = conn.recv()
+                break
+            except (EOFError, OSError) as exc:
+                if conn is not None:
+                    conn.close()
+                if not (pooled and retry):
+                    raise ConnectionError("simulation process is unavailable") from exc
+                # A pooled connection can outlive a simulation restart; retry on a fresh one
+                retry = False
+        with self._lock:
+            self._idle.append(conn)
+        if instance != self.instance:
+            restarted = self.instance is not None
+            self.instance = instance
+            if restarted and self.on_restart is not None:
+                self.on_restart()
+        if not ok:
+            raise value
+        return value
+
+    def close(self) -> None:
+        with self._lock:
+            conns, self._idle = self._idle, []
+        for conn in conns:
+            conn.close()
+
+
+class RemoteService:
+    """Stands in for a SimulationService that runs in the simulation process.
+
+    Frames and fields are read from the session's shared-memory ring; the
+    frames go through a local ``FrameBuffer`` so ``FrameHub`` fans them out
+    exactly as it does in-process. Everything else is forwarded.
+    """
+
+    def __init__(self, name: str, client: RpcClient, ring: str, executor: ThreadPoolExecutor):
+        self.name = name
+        self.client = client
+        self.ring = ring
+        self.frames = FrameBuffer()
+        self._executor = executor
+        self._reader: SharedFrameReader | None = None
+        self._ring_seq = 0
+        self._attach_after = 0.0
+        self._poll_lock = threading.Lock()
+        self._fields = FieldCache()
+
+    def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        return self.client.call(self.name, method, *args, **kwargs)
+
+    @property
+    def reader(self) -> SharedFrameReader | None:
+        if self._reader is None and time.monotonic() >= self._attach_after:
+            try:
+                self._reader = SharedFrameReader(self.ring)
+            except FileNotFoundError:
+                # Not created yet (or the simulation process is restarting); try again shortly
+                self._attach_after = time.monotonic() + 1.0
+        return self._reader
+
+    def detach(self) -> None:
+        with self._poll_lock:
+            reader, self._reader = self._reader, None
+            self._ring_seq = 0
+            self._attach_after = 0.0
+            self._fields = FieldCache()
+        if reader is not None:
+            reader.close()
+
+    def poll(self) -> bool:
+        """Publish the newest frame in the ring, if there is one we have not seen."""
+        with self._poll_lock:
+            reader = self.reader
+            if reader is None:
+                return False
+            got = reader.read(self._ring_seq)
+            if got is None:
+                return False
+            ring_seq, frame = got
+            self._ring_seq = ring_seq
+            # Local numbering, so subscribers and delta bases survive a simulation restart
+            frame = replace(frame, seq=self.frames.seq + 1)
+            self.frames.publish(frame)
+            return True
+
+    # -- reads ---------------------------------------------------------------
+
+    @property
+    def last_frame(self) -> Frame | None:
+        return self.frames.read()
+
+    def frame_payload(self) -> Dict[str, Any] | None:
+        frame = self.last_frame
+        return frame.payload() if frame is not None else None
+
+    async def fields_payload(self, step: int = 4) -> Dict[str, Any] | None:
+        result = await self.fields_response(step)
+        return json.loads(result.body) if result is not None else None
+
+    def fields_etag(self, step: int, fmt: str, names: Tuple[str, ...]) -> str | None:
+        reader = self.reader
+        shared = reader.fields() if reader is not None else None
+        if shared is None:
+            return None
+        return self._fields.etag(shared.generation, shared, step, fmt, names)
+
+    async def fields_response(
+        self,
+        step: int = 4,
+        fmt: str = "json",
+        names: Tuple[str, ...] | None = None,
+    ) -> FieldsResult | None:
+        step, names = FieldCache.check(step, fmt, names)
+        return await asyncio.to_thread(self._fields_response, step, fmt, names)
+
+    def _fields_response(self, step: int, fmt: str, names: Tuple[str, ...]) -> FieldsResult | None:
+        for _ in range(3):
+            reader = self.reader
+            shared = reader.fields() if reader is not None else None
+            if shared is None:
+                return None
+            cache = self._fields
+            etag = cache.etag(shared.generation, shared, step, fmt, names)
+            result = cache.get(etag) or cache.encode(shared.generation, shared, step, fmt, names)
+            if reader.fields_valid(shared):
+                return result
+            # The writer lapped us mid-read; nothing cached from that read can be trusted
+            self._fields = FieldCache()
+        return None
+
+    # -- forwarded commands ----------------------------------------------------
+
+    async def apply_program(self, dsl, profiles, seed, n, backend_name="cpu", channels=None) -> None:
+        await asyncio.to_thread(self._call, "apply_program", dsl, profiles, seed, n, backend_name, channels)
+        self.poll()
+
+    async def save_checkpoint(self, name: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self._call, "save_checkpoint", name)
+
+    async def restore_checkpoint(self, name: str) -> None:
+        await asyncio.to_thread(self._call, "restore_checkpoint", name)
+        self.poll()
+
+    async def seek(self, tick: int) -> None:
+        await asyncio.to_thread(self._call, "seek", tick)
+        self.poll()
+
+    def set_run(self, value: bool) -> Future:
+        # One executor thread keeps rate and run changes in the order they were made
+        return self._executor.submit(self._call, "set_run", value)
+
+    def set_rate(self, tick_ms: int, steps: int) -> Future:
+        return self._executor.submit(self._call, "set_rate", tick_ms, steps)
+
+    def list_checkpoints(self) -> List[Dict[str, Any]]:
+        return self._call("list_checkpoints")
+
+    def replay_status(self) -> Dict[str, Any]:
+        return self._call("replay_status")
+
+    def list_history(self, t0=None, t1=None, limit=500) -> List[Dict[str, Any]]:
+        return self._call("list_history", t0, t1, limit)
+
+    def load_history(self, snapshot_id: int):
+        return self._call("load_history", snapshot_id)
+
+    def list_presets(self) -> List[Dict[str, Any]]:
+        return self._call("list_presets")
+
+    def load_worldpack(self, name: str) -> Dict[str, Any]:
+        return self._call("load_worldpack", name)
+
+
+class RemoteSessions:
+    """The SessionManager interface for an API worker whose simulation runs in another process.
+
+    One thread polls every known session's ring and publishes new frames to
+    its local hub, beats the ring's heartbeat while the hub has subscribers
+    (so the simulation does not idle the session), and pings the simulation
+    process so a restart is noticed even when no commands are being sent.
+    """
+
+    def __init__(
+        self,
+        address: Any,
+        authkey: bytes,
+        make_hub: Callable[[Any], FrameHub],
+        prefix: str = "mythos",
+        poll_ms: float = 5.0,
+    ):
+        self.client = RpcClient(address, authkey, on_restart=self._on_restart)
+        self.make_hub = make_hub
+        self.prefix = prefix
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mythos-rpc")
+        self._sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+        # The default session exists in every simulation process, so no round trip is needed
+        self._attach(DEFAULT_SESSION)
+
+    def _attach(self, name: str) -> Session:
+        with self._lock:
+            session = self._sessions.get(name)
+            if session is None:
+                service = RemoteService(name, self.client, ring_name(self.prefix, name), self._executor)
+                session = Session(name, service, self.make_hub(service))
+                self._sessions = {**self._sessions, name: session}
+            return session
+
+    def _on_restart(self) -> None:
+        logger.warning("Simulation process restarted; re-attaching shared frames")
+        for session in self._sessions.values():
+            session.service.detach()
+
+    def get(self, name: str, create: bool = False) -> Session:
+        session = self._sessions.get(name)
+        if session is None:
+            self.client.call(None, "create" if create else "get", name)
+            session = self._attach(name)
+        reader = session.service.reader
+        if reader is not None:
+            reader.heartbeat()
+        return session
+
+    def create(self, name: str, weight: float = 1.0) -> Session:
+        self.client.call(None, "create", name, weight)
+        return self._attach(name)
+
+    def remove(self, name: str) -> None:
+        self.client.call(None, "remove", name)
+        with self._lock:
+            session = self._sessions.get(name)
+            self._sessions = {k: v for k, v in self._sessions.items() if k != name}
+        if session is not None:
+            session.service.detach()
+
+    def list(self) -> List[Dict[str, Any]]:
+        items = self.client.call(None, "list")
+        for item in items:
+            local = self._sessions.get(item["name"])
+            # Stream clients are spread over the workers; this one only knows its own
+            item["subscribers"] = len(local.hub.subscribers) if local is not None else 0
+        return items
+
+    def metrics(self) -> Dict[str, Any]:
+        return self.client.call(None, "metrics")
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="mythos-shm", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        for session in self._sessions.values():
+            session.service.detach()
+        self._executor.shutdown(wait=False)
+        self.client.close()
+
+    def _run(self) -> None:
+        last_beat = last_ping = 0.0
+        while not self._stopping.wait(self.poll_ms / 1000.0):
+            now = time.monotonic()
+            beat = now - last_beat >= 1.0
+            for session in self._sessions.values():
+                try:
+                    session.service.poll()
+                    if beat and session.hub.subscribers and session.service.reader is not None:
+                        session.service.reader.heartbeat()
+                except Exception:
+                    logger.exception("Reading shared frames for %s failed", session.name)
+            if beat:
+                last_beat = now
+            if now - last_ping >= 2.0:
+                last_ping = now
+                try:
+                    self.client.call(None, "ping")
+                except ConnectionError:
+                    pass
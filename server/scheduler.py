@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Tuple
+
+from engine.backend import disable_gpu
+
+logger = logging.getLogger("mythos")
+
+
+@dataclass(eq=False)
+class _Slot:
+    service: Any
+    weight: float = 1.0
+    keepalive: Callable[[], bool] | None = None
+    vtime: float = 0.0
+    next_due: float = 0.0
+    last_active: float = 0.0
+    active: bool = False
+    idle: bool = False
+    ticks: int = 0
+    busy: float = 0.0
+    tick_ms: float = 0.0
+    lag_ms: float = 0.0
+
+
+def _ewma(prev: float, value: float, alpha: float = 0.2) -> float:
+    return value if prev == 0.0 else prev + alpha * (value - prev)
+
+
+class Scheduler:
+    """Drives any number of simulation sessions from one worker thread.
+
+    Each session still ticks at its own ``tick_ms``; when more than one is
+    due, the one that has had the least CPU time per unit of weight goes
+    first (weighted fair queueing on measured tick time), so a heavy world
+    slows down on its own instead of starving the light ones. ``cpu_budget``
+    is the fraction of one core the scheduler may use: after each tick it
+    rests long enough to keep the ratio. ``lag_ms`` per session is how late
+    its ticks start compared to its own rate.
+
+    A running session with no activity (API calls through ``touch``, or a
+    ``keepalive`` such as "has stream subscribers") for ``idle_after``
+    seconds stops ticking until someone comes back; its run flag is left
+    alone so it resumes where it was.
+
+    Commands for every session share one queue and run on the worker thread,
+    between ticks, in the order they were submitted.
+    """
+
+    def __init__(self, cpu_budget: float = 1.0, idle_after: float = 300.0):
+        if not 0.0 < cpu_budget <= 1.0:
+            raise ValueError("cpu_budget must be in (0, 1]")
+        self.cpu_budget = cpu_budget
+        self.idle_after = idle_after
+        self._slots: Dict[str, _Slot] = {}
+        self._commands: "queue.Queue[Tuple[Callable[..., Any], tuple, Future] | None]" = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._clock = 0.0
+        self._rest_until = 0.0
+
+    # -- sessions ----------------------------------------------------------
+
+    def add(self, name: str, service: Any, weight: float = 1.0, keepalive: Callable[[], bool] | None = None) -> None:
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        slot = _Slot(service, weight=float(weight), keepalive=keepalive, vtime=self._clock, last_active=time.perf_counter())
+        # Copy on write: the worker reads the dict without a lock
+        self._slots = {**self._slots, name: slot}
+        service.scheduler = self
+
+    def remove(self, name: str) -> None:
+        self._slots = {k: v for k, v in self._slots.items() if k != name}
+
+    def set_weight(self, name: str, weight: float) -> None:
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        self._slots[name].weight = float(weight)
+
+    def touch(self, name: str) -> None:
+        slot = self._slots.get(name)
+        if slot is not None:
+            slot.last_active = time.perf_counter()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._slots
+
+    # -- worker thread -----------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="mythos-sim", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        thread = self._thread
+        if thread is None:
+            return
+        self._commands.put(None)
+        thread.join(timeout)
+        self._thread = None
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        fut: Future = Future()
+        if self._thread is None:
+            # No worker (scripts, tests): run on the caller's thread
+            self._execute(fn, args, fut)
+        else:
+            self._commands.put((fn, args, fut))
+        return fut
+
+    def _execute(self, fn: Callable[..., Any], args: tuple, fut: Future) -> None:
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            fut.set_result(fn(*args))
+        except BaseException as exc:
+            fut.set_exception(exc)
+
+    def _run(self) -> None:
+        timeout = 0.0
+        while True:
+            # Block until the next tick is due (or a command arrives), then drain what is queued
+            try:
+                cmd = self._commands.get(timeout=timeout) if timeout > 0 else self._commands.get_nowait()
+                while True:
+                    if cmd is None:
+                        return
+                    self._execute(*cmd)
+                    cmd = self._commands.get_nowait()
+            except queue.Empty:
+                pass
+            name, slot, timeout = self._pick(time.perf_counter())
+            if slot is not None:
+                self._tick(name, slot)
+                timeout = 0.0
+
+    def _pick(self, now: float) -> Tuple[str | None, _Slot | None, float]:
+        """The due session with the least weighted CPU time, or how long to wait for one."""
+        best_name, best, wait = None, None, 0.25
+        for name, slot in self._slots.items():
+            service = slot.service
+            if slot.keepalive is not None and slot.keepalive():
+                slot.last_active = now
+            slot.idle = self.idle_after > 0 and now - slot.last_active > self.idle_after
+            runnable = bool(service.running and service.kernel is not None and not slot.idle)
+            if not runnable:
+                slot.active = False
+                continue
+            if not slot.active:
+                # Coming back from pause or idle: no credit for the time away
+                slot.active = True
+                slot.vtime = max(slot.vtime, self._clock)
+                slot.next_due = now
+            due = max(slot.next_due, self._rest_until)
+            if due > now:
+                wait = min(wait, due - now)
+            elif best is None or (slot.vtime, slot.next_due) < (best.vtime, best.next_due):
+                best_name, best = name, slot
+        return best_name, best, wait
+
+    def _tick(self, name: str, slot: _Slot) -> None:
+        service = slot.service
+        start = time.perf_counter()
+        slot.lag_ms = _ewma(slot.lag_ms, max(0.0, start - slot.next_due) * 1000.0)
+        try:
+            service.step()
+        except Exception:
+            logger.exception("Simulation step failed in session %s; pausing.", name)
+            if service.kernel and service.kernel.world.backend.name == "gpu":
+                disable_gpu()
+            service.running = False
+        end = time.perf_counter()
+        elapsed = end - start
+        slot.ticks += 1
+        slot.busy += elapsed
+        slot.tick_ms = _ewma(slot.tick_ms, elapsed * 1000.0)
+        slot.vtime += elapsed / slot.weight
+        self._clock = slot.vtime
+        slot.next_due = start + service.tick_ms / 1000.0
+        if self.cpu_budget < 1.0:
+            self._rest_until = end + elapsed * (1.0 - self.cpu_budget) / self.cpu_budget
+
+    # -- stats -------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.perf_counter()
+        slots = self._slots
+        total = sum(slot.busy for slot in slots.values()) or 1.0
+        out = {}
+        for name, slot in slots.items():
+            service = slot.service
+            behind = max(0.0, now - slot.next_due) * 1000.0 if slot.active else 0.0
+            out[name] = {
+                "weight": slot.weight,
+                "running": bool(service.running),
+                "idle": slot.idle,
+                "ticks": slot.ticks,
+                "tick_ms": round(slot.tick_ms, 3),
+                "target_ms": service.tick_ms,
+                "lag_ms": round(max(slot.lag_ms, behind), 3),
+                "cpu_share": round(slot.busy / total, 4),
+                "idle_for": round(now - slot.last_active, 1),
+            }
+        return out
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+from .broadcast import FrameHub
+from .persistence import WriteBehindQueue
+from .scheduler import Scheduler
+from .sim_service import SimulationService
+
+DEFAULT_SESSION = "default"
+_SESSION_NAME = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+
+
+@dataclass(eq=False)
+class Session:
+    name: str
+    service: SimulationService
+    hub: FrameHub
+    created: float = field(default_factory=time.time)
+
+
+class SessionManager:
+    """Named worlds sharing one scheduler thread and one persistence queue.
+
+    ``make_service(name)`` builds the SimulationService for a new session
+    (so the server decides its checkpoint/replay paths) and
+    ``make_hub(service)`` its stream hub. The default session always exists;
+    others are created on first apply or explicitly, up to ``max_sessions``.
+    A session never counts as idle while ``keepalive(session)`` holds (by
+    default: while it has stream subscribers).
+    """
+
+    def __init__(
+        self,
+        make_service: Callable[[str], SimulationService],
+        make_hub: Callable[[SimulationService], FrameHub],
+        scheduler: Scheduler,
+        persistence: WriteBehindQueue,
+        max_sessions: int = 32,
+        keepalive: Callable[[Session], bool] | None = None,
+    ):
+        self.make_service = make_service
+        self.make_hub = make_hub
+        self.scheduler = scheduler
+        self.persistence = persistence
+        self.max_sessions = max(1, int(max_sessions))
+        self.keepalive = keepalive or (lambda session: bool(session.hub.subscribers))
+        self._sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+        self.create(DEFAULT_SESSION)
+
+    def get(self, name: str, create: bool = False) -> Session:
+        session = self._sessions.get(name)
+        if session is None:
+            if not create:
+                raise KeyError(name)
+            session = self.create(name)
+        self.scheduler.touch(name)
+        return session
+
+    def create(self, name: str, weight: float = 1.0) -> Session:
+        """Create a session, or just update its weight if it exists."""
+        if not _SESSION_NAME.fullmatch(name or ""):
+            raise ValueError("session names may only use letters, digits, '.', '_' and '-'")
+        with self._lock:
+            session = self._sessions.get(name)
+            if session is not None:
+                self.scheduler.set_weight(name, weight)
+                return session
+            if len(self._sessions) >= self.max_sessions:
+                raise ValueError(f"session limit reached ({self.max_sessions})")
+            service = self.make_service(name)
+            hub = self.make_hub(service)
+            session = Session(name, service, hub)
+            self.scheduler.add(name, service, weight=weight, keepalive=lambda: self.keepalive(session))
+            self._sessions = {**self._sessions, name: session}
+            return session
+
+    def remove(self, name: str) -> None:
+        if name == DEFAULT_SESSION:
+            raise ValueError("the default session cannot be removed")
+        with self._lock:
+            session = self._sessions.get(name)
+            if session is None:
+                raise KeyError(name)
+            self._sessions = {k: v for k, v in self._sessions.items() if k != name}
+        self.scheduler.remove(name)
+        # Drop the world on the worker so an in-flight command never sees it vanish
+        self.scheduler.submit(session.service.release)
+
+    def list(self) -> List[Dict[str, Any]]:
+        stats = self.scheduler.stats()
+        items = []
+        for name, session in self._sessions.items():
+            frame = session.service.last_frame
+            items.append({
+                "name": name,
+                "created": session.created,
+                "t": frame.t if frame is not None else None,
+                "entities": len(frame.columns.get("id", ())) if frame is not None else 0,
+                "subscribers": len(session.hub.subscribers),
+                **stats.get(name, {}),
+            })
+        return items
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"persistence": self.persistence.stats(), "sessions": self.scheduler.stats()}
+
+    def start(self) -> None:
+        self.persistence.start()
+        self.scheduler.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.scheduler.stop(timeout)
+        self.persistence.stop(timeout)
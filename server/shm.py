@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import json
+import struct
+import time
+from dataclasses import dataclass, field
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from engine.backend import CPU, Backend
+from engine.fields import FieldChannel, FieldRegistry
+
+from .sim_service import Frame
+
+# Shared frame ring. A fixed-name control block points at the current data
+# segment ("<name>-<n>"); the writer allocates a bigger segment and bumps n
+# when a frame or the field tensor outgrows its slot. All little-endian.
+#
+#   control:  magic "MYRG", version u32, segment u32, slots u32,
+#             frame seq u64, field seq u64, last reader heartbeat f64
+#   segment:  field slot bytes u64, frame slot bytes u64, padding to 64
+#             FIELD_SLOTS field slots, then `slots` frame slots
+#   slot:     seq_begin u64, seq_end u64, meta_offset u64, meta_len u64,
+#             padding to 64, arrays on 64-byte boundaries, meta JSON
+#
+# Slots are seqlocks: the writer stores seq_begin, the payload, then
+# seq_end; a reader accepts a slot only if seq_end before and seq_begin
+# after its read both equal the sequence it wanted.
+
+MAGIC = b"MYRG"
+VERSION = 1
+CONTROL = struct.Struct("<4sIIIQQd")
+SEGMENT = struct.Struct("<QQ")
+SLOT = struct.Struct("<QQQQ")
+ALIGN = 64
+FIELD_SLOTS = 3
+
+_SEQ_AT = 16  # offset of the frame seq in CONTROL
+_FIELD_SEQ_AT = 24
+_HEARTBEAT_AT = 32
+
+
+def _align(n: int) -> int:
+    return n + (-n % ALIGN)
+
+
+# Segments written by this process; the resource tracker unlinks them if we die
+_OWNED: set = set()
+
+
+def _attach(name: str) -> SharedMemory:
+    # Readers must not let the resource tracker unlink the writer's segment when they exit
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = SharedMemory(name=name)
+        if name not in _OWNED:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _create(name: str, size: int) -> SharedMemory:
+    try:
+        shm = SharedMemory(name=name, create=True, size=size)
+    except FileExistsError:
+        # Left over from a writer that died without unlinking
+        stale = _attach(name)
+        stale.close()
+        stale.unlink()
+        shm = SharedMemory(name=name, create=True, size=size)
+    _OWNED.add(name)
+    return shm
+
+
+def _unlink(shm: SharedMemory) -> None:
+    shm.close()
+    shm.unlink()
+    _OWNED.discard(shm.name)
+
+
+@dataclass(frozen=True)
+class _Payload:
+    arrays: List[Tuple[str, np.ndarray]]
+    blob: bytes
+    meta_offset: int
+
+    @classmethod
+    def build(cls, arrays: List[Tuple[str, np.ndarray]], meta: Dict[str, Any]) -> "_Payload":
+        offset = ALIGN
+        specs = {}
+        for name, values in arrays:
+            specs[name] = [offset, values.dtype.str, list(values.shape)]
+            offset = _align(offset + values.nbytes)
+        return cls(arrays, json.dumps({**meta, "arrays": specs}).encode("utf-8"), offset)
+
+    @property
+    def size(self) -> int:
+        return self.meta_offset + len(self.blob)
+
+
+def _close(shm: SharedMemory) -> bool:
+    try:
+        shm.close()
+        return True
+    except BufferError:
+        # Frames handed out still view this mapping; it goes when they do
+        return False
+
+
+@dataclass(eq=False)
+class SharedFields:
+    """The field tensor of a published world, as a read-only view into shared memory.
+
+    Shaped like a World as far as ``FieldCache`` is concerned.
+    """
+
+    seq: int
+    generation: int
+    w: int
+    h: int
+    fields: np.ndarray
+    channels: FieldRegistry
+    field_versions: Dict[str, int]
+    backend: Backend = field(default=CPU)
+
+
+class SharedFrameWriter:
+    """Publishes a session's frames (and, at most every ``field_every`` seconds, its fields) to shared memory.
+
+    Frames go round ``slots`` ring slots, so a reader that took a frame can
+    keep using its zero-copy columns until ``slots - 1`` newer frames have
+    been published. Field tensors are large and change less often, so they
+    have their own small ring and are only copied when a version moved.
+    """
+
+    def __init__(self, name: str, slots: int = 8, field_every: float = 0.25):
+        self.name = name
+        self.slots = max(2, int(slots))
+        self.field_every = field_every
+        self._control = _create(name, CONTROL.size)
+        self._segment: SharedMemory | None = None
+        self._segment_no = 0
+        self._field_bytes = 0
+        self._frame_bytes = 0
+        self._seq = 0
+        self._field_seq = 0
+        self._field_key: Tuple[Any, ...] | None = None
+        self._field_time = 0.0
+        CONTROL.pack_into(self._control.buf, 0, MAGIC, VERSION, 0, self.slots, 0, 0, 0.0)
+
+    def last_read(self) -> float:
+        """Wall-clock time a reader last said it was watching (0 if never)."""
+        return CONTROL.unpack_from(self._control.buf, 0)[6]
+
+    def publish(self, frame: Frame, world: Any = None, generation: int = 0) -> None:
+        """Write ``frame`` (and ``world``'s fields when due). Call on the simulation thread."""
+        payload = _Payload.build(
+            [(name, np.ascontiguousarray(values)) for name, values in frame.columns.items()],
+            {
+                "t": frame.t,
+                "w": frame.w,
+                "h": frame.h,
+                "seq": frame.seq,
+                "colors": list(frame.colors),
+                "kinds": list(frame.kinds),
+                "tables_version": frame.tables_version,
+            },
+        )
+        fields = self._fields_payload(world, generation) if world is not None else None
+        grown, old = False, None
+        if self._segment is None or payload.size > self._frame_bytes or (fields and fields.size > self._field_bytes):
+            grown, old = True, self._grow(payload.size, fields.size if fields else 0)
+            if fields is None and world is not None:
+                # A fresh segment has no fields yet
+                self._field_key = None
+                fields = self._fields_payload(world, generation)
+        buf = self._control.buf
+        if fields is not None:
+            self._field_seq += 1
+            self._write(ALIGN + (self._field_seq % FIELD_SLOTS) * self._field_bytes, self._field_seq, fields)
+        self._seq += 1
+        self._write(self._frame_offset(self._seq), self._seq, payload)
+        if grown:
+            # Switch readers over only once the new segment holds something to read
+            struct.pack_into("<I", buf, 8, self._segment_no)
+            if old is not None:
+                _unlink(old)
+        if fields is not None:
+            struct.pack_into("<Q", buf, _FIELD_SEQ_AT, self._field_seq)
+        struct.pack_into("<Q", buf, _SEQ_AT, self._seq)
+
+    def _fields_payload(self, world: Any, generation: int) -> _Payload | None:
+        versions = dict(world.field_versions)
+        key = (generation, tuple(sorted(versions.items())))
+        prev, now = self._field_key, time.monotonic()
+        new_world = prev is None or prev[0] != generation
+        if key == prev or not (new_world or now - self._field_time >= self.field_every):
+            return None
+        self._field_key, self._field_time = key, now
+        return _Payload.build(
+            [("fields", np.ascontiguousarray(world.backend.asnumpy(world.fields)))],
+            {
+                "generation": generation,
+                "w": int(world.w),
+                "h": int(world.h),
+                "channels": world.channels.names,
+                "versions": versions,
+            },
+        )
+
+    def _frame_offset(self, seq: int) -> int:
+        return ALIGN + FIELD_SLOTS * self._field_bytes + (seq % self.slots) * self._frame_bytes
+
+    def _write(self, base: int, seq: int, payload: _Payload) -> None:
+        buf = self._segment.buf
+        struct.pack_into("<Q", buf, base, seq)
+        offset = ALIGN
+        for _, values in payload.arrays:
+            np.ndarray(values.shape, values.dtype, buffer=buf, offset=base + offset)[...] = values
+            offset = _align(offset + values.nbytes)
+        end = base + payload.meta_offset
+        buf[end:end + len(payload.blob)] = payload.blob
+        SLOT.pack_into(buf, base, seq, seq, payload.meta_offset, len(payload.blob))
+
+    def _grow(self, frame_need: int, field_need: int) -> SharedMemory | None:
+        # Headroom so a slowly growing population does not reallocate every tick
+        self._frame_bytes = max(self._frame_bytes, _align(int(frame_need * 1.5) + 4096))
+        self._field_bytes = max(self._field_bytes, _align(field_need + 4096) if field_need else 0)
+        size = ALIGN + FIELD_SLOTS * self._field_bytes + self.slots * self._frame_bytes
+        old = self._segment
+        self._segment_no += 1
+        self._segment = _create(f"{self.name}-{self._segment_no}", size)
+        SEGMENT.pack_into(self._segment.buf, 0, self._field_bytes, self._frame_bytes)
+        return old
+
+    def close(self) -> None:
+        for shm in (self._segment, self._control):
+            if shm is not None:
+                _unlink(shm)
+        self._segment = None
+
+
+class SharedFrameReader:
+    """Reads the latest complete frame and fields from a ``SharedFrameWriter`` in another process.
+
+    Frames come back with their columns viewing the shared slot (no copy).
+    They stay valid until the writer wraps the ring; ``valid(frame_seq)``
+    says whether the slot still holds a given ring sequence.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._control = _attach(name)
+        magic, version, _, self.slots, _, _, _ = CONTROL.unpack_from(self._control.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{name} is not a frame ring")
+        self._segment: SharedMemory | None = None
+        self._segment_no = 0
+        self._retired: List[SharedMemory] = []
+        self._field_bytes = 0
+        self._frame_bytes = 0
+        self._fields: SharedFields | None = None
+
+    def latest(self) -> int:
+        return struct.unpack_from("<Q", self._control.buf, _SEQ_AT)[0]
+
+    def heartbeat(self) -> None:
+        """Tell the writer someone is watching (keeps the session from idling)."""
+        struct.pack_into("<d", self._control.buf, _HEARTBEAT_AT, time.time())
+
+    def _map(self) -> SharedMemory | None:
+        segment_no = struct.unpack_from("<I", self._control.buf, 8)[0]
+        if segment_no == 0:
+            return None
+        if segment_no != self._segment_no:
+            if self._segment is not None:
+                self._retired.append(self._segment)
+            self._retired = [shm for shm in self._retired if not _close(shm)]
+            try:
+                self._segment = _attach(f"{self.name}-{segment_no}")
+            except FileNotFoundError:
+                # Replaced again before we got to it; next read picks up the newer one
+                self._segment = None
+                return None
+            self._segment_no = segment_no
+            self._field_bytes, self._frame_bytes = SEGMENT.unpack_from(self._segment.buf, 0)
+        return self._segment
+
+    def _slot(self, base: int, seq: int) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]] | None:
+        buf = self._segment.buf
+        begin, end, meta_offset, meta_len = SLOT.unpack_from(buf, base)
+        if begin != seq or end != seq:
+            return None
+        meta = json.loads(bytes(buf[base + meta_offset:base + meta_offset + meta_len]))
+        arrays = {}
+        for name, (offset, dtype, shape) in meta["arrays"].items():
+            values = np.ndarray(shape, np.dtype(dtype), buffer=buf, offset=base + offset)
+            values.flags.writeable = False
+            arrays[name] = values
+        if struct.unpack_from("<Q", buf, base)[0] != seq:
+            return None
+        return meta, arrays
+
+    def read(self, after: int = 0) -> Tuple[int, Frame] | None:
+        """(ring seq, frame) for the newest frame if it is newer than ``after``."""
+        for _ in range(3):
+            seq = self.latest()
+            if seq <= after or self._map() is None:
+                return None
+            base = ALIGN + FIELD_SLOTS * self._field_bytes + (seq % self.slots) * self._frame_bytes
+            got = self._slot(base, seq)
+            if got is None:
+                continue
+            meta, columns = got
+            frame = Frame(
+                t=meta["t"],
+                w=meta["w"],
+                h=meta["h"],
+                seq=meta["seq"],
+                columns=columns,
+                colors=tuple(meta["colors"]),
+                kinds=tuple(meta["kinds"]),
+                tables_version=meta["tables_version"],
+            )
+            return seq, frame
+        return None
+
+    def valid(self, seq: int) -> bool:
+        segment = self._segment
+        if segment is None:
+            return False
+        base = ALIGN + FIELD_SLOTS * self._field_bytes + (seq % self.slots) * self._frame_bytes
+        return struct.unpack_from("<Q", segment.buf, base)[0] == seq
+
+    def fields(self) -> SharedFields | None:
+        """The newest published field tensor (cached until a newer one lands)."""
+        for _ in range(3):
+            seq = struct.unpack_from("<Q", self._control.buf, _FIELD_SEQ_AT)[0]
+            if seq == 0 or self._map() is None:
+                return None
+            if self._fields is not None and self._fields.seq == seq and self.fields_valid(self._fields):
+                return self._fields
+            got = self._slot(ALIGN + (seq % FIELD_SLOTS) * self._field_bytes, seq)
+            if got is None:
+                continue
+            meta, arrays = got
+            self._fields = SharedFields(
+                seq=seq,
+                generation=meta["generation"],
+                w=meta["w"],
+                h=meta["h"],
+                fields=arrays["fields"],
+                channels=FieldRegistry(FieldChannel(name) for name in meta["channels"]),
+                field_versions=meta["versions"],
+            )
+            return self._fields
+        return None
+
+    def fields_valid(self, fields: SharedFields) -> bool:
+        segment = self._segment
+        if segment is None:
+            return False
+        base = ALIGN + (fields.seq % FIELD_SLOTS) * self._field_bytes
+        return struct.unpack_from("<Q", segment.buf, base)[0] == fields.seq
+
+    def close(self) -> None:
+        self._fields = None
+        for shm in [self._segment, *self._retired, self._control]:
+            if shm is not None:
+                _close(shm)
+        self._segment = None
+        self._retired = []
@@ -1,50 +1,304 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import json
 import logging
+import threading
 import time
-from dataclasses import dataclass
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field, replace
+from functools import cached_property
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import math
+import re
+
+import numpy as np
 
 from engine.backend import get_backend, disable_gpu
 from engine.compiler import compile_program
 from engine.factory import seed_world
 from engine.kernel import Kernel
+from engine.replay import Recorder
+from engine.spatial import SpatialIndex
 from engine.worldpack import load_worldpack_json, worldpack_to_dsl
 
-from .db import SessionLocal
-from .models import Snapshot, Metric, Base
-from sqlalchemy import inspect
+from . import history, protocol
+from .db import SessionLocal, init_db
+from .models import SnapshotBlob, Metric
+from .persistence import WriteBehindQueue
+from .scheduler import Scheduler
+from sqlalchemy import func, or_, select
 
 logger = logging.getLogger("mythos")
 
-@dataclass
+ENTITY_COLUMNS = ("x", "y", "z", "vx", "vy", "vz", "mass", "hardness", "energy", "wealth")
+FIELD_NAMES = ("terrain", "water", "fertility", "climate")
+FIELD_FORMATS = ("json", "u8", "u16", "png")
+_CHECKPOINT_NAME = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+
+
+def _readonly(values: np.ndarray) -> np.ndarray:
+    values.flags.writeable = False
+    return values
+
+
+@dataclass(frozen=True, eq=False)
 class Frame:
+    """One published tick: alive-entity columns plus the string tables their codes index.
+
+    The JSON entity dicts and the binary encoding are derived lazily and
+    cached, so each is built at most once per frame however many readers ask.
+    """
+
     t: float
     w: int
     h: int
-    entities: List[Dict[str, Any]]
+    seq: int = 0
+    columns: Dict[str, np.ndarray] = field(default_factory=dict)
+    colors: Tuple[str, ...] = ()
+    kinds: Tuple[str, ...] = ()
+    tables_version: int = 0
 
+    @cached_property
+    def entities(self) -> Tuple[Dict[str, Any], ...]:
+        cols = self.columns
+        if not cols:
+            return ()
+        rows: Dict[str, Any] = {"id": cols["id"].tolist()}
+        for name in ("x", "y", "z", "vx", "vy", "vz", "mass", "hardness"):
+            rows[name] = cols[name].tolist()
+        rows["color"] = [self.colors[c] for c in cols["color_code"].tolist()]
+        rows["kind"] = [self.kinds[k] for k in cols["kind_code"].tolist()]
+        size = 3.0 + cols["hardness"] * 0.6
+        rows["size"] = np.where(np.isfinite(size), size, 3.0).tolist()
+        rows["energy"] = cols["energy"].tolist()
+        rows["wealth"] = cols["wealth"].tolist()
+        keys = list(rows)
+        return tuple(dict(zip(keys, row)) for row in zip(*rows.values()))
+
+    @cached_property
+    def binary(self) -> bytes:
+        return protocol.encode_frame(self)
+
+    @cached_property
+    def index(self) -> SpatialIndex:
+        # Built on first viewport query and shared by every client of this frame
+        index = SpatialIndex(cell_size=32.0)
+        cols = self.columns
+        if cols:
+            index.build(cols["x"], cols["y"], np.arange(cols["x"].shape[0]))
+        return index
+
+    def subset(self, rows: np.ndarray) -> "Frame":
+        return replace(self, columns={name: _readonly(values[rows]) for name, values in self.columns.items()})
+
+    def payload(self) -> Dict[str, Any]:
+        return {"t": self.t, "w": self.w, "h": self.h, "seq": self.seq, "entities": self.entities}
+
+    @cached_property
+    def json_text(self) -> str:
+        return json.dumps(self.payload(), allow_nan=False)
+
+
+@dataclass(frozen=True)
+class FieldsResult:
+    """An encoded ``/api/fields`` body; ``etag`` changes whenever any included field does."""
+
+    etag: str
+    media_type: str
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class FieldCache:
+    """Encoded ``/api/fields`` bodies for one world, keyed by field versions.
+
+    ``world`` is anything with a ``(F, H, W)`` ``fields`` tensor, ``channels``,
+    ``field_versions``, ``w``/``h`` and a ``backend``: a live World on the
+    simulation thread, or a read-only view of one (server/shm.py). Each field
+    grid is encoded once per version and step, and whole responses are kept by
+    ETag, so polls of unchanged fields cost a dict lookup.
+    """
+
+    def __init__(self, parts: int = 64, responses: int = 16):
+        self._lock = threading.Lock()
+        self._parts: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+        self._responses: "OrderedDict[str, FieldsResult]" = OrderedDict()
+        self._max_parts = parts
+        self._max_responses = responses
+
+    @staticmethod
+    def check(step: int, fmt: str, names: Tuple[str, ...] | None) -> Tuple[int, Tuple[str, ...]]:
+        names = tuple(names or FIELD_NAMES)
+        if fmt not in FIELD_FORMATS:
+            raise ValueError(f"unknown fields format: {fmt}")
+        if fmt == "png" and len(names) != 1:
+            raise ValueError("png responses hold exactly one field")
+        return max(1, int(step)), names
+
+    def etag(self, generation: int, world: Any, step: int, fmt: str, names: Tuple[str, ...]) -> str:
+        versions = world.field_versions
+        key = (generation, int(step), fmt, names, tuple(versions.get(n, -1) for n in names))
+        return '"' + hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:20] + '"'
+
+    def get(self, etag: str) -> FieldsResult | None:
+        with self._lock:
+            return self._responses.get(etag)
+
+    def encode(self, generation: int, world: Any, step: int, fmt: str, names: Tuple[str, ...]) -> FieldsResult:
+        for name in names:
+            world.channels.index(name)  # KeyError for unknown channels
+        etag = self.etag(generation, world, step, fmt, names)
+        versions = [world.field_versions[n] for n in names]
+        keys = [(generation, name, step, version, fmt) for name, version in zip(names, versions)]
+        with self._lock:
+            parts = {key: self._parts.get(key) for key in keys}
+        missing = [i for i, key in enumerate(keys) if parts[key] is None]
+        grid_h, grid_w = world.fields[0, ::step, ::step].shape
+        extra: Dict[str, str] = {}
+        if missing:
+            # One strided gather and one device transfer for every stale channel
+            sel = [world.channels.index(names[i]) for i in missing]
+            grids = world.backend.asnumpy(world.fields[sel, ::step, ::step])
+            for i, grid in zip(missing, grids):
+                parts[keys[i]] = self._encode_field(fmt, names[i], versions[i], grid)
+        if fmt == "json":
+            head = json.dumps({
+                "step": step,
+                "w": int(world.w),
+                "h": int(world.h),
+                "grid_w": int(grid_w),
+                "grid_h": int(grid_h),
+                "versions": dict(zip(names, versions)),
+            })
+            # The grids are cached as JSON text, so splice them in instead of re-serializing
+            body = (head[:-1] + "".join(
+                f", {json.dumps(name)}: {parts[key].decode('utf-8')}" for name, key in zip(names, keys)
+            ) + "}").encode("utf-8")
+            media = "application/json"
+        elif fmt == "png":
+            body, lo, scale = parts[keys[0]]
+            media = "image/png"
+            extra = {"X-Field-Min": repr(lo), "X-Field-Scale": repr(scale), "X-Field-Version": str(versions[0])}
+        else:
+            body = protocol.encode_grids(step, int(world.w), int(world.h), int(grid_w), int(grid_h), (parts[k] for k in keys))
+            media = "application/octet-stream"
+        result = FieldsResult(etag=etag, media_type=media, body=body, headers=extra)
+        with self._lock:
+            for key in keys:
+                self._parts[key] = parts[key]
+                self._parts.move_to_end(key)
+            while len(self._parts) > self._max_parts:
+                self._parts.popitem(last=False)
+            self._responses[etag] = result
+            while len(self._responses) > self._max_responses:
+                self._responses.popitem(last=False)
+        return result
+
+    def _encode_field(self, fmt: str, name: str, version: int, grid: np.ndarray) -> Any:
+        if fmt == "json":
+            return json.dumps(grid.astype(float).tolist()).encode("utf-8")
+        bits = 8 if fmt == "u8" else 16
+        if fmt == "png":
+            return protocol.encode_grid_png(grid, bits)
+        return protocol.encode_grid_field(name, version, grid, bits)
+
+
+class FrameBuffer:
+    """Two frame slots: the worker fills the back slot, then flips which one is front.
+
+    Frames are never mutated after publish, so readers take the front frame
+    without any lock; a flip is a single attribute store. Listeners are called
+    on the publishing thread after each flip.
+    """
 
-class SimulationService:
     def __init__(self):
+        self._slots: List[Frame | None] = [None, None]
+        self._front = 0
+        self.seq = 0
+        self.listeners: List[Callable[[Frame], None]] = []
+
+    def publish(self, frame: Frame) -> None:
+        back = 1 - self._front
+        self._slots[back] = frame
+        self._front = back
+        self.seq = frame.seq
+        for listener in list(self.listeners):
+            try:
+                listener(frame)
+            except Exception:
+                logger.exception("Frame listener failed")
+
+    def read(self) -> Frame | None:
+        return self._slots[self._front]
+
+
+class SimulationService:
+    """Owns one session's kernel, ticked on a scheduler's worker thread.
+
+    The API layer never touches the kernel: it reads published frames from a
+    ``FrameBuffer`` and sends everything else (apply, run, rate, field reads)
+    as commands over the scheduler's queue, which the worker drains between
+    ticks. Several services can share one scheduler (server/scheduler.py).
+    """
+
+    def __init__(
+        self,
+        persistence: WriteBehindQueue | None = None,
+        snapshot_fields: Tuple[str, ...] = (),
+        snapshot_field_step: int = 4,
+        checkpoint_dir: str | Path | None = None,
+        replay_dir: str | Path | None = None,
+        replay_every: int = 300,
+        replay_keep: int = 16,
+        name: str = "default",
+    ):
         self.kernel: Kernel | None = None
         self.running = False
         self.tick_ms = 33
         self.steps = 1
-        self.last_frame: Frame | None = None
-        self._lock = asyncio.Lock()
+        self.frames = FrameBuffer()
+        self.name = name
+        # Set by Scheduler.add; its worker thread runs our ticks and commands
+        self.scheduler: Any = None
         self._last_emit = 0.0
+        # Number of this session's last stored snapshot (SnapshotBlob.ordinal), read on first persist
+        self._ordinal: int | None = None
         self._persist_every = 1.5
-        self._init_db()
+        self.persistence = persistence or WriteBehindQueue(SessionLocal)
+        # Field channels stored with each snapshot, strided by snapshot_field_step
+        self.snapshot_fields = tuple(snapshot_fields)
+        self.snapshot_field_step = max(1, int(snapshot_field_step))
+        self.checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir else Path.home() / ".mythos" / "checkpoints"
+        # With a replay_dir every world is recorded (engine/replay.py) and can seek back to any tick
+        self.replay_dir = Path(replay_dir) if replay_dir else None
+        self.replay_every = replay_every
+        self.replay_keep = replay_keep
+        self.recorder: Recorder | None = None
+        # Bumped per apply so field caches never outlive the world they describe
+        self._generation = 0
+        self._fields = FieldCache()
+        # Once per process: the API and simulation processes also run it at startup (server/config.py)
+        init_db()
 
-    def _init_db(self):
-        from .db import engine
-        if not inspect(engine).has_table("snapshots"):
-            Base.metadata.create_all(bind=engine)
+    @property
+    def last_frame(self) -> Frame | None:
+        return self.frames.read()
+
+    @property
+    def generation(self) -> int:
+        """Bumped whenever the world is replaced (apply, restore, seek)."""
+        return self._generation
+
+    def _last_ordinal(self) -> int:
+        # Where this session's snapshot numbering left off (a restarted session continues it)
+        with SessionLocal() as session:
+            return session.scalar(
+                select(func.max(SnapshotBlob.ordinal)).where(SnapshotBlob.session == self.name)
+            ) or 0
 
     def load_worldpack(self, name: str) -> Dict[str, Any]:
         base = Path("examples/worldpacks")
@@ -60,6 +314,7 @@ class SimulationService:
             "description": pack.get("description", ""),
             "dsl": worldpack_to_dsl(pack),
             "profiles": profiles,
+            "channels": pack.get("channels", []),
             "seed": pack.get("seed", 42),
         }
 
@@ -81,6 +336,34 @@ class SimulationService:
                 
         return sorted(items, key=lambda x: x["name"])
 
+    # -- worker thread -------------------------------------------------
+
+    def start(self) -> None:
+        """Run this service on its own scheduler (a single-session server, scripts, tests)."""
+        if self.scheduler is None:
+            Scheduler(idle_after=0).add(self.name, self)
+        self.persistence.start()
+        self.scheduler.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self.scheduler is not None:
+            self.scheduler.stop(timeout)
+        self.persistence.stop(timeout)
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        if self.scheduler is None:
+            # No worker (scripts, tests): run on the caller's thread
+            fut: Future = Future()
+            try:
+                fut.set_result(fn(*args))
+            except BaseException as exc:
+                fut.set_exception(exc)
+            return fut
+        self.scheduler.touch(self.name)
+        return self.scheduler.submit(fn, *args)
+
+    # -- commands --------------------------------------------------------
+
     async def apply_program(
         self,
         dsl: str,
@@ -88,53 +371,160 @@ class SimulationService:
         seed: int,
         n: int,
         backend_name: str = "cpu",
+        channels: Optional[List[Any]] = None,
     ) -> None:
-        async with self._lock:
-            prog = compile_program(dsl)
-            use_gpu = backend_name == "gpu"
-            backend = get_backend(use_gpu)
-            try:
-                world = seed_world(256, 256, n=n, seed=seed, backend=backend, profiles=profiles)
-                kernel = Kernel(world, prog.consts, prog.laws)
+        fut = self._submit(self._apply, dsl, profiles, seed, n, backend_name, channels)
+        await asyncio.wrap_future(fut)
+
+    def _apply(
+        self,
+        dsl: str,
+        profiles: Optional[List[Dict[str, Any]]],
+        seed: int,
+        n: int,
+        backend_name: str,
+        channels: Optional[List[Any]],
+    ) -> None:
+        prog = compile_program(dsl)
+        use_gpu = backend_name == "gpu"
+        backend = get_backend(use_gpu)
+        try:
+            world = seed_world(256, 256, n=n, seed=seed, backend=backend, profiles=profiles, channels=channels)
+            kernel = Kernel(world, prog.consts, prog.laws, seed=seed)
+            W, H = kernel.world.w, kernel.world.h
+            DT = kernel.world.dt
+            world = seed_world(W, H, n=n, seed=seed, backend=backend, profiles=profiles, channels=channels)
+            world.dt = DT
+            kernel = Kernel(world, prog.consts, prog.laws, seed=seed)
+        except Exception:
+            if use_gpu:
+                logger.exception("GPU apply failed; falling back to CPU.")
+                disable_gpu()
+                backend = get_backend(False)
+                world = seed_world(256, 256, n=n, seed=seed, backend=backend, profiles=profiles, channels=channels)
+                kernel = Kernel(world, prog.consts, prog.laws, seed=seed)
                 W, H = kernel.world.w, kernel.world.h
                 DT = kernel.world.dt
-                world = seed_world(W, H, n=n, seed=seed, backend=backend, profiles=profiles)
+                world = seed_world(W, H, n=n, seed=seed, backend=backend, profiles=profiles, channels=channels)
                 world.dt = DT
-                kernel = Kernel(world, prog.consts, prog.laws)
-            except Exception:
-                if use_gpu:
-                    logger.exception("GPU apply failed; falling back to CPU.")
-                    disable_gpu()
-                    backend = get_backend(False)
-                    world = seed_world(256, 256, n=n, seed=seed, backend=backend, profiles=profiles)
-                    kernel = Kernel(world, prog.consts, prog.laws)
-                    W, H = kernel.world.w, kernel.world.h
-                    DT = kernel.world.dt
-                    world = seed_world(W, H, n=n, seed=seed, backend=backend, profiles=profiles)
-                    world.dt = DT
-                    kernel = Kernel(world, prog.consts, prog.laws)
-                else:
-                    raise
-            self.kernel = kernel
-            self.last_frame = self._make_frame()
-
-    def set_run(self, value: bool):
+                kernel = Kernel(world, prog.consts, prog.laws, seed=seed)
+            else:
+                raise
+        self._install(kernel)
+        if self.recorder:
+            self.recorder.log(
+                "apply", dsl=dsl, profiles=profiles, seed=seed, n=n, backend=backend.name, channels=channels
+            )
+
+    def release(self) -> None:
+        # Worker thread: forget the world (session removed)
+        self.running = False
+        self.kernel = None
+        self.recorder = None
+
+    def _install(self, kernel: Kernel) -> None:
+        # Worker thread: make `kernel` current, start recording it, publish its first frame
+        self._generation += 1
+        self.kernel = kernel
+        self.recorder = None
+        if self.replay_dir is not None:
+            self.recorder = Recorder(kernel, self.replay_dir, every=self.replay_every, keep=self.replay_keep)
+        self.frames.publish(self._make_frame())
+
+    # -- checkpoints -------------------------------------------------------
+
+    def _checkpoint_path(self, name: str) -> Path:
+        if not _CHECKPOINT_NAME.fullmatch(name or ""):
+            raise ValueError("checkpoint names may only use letters, digits, '.', '_' and '-'")
+        return self.checkpoint_dir / f"{name}.ckpt"
+
+    def list_checkpoints(self) -> List[Dict[str, Any]]:
+        if not self.checkpoint_dir.is_dir():
+            return []
+        items = []
+        for path in sorted(self.checkpoint_dir.glob("*.ckpt")):
+            stat = path.stat()
+            items.append({"name": path.stem, "bytes": stat.st_size, "modified": stat.st_mtime})
+        return items
+
+    async def save_checkpoint(self, name: str) -> Dict[str, Any]:
+        path = self._checkpoint_path(name)
+        return await asyncio.wrap_future(self._submit(self._save_checkpoint, path))
+
+    def _save_checkpoint(self, path: Path) -> Dict[str, Any]:
+        if not self.kernel:
+            raise ValueError("no world to checkpoint")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.kernel.checkpoint(path)
+        return {"name": path.stem, "t": self.kernel.world.time, "bytes": path.stat().st_size}
+
+    async def restore_checkpoint(self, name: str) -> None:
+        path = self._checkpoint_path(name)
+        if not path.is_file():
+            raise FileNotFoundError(f"no checkpoint named {name}")
+        await asyncio.wrap_future(self._submit(self._restore_checkpoint, path))
+
+    def _restore_checkpoint(self, path: Path) -> None:
+        backend = self.kernel.world.backend if self.kernel else None
+        self._install(Kernel.restore(path, backend))
+        if self.recorder:
+            self.recorder.log("restore", name=path.stem)
+
+    # -- replay ------------------------------------------------------------
+
+    def replay_status(self) -> Dict[str, Any]:
+        recorder = self.recorder
+        if recorder is None:
+            return {"enabled": self.replay_dir is not None, "tick": self.kernel.ticks if self.kernel else 0}
+        return {
+            "enabled": True,
+            "tick": recorder.tick,
+            "checkpoints": sorted(recorder.checkpoints),
+            "events": len(recorder.events),
+        }
+
+    async def seek(self, tick: int) -> None:
+        await asyncio.wrap_future(self._submit(self._seek, int(tick)))
+
+    def _seek(self, tick: int) -> None:
+        if self.recorder is None:
+            raise ValueError("replay recording is not enabled")
+        self.running = False
+        self.kernel = self.recorder.seek(tick)
+        self._generation += 1
+        self.frames.publish(self._make_frame())
+
+    def set_run(self, value: bool) -> Future:
+        return self._submit(self._set_run, bool(value))
+
+    def _set_run(self, value: bool) -> None:
+        if self.recorder and value != self.running:
+            self.recorder.log("run", value=value)
         self.running = value
 
-    def set_rate(self, tick_ms: int, steps: int):
+    def set_rate(self, tick_ms: int, steps: int) -> Future:
+        return self._submit(self._set_rate, int(tick_ms), int(steps))
+
+    def _set_rate(self, tick_ms: int, steps: int) -> None:
+        if self.recorder and (tick_ms, steps) != (self.tick_ms, self.steps):
+            self.recorder.log("rate", tick_ms=tick_ms, steps=steps)
         self.tick_ms = tick_ms
         self.steps = steps
 
-    async def step(self):
+    def step(self) -> None:
+        # Worker thread only (or callers running without a worker)
         if not self.kernel:
             return
         start = time.perf_counter()
         for _ in range(max(1, self.steps)):
-            self.kernel.tick(observer_xy=None, observer_radius=55)
+            if self.recorder:
+                self.recorder.step(observer_xy=None, observer_radius=55)
+            else:
+                self.kernel.tick(observer_xy=None, observer_radius=55)
         elapsed = (time.perf_counter() - start) * 1000.0
         frame = self._make_frame()
-        self.last_frame = frame
-        await self._persist(frame, elapsed)
+        self.frames.publish(frame)
+        self._persist(frame, elapsed)
 
     def _finite(self, value: Any, default: float = 0.0) -> float:
         try:
@@ -176,94 +566,143 @@ class SimulationService:
         }
         return mapping.get(key, "creature")
 
+    def _finite_column(self, values: np.ndarray, default: float = 0.0) -> np.ndarray:
+        return np.where(np.isfinite(values), values, default)
+
     def _make_frame(self) -> Frame:
         kernel = self.kernel
         if not kernel:
-            return Frame(t=0.0, w=1, h=1, entities=[])
-        ents: List[Dict[str, Any]] = []
-        for e in kernel.world.entities:
-            if not e.alive:
-                continue
-            ents.append({
-                "id": int(e.id),
-                "x": self._finite(e.x),
-                "y": self._finite(e.y),
-                "z": self._finite(e.z),
-                "vx": self._finite(e.vx),
-                "vy": self._finite(e.vy),
-                "vz": self._finite(e.vz),
-                "mass": self._finite(e.mass),
-                "hardness": self._finite(e.hardness),
-                "color": str(e.color),
-                "kind": self._kind_from_color(str(e.color)),
-                "size": self._finite(3.0 + self._finite(e.hardness) * 0.6, 3.0),
-                "energy": self._finite(e.energy),
-                "wealth": self._finite(e.wealth),
-            })
+            return Frame(t=0.0, w=1, h=1)
+        store = kernel.world.entities
+        idx = store.alive_indices()
+        cols: Dict[str, np.ndarray] = {"id": store.id[idx].copy()}
+        for name in ENTITY_COLUMNS:
+            cols[name] = self._finite_column(store.column(name)[idx])
+        colors = tuple(store.colors)
+        kind_of = [self._kind_from_color(c) for c in colors]
+        kinds = tuple(dict.fromkeys(kind_of))
+        kind_codes = np.asarray([kinds.index(k) for k in kind_of], dtype=np.int64)
+        codes = store.color_code[idx].astype(np.int64)
+        cols["color_code"] = codes
+        cols["kind_code"] = kind_codes[codes]
+        prev = self.frames.read()
+        version = prev.tables_version if prev is not None else 0
+        if prev is None or prev.colors != colors:
+            version += 1
         return Frame(
             t=self._finite(kernel.world.time),
             w=int(kernel.world.w),
             h=int(kernel.world.h),
-            entities=ents,
+            seq=self.frames.seq + 1,
+            columns={name: _readonly(values) for name, values in cols.items()},
+            colors=colors,
+            kinds=kinds,
+            tables_version=version,
         )
 
     def frame_payload(self) -> Dict[str, Any] | None:
         frame = self.last_frame
         if frame is None:
             return None
-        return {
-            "t": self._finite(frame.t),
-            "w": int(frame.w),
-            "h": int(frame.h),
-            "entities": frame.entities,
-        }
+        return frame.payload()
+
+    async def fields_payload(self, step: int = 4) -> Dict[str, Any] | None:
+        result = await self.fields_response(step)
+        return json.loads(result.body) if result is not None else None
 
-    def fields_payload(self, step: int = 4) -> Dict[str, Any] | None:
+    def fields_etag(self, step: int, fmt: str, names: Tuple[str, ...]) -> str | None:
+        """ETag for the fields as they are now; the versions only move forward, so this is safe off-thread."""
+        kernel = self.kernel
+        if kernel is None:
+            return None
+        return self._fields.etag(self._generation, kernel.world, step, fmt, names)
+
+    async def fields_response(
+        self,
+        step: int = 4,
+        fmt: str = "json",
+        names: Tuple[str, ...] | None = None,
+    ) -> FieldsResult | None:
+        """Encoded field grids, served from cache while none of their versions moved."""
+        step, names = FieldCache.check(step, fmt, names)
+        etag = self.fields_etag(step, fmt, names)
+        if etag is None:
+            return None
+        cached = self._fields.get(etag)
+        if cached is not None:
+            return cached
+        # Field tensors are mutated in place by the worker, so read them between ticks
+        return await asyncio.wrap_future(self._submit(self._encode_fields, step, fmt, names))
+
+    def _encode_fields(self, step: int, fmt: str, names: Tuple[str, ...]) -> FieldsResult | None:
         kernel = self.kernel
         if not kernel:
             return None
-        step = max(1, int(step))
-        backend = kernel.world.backend
-        terrain = backend.asnumpy(kernel.world.terrain_field)[::step, ::step]
-        water = backend.asnumpy(kernel.world.water_field)[::step, ::step]
-        fertility = backend.asnumpy(kernel.world.fertility_field)[::step, ::step]
-        climate = backend.asnumpy(kernel.world.climate_field)[::step, ::step]
-        return {
-            "step": step,
-            "w": int(kernel.world.w),
-            "h": int(kernel.world.h),
-            "grid_w": int(terrain.shape[1]),
-            "grid_h": int(terrain.shape[0]),
-            "terrain": terrain.astype(float).tolist(),
-            "water": water.astype(float).tolist(),
-            "fertility": fertility.astype(float).tolist(),
-            "climate": climate.astype(float).tolist(),
-        }
+        return self._fields.encode(self._generation, kernel.world, step, fmt, names)
 
-    async def _persist(self, frame: Frame, elapsed_ms: float):
+    def _persist(self, frame: Frame, elapsed_ms: float):
         now = time.time()
         if now - self._last_emit < self._persist_every:
             return
         self._last_emit = now
-        payload = json.dumps({
-            "t": frame.t,
-            "w": frame.w,
-            "h": frame.h,
-            "entities": frame.entities,
-        }, allow_nan=False)
+        if self._ordinal is None:
+            self._ordinal = self._last_ordinal()
+        self._ordinal += 1
+        fields = None
+        if self.snapshot_fields and self.kernel:
+            # Fields change in place every tick, so copy them here; compression happens on the writer
+            world, step = self.kernel.world, self.snapshot_field_step
+            sel = [world.channels.index(name) for name in self.snapshot_fields]
+            fields = dict(zip(self.snapshot_fields, world.backend.asnumpy(world.fields[sel, ::step, ::step])))
+        # Queued for the writer thread; the simulation never waits on the database
+        self.persistence.put(
+            SnapshotBlob,
+            t=frame.t,
+            created=now,
+            seq=frame.seq,
+            n=len(frame.columns.get("id", ())),
+            session=self.name,
+            ordinal=self._ordinal,
+            data=lambda: history.encode_snapshot(frame, fields, self.snapshot_field_step),
+        )
+        self.persistence.put(Metric, t=frame.t, elapsed_ms=elapsed_ms, steps=self.steps, note=self.name)
+
+    # -- stored history ---------------------------------------------------
+
+    def _own_history(self) -> Any:
+        # Rows written before sessions existed belong to the default session
+        if self.name == "default":
+            return or_(SnapshotBlob.session == self.name, SnapshotBlob.session.is_(None))
+        return SnapshotBlob.session == self.name
+
+    def list_history(self, t0: float | None = None, t1: float | None = None, limit: int = 500) -> List[Dict[str, Any]]:
+        query = select(SnapshotBlob.id, SnapshotBlob.t, SnapshotBlob.seq, SnapshotBlob.n, SnapshotBlob.created)
+        query = query.where(self._own_history())
+        if t0 is not None:
+            query = query.where(SnapshotBlob.t >= t0)
+        if t1 is not None:
+            query = query.where(SnapshotBlob.t <= t1)
+        query = query.order_by(SnapshotBlob.id.desc()).limit(max(1, int(limit)))
+        with SessionLocal() as session:
+            rows = session.execute(query).all()
+        return [dict(row._mapping) for row in reversed(rows)]
+
+    def load_history(self, snapshot_id: int) -> Tuple[Frame, Dict[str, np.ndarray]] | None:
+        """A stored snapshot as a Frame (so it serializes like a live one) plus its field grids."""
         with SessionLocal() as session:
-            session.add(Snapshot(t=frame.t, payload=payload))
-            session.add(Metric(t=frame.t, elapsed_ms=elapsed_ms, steps=self.steps))
-            session.commit()
-
-    async def loop(self):
-        while True:
-            if self.running:
-                try:
-                    await self.step()
-                except Exception:
-                    logger.exception("Simulation step failed; pausing.")
-                    if self.kernel and self.kernel.world.backend.name == "gpu":
-                        disable_gpu()
-                    self.running = False
-            await asyncio.sleep(self.tick_ms / 1000.0)
+            blob = session.scalar(
+                select(SnapshotBlob.data).where(SnapshotBlob.id == snapshot_id, self._own_history())
+            )
+        if blob is None:
+            return None
+        snap = history.decode_snapshot(blob)
+        frame = Frame(
+            t=snap["t"],
+            w=snap["w"],
+            h=snap["h"],
+            seq=snap["seq"],
+            columns={name: _readonly(values) for name, values in snap["columns"].items()},
+            colors=tuple(snap["colors"]),
+            kinds=tuple(snap["kinds"]),
+        )
+        return frame, snap["fields"]
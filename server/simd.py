@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, Tuple
+
+from . import config
+from .sessions import Session
+from .shm import SharedFrameWriter
+from .sim_service import SimulationService
+
+logger = logging.getLogger("mythos")
+
+# SimulationService methods API workers may call, by name
+SERVICE_METHODS = frozenset({
+    "apply_program",
+    "save_checkpoint",
+    "restore_checkpoint",
+    "list_checkpoints",
+    "replay_status",
+    "seek",
+    "set_run",
+    "set_rate",
+    "list_history",
+    "load_history",
+    "list_presets",
+    "load_worldpack",
+})
+SESSION_METHODS = frozenset({"get", "create", "remove", "list", "metrics", "ping"})
+
+# A reader heartbeat this recent keeps a session from idling
+WATCH_WINDOW = 10.0
+
+
+def parse_address(text: str) -> Any:
+    """``host:port`` for TCP, anything else is a Unix socket path."""
+    host, sep, port = text.rpartition(":")
+    if sep and port.isdigit() and "/" not in text:
+        return (host or "127.0.0.1", int(port))
+    return text
+
+
+def ring_name(prefix: str, session: str) -> str:
+    return f"{prefix}-{session}"
+
+
+class SimServer:
+    """Runs every session in this process for API workers in other processes.
+
+    Each session's frames and fields are published to a shared-memory ring
+    (server/shm.py) that any number of workers read without copying; the
+    commands they forward (apply, run, checkpoints, ...) arrive over a
+    ``multiprocessing.connection`` socket as ``(session, method, args,
+    kwargs)`` and are answered with ``(instance, ok, value)``. ``instance``
+    changes when this process restarts so workers know to re-attach.
+    """
+
+    def __init__(
+        self,
+        address: Any,
+        authkey: bytes,
+        prefix: str = "mythos",
+        slots: int = 8,
+        field_every: float = 0.25,
+    ):
+        self.address = address
+        self.authkey = authkey
+        self.prefix = prefix
+        self.slots = slots
+        self.field_every = field_every
+        self.instance = uuid.uuid4().hex[:12]
+        self.writers: Dict[str, SharedFrameWriter] = {}
+        self.sessions = config.make_sessions(on_service=self._publish_to_ring, keepalive=self._watched)
+        self._listener: Listener | None = None
+        self._closing = False
+
+    def _publish_to_ring(self, service: SimulationService) -> None:
+        writer = SharedFrameWriter(ring_name(self.prefix, service.name), self.slots, self.field_every)
+        self.writers[service.name] = writer
+
+        def publish(frame) -> None:
+            # Frame listeners run on the simulation thread, between ticks
+            kernel = service.kernel
+            writer.publish(frame, kernel.world if kernel else None, service.generation)
+
+        service.frames.listeners.append(publish)
+
+    def _watched(self, session: Session) -> bool:
+        writer = self.writers.get(session.name)
+        recent = writer is not None and time.time() - writer.last_read() < WATCH_WINDOW
+        return recent or bool(session.hub.subscribers)
+
+    # -- commands ----------------------------------------------------------
+
+    def call(self, session: str | None, method: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        if session is None:
+            if method not in SESSION_METHODS:
+                raise ValueError(f"unknown command: {method}")
+            return getattr(self, f"_session_{method}")(*args, **kwargs)
+        if method not in SERVICE_METHODS:
+            raise ValueError(f"unknown command: {method}")
+        result = getattr(self.sessions.get(session).service, method)(*args, **kwargs)
+        if asyncio.iscoroutine(result):
+            return asyncio.run(result)
+        if isinstance(result, Future):
+            return result.result()
+        return result
+
+    def _session_get(self, name: str) -> str:
+        return self.sessions.get(name).name
+
+    def _session_create(self, name: str, weight: float = 1.0) -> str:
+        return self.sessions.create(name, weight).name
+
+    def _session_remove(self, name: str) -> None:
+        self.sessions.remove(name)
+        writer = self.writers.pop(name, None)
+        if writer is not None:
+            # Queued behind the release so no frame is published into a closed ring
+            self.sessions.scheduler.submit(writer.close)
+
+    def _session_list(self):
+        return self.sessions.list()
+
+    def _session_metrics(self):
+        return self.sessions.metrics()
+
+    def _session_ping(self) -> str:
+        return self.instance
+
+    # -- serving -----------------------------------------------------------
+
+    def _serve(self, conn: Connection) -> None:
+        with conn:
+            while True:
+                try:
+                    session, method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    reply: Tuple[str, bool, Any] = (self.instance, True, self.call(session, method, args, kwargs))
+                except (KeyError, ValueError, FileNotFoundError) as exc:
+                    reply = (self.instance, False, exc)
+                except Exception as exc:
+                    logger.exception("%s failed", method)
+                    reply = (self.instance, False, RuntimeError(str(exc)))
+                try:
+                    conn.send(reply)
+                except (OSError, ValueError):
+                    return
+
+    def serve_forever(self) -> None:
+        self.sessions.start()
+        self._closing = False
+        listener = self._listener = Listener(self.address, authkey=self.authkey)
+        logger.info("Simulation process listening on %s", listener.address)
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError):
+                    logger.exception("Rejected a connection")
+                    continue
+                if self._closing:
+                    conn.close()
+                    return
+                threading.Thread(target=self._serve, args=(conn,), name="mythos-rpc", daemon=True).start()
+        finally:
+            listener.close()
+            self._listener = None
+            self.close()
+
+    def shutdown(self) -> None:
+        """Stop ``serve_forever`` from another thread."""
+        if self._listener is None:
+            return
+        self._closing = True
+        # accept() only returns for a connection, so make one
+        Client(self._listener.address, authkey=self.authkey).close()
+
+    def close(self) -> None:
+        self.sessions.stop()
+        for writer in self.writers.values():
+            writer.close()
+        self.writers.clear()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    address = parse_address(config.sim_address() or "127.0.0.1:8765")
+    server = SimServer(
+        address,
+        config.sim_authkey(address),
+        prefix=config.shm_prefix(),
+        slots=int(os.getenv("MYTHOS_SHM_SLOTS", "8")),
+        field_every=float(os.getenv("MYTHOS_SHM_FIELD_MS", "250")) / 1000.0,
+    )
+    # SIGTERM unwinds like Ctrl-C, so the shared-memory segments are unlinked on the way out
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from engine.batch import (
+    ColumnSink,
+    JsonlSink,
+    Sampler,
+    WorldSpec,
+    build_kernel,
+    load_spec,
+    main,
+    override_consts,
+    parse_ids,
+    read_columns,
+    run,
+)
+from engine.compiler import compile_program
+
+
+SRC = "\n".join(
+    [
+        "const W = 64",
+        "const H = 48",
+        "const G = 0.1",
+        "const DRAG = G * 2",
+        "law fall priority 2",
+        "  when true",
+        "  do vy += G; vx -= DRAG * vx",
+        "end",
+        "law jitter priority 1",
+        "  when rand() < 0.5",
+        "  do vx += rand() - 0.5",
+        "end",
+    ]
+)
+
+
+def _spec(n=30):
+    return WorldSpec(name="test", dsl=SRC, seed=5, n=n)
+
+
+class LoadTests(unittest.TestCase):
+    def test_worldpack_and_law_sources(self):
+        pack = load_spec("examples/worldpacks/fantasy.json")
+        self.assertEqual(pack.seed, 77)
+        self.assertEqual(pack.n, sum(p["count"] for p in pack.profiles))
+        law = load_spec("examples/basic.law")
+        self.assertEqual(law.name, "basic")
+        self.assertIsNone(law.profiles)
+
+    def test_kernel_takes_its_size_from_the_consts(self):
+        kernel = build_kernel(_spec())
+        self.assertEqual((kernel.world.w, kernel.world.h), (64, 48))
+        self.assertEqual(kernel.world.fields.shape[1:], (48, 64))
+        self.assertEqual(len(kernel.world.entities), 30)
+
+    def test_const_overrides_replace_in_place(self):
+        prog = override_consts(compile_program(SRC), {"G": 0.5, "SUBSTEPS": 2})
+        self.assertEqual(list(prog.consts), ["W", "H", "G", "DRAG", "SUBSTEPS"])
+        self.assertEqual(prog.consts["G"].src, "0.5")
+        kernel = build_kernel(_spec(), consts={"G": 0.5, "SUBSTEPS": 2})
+        self.assertEqual(kernel.consts["DRAG"], 1.0)
+        self.assertEqual(kernel.cfg.substeps, 2)
+
+    def test_parse_ids(self):
+        np.testing.assert_array_equal(parse_ids("1, 4,7-9"), [1, 4, 7, 8, 9])
+
+
+class RunTests(unittest.TestCase):
+    def test_jsonl_samples_every_n_ticks_and_the_last(self):
+        out = io.StringIO()
+        summary = run(build_kernel(_spec()), 25, JsonlSink(out), Sampler(columns=("id", "x", "color")), every=10)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row["tick"] for row in rows], [0, 10, 20, 25])
+        self.assertEqual(summary["samples"], 4)
+        self.assertEqual(rows[0]["count"], 30)
+        self.assertIsInstance(rows[0]["entities"]["color"][0], str)
+        self.assertNotIn("fields", rows[0])
+
+    def test_runs_are_deterministic_for_a_seed(self):
+        a, b = io.StringIO(), io.StringIO()
+        run(build_kernel(_spec()), 20, JsonlSink(a), every=5)
+        run(build_kernel(_spec()), 20, JsonlSink(b), every=5)
+        self.assertEqual(a.getvalue(), b.getvalue())
+
+    def test_entity_subset(self):
+        kernel = build_kernel(_spec())
+        sampler = Sampler(columns=("id",), ids=[2, 3, 99])
+        self.assertEqual(sampler.sample(kernel)["entities"]["id"].tolist(), [2, 3])
+        color = kernel.world.entities.colors[0]
+        sample = Sampler(columns=("color",), colors=[color]).sample(kernel)
+        self.assertTrue(sample["count"] > 0)
+        self.assertTrue(np.all(sample["entities"]["color"] == 0))
+        with self.assertRaises(ValueError):
+            Sampler(columns=("nope",))
+        with self.assertRaises(ValueError):
+            run(kernel, 1, JsonlSink(io.StringIO()), Sampler(fields=("nope",)))
+
+    def test_column_files_round_trip(self):
+        directory = Path(tempfile.mkdtemp()) / "run"
+        kernel = build_kernel(_spec())
+        sampler = Sampler(columns=("id", "x", "alive", "color"), fields=("food",), field_step=8, field_every=2)
+        run(kernel, 12, ColumnSink(directory), sampler, every=4)
+        data = read_columns(directory)
+        self.assertEqual([s["tick"] for s in data["samples"]], [0, 4, 8, 12])
+        last = data["samples"][-1]
+        x = data["entities"]["x"][last["offset"]:last["offset"] + last["count"]]
+        rows = kernel.world.entities.alive_indices()
+        np.testing.assert_array_equal(x, kernel.world.entities.x[rows])
+        self.assertEqual(data["entities"]["alive"].dtype, np.bool_)
+        self.assertEqual(data["fields"]["food"].shape, (2, 6, 8))
+        self.assertEqual([s["fields"] for s in data["samples"]], [True, False, True, False])
+        self.assertEqual(data["colors"], kernel.world.entities.colors)
+
+    def test_command_line(self):
+        directory = Path(tempfile.mkdtemp())
+        law = directory / "fall.law"
+        law.write_text(SRC, encoding="utf-8")
+        out = directory / "out.jsonl"
+        self.assertEqual(main(["run", str(law), "--ticks", "6", "--every", "3", "--n", "12",
+                               "--const", "G=0.3", "--fields", "food", "--out", str(out)]), 0)
+        rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual([row["tick"] for row in rows], [0, 3, 6])
+        self.assertEqual(rows[0]["count"], 12)
+        self.assertEqual(len(rows[0]["fields"]["food"]), 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+
+import numpy as np
+
+from engine.batch import WorldSpec, build_kernel
+from engine.batched import BatchedKernel
+from engine.model import ENTITY_COLUMNS
+from engine.spatial import SpatialIndex, StackedIndex
+
+
+SRC = "\n".join(
+    [
+        "const W = 96",
+        "const H = 64",
+        "const SUBSTEPS = 2",
+        "law jitter priority 9",
+        "  when rand() < 0.6",
+        "  do vx += rand() - 0.5; vy += (rand() - 0.5) * 0.2",
+        "end",
+        "law flock priority 8",
+        "  when true",
+        '  do separate(10, 0.02); cohere(25, 0.01, color == "red"); align(20, 0.05, rand() < 0.5)',
+        "end",
+        "law pull priority 7",
+        '  when color == "blue"',
+        '  do attract(30, 0.3, color == "red")',
+        "end",
+        "law paint priority 6",
+        "  when water > 0.1 and energy > 0.5",
+        '  do color = "green"; emit_sound(0.2)',
+        "end",
+        "law starve priority 5",
+        "  when rand() < 0.01",
+        "  do alive = false",
+        "end",
+        "law drain priority 4",
+        "  when true",
+        "  do energy -= 0.01 * latitude + terrain * 0.01",
+        "end",
+    ]
+)
+
+SPEC = WorldSpec(name="test", dsl=SRC, seed=1, n=60)
+
+
+def _kernels(seeds=(1, 2, 3, 4), counts=(60, 35, 90, 0)):
+    kernels = []
+    for seed, n in zip(seeds, counts):
+        kernel = build_kernel(SPEC, seed=seed, n=n, vectorize=True)
+        kernel.world.terrain_field[...] = np.random.default_rng(seed).random(kernel.world.terrain_field.shape)
+        kernel.world.climate_field[...] = 0.6
+        kernels.append(kernel)
+    return kernels
+
+
+def _state(kernel):
+    store = kernel.world.entities
+    cols = [store.column(name) for name in ENTITY_COLUMNS if name != "color_code"]
+    return cols + [np.array(store.color_names()), np.asarray(kernel.world.fields), kernel.world.time, kernel.ticks]
+
+
+class BatchedKernelTests(unittest.TestCase):
+    def test_matches_independent_kernels(self):
+        alone = _kernels()
+        batched = BatchedKernel(_kernels())
+        self.assertEqual(batched.stride, 90)
+        for _ in range(15):
+            for kernel in alone:
+                kernel.tick()
+            batched.tick()
+        self.assertEqual(batched.ticks, 15)
+        for a, b in zip(alone, batched.kernels):
+            for x, y in zip(_state(a), _state(b)):
+                np.testing.assert_array_equal(x, y)
+        self.assertTrue(any(len(k.world.entities.alive_indices()) < n for k, n in zip(alone, (60, 35, 90))))
+
+    def test_world_views_stay_current(self):
+        batched = BatchedKernel(_kernels(counts=(10, 20)))
+        batched.tick()
+        world = batched.kernels[0].world
+        self.assertEqual(len(world.entities), 10)
+        np.testing.assert_array_equal(world.entities.x, batched.entities.x[:10])
+        np.testing.assert_array_equal(world.fields, batched.fields[:, 0])
+        self.assertFalse(batched.entities.alive[10:20].any())
+
+    def test_rejects_mismatched_worlds(self):
+        with self.assertRaises(ValueError):
+            BatchedKernel([build_kernel(SPEC, seed=1, vectorize=False)])
+        with self.assertRaises(ValueError):
+            BatchedKernel([build_kernel(SPEC, seed=1, vectorize=True),
+                           build_kernel(SPEC, seed=2, consts={"W": 64}, vectorize=True)])
+        with self.assertRaises(ValueError):
+            BatchedKernel([])
+
+    def test_seeded(self):
+        batched = BatchedKernel.seeded(SPEC, [7, 8, 9], n=12)
+        self.assertEqual(len(batched), 3)
+        self.assertEqual(batched.fields.shape[1], 3)
+        batched.tick()
+        alone = build_kernel(SPEC, seed=8, n=12, vectorize=True)
+        alone.tick()
+        np.testing.assert_array_equal(alone.world.entities.x, batched.kernels[1].world.entities.x)
+
+
+class StackedIndexTests(unittest.TestCase):
+    def test_pairs_match_each_worlds_index(self):
+        rng = np.random.default_rng(4)
+        stride, sizes = 50, (50, 20, 0, 35)
+        x = rng.uniform(-40, 300, stride * len(sizes))
+        y = rng.uniform(0, 120, stride * len(sizes))
+        indexes = []
+        for k, n in enumerate(sizes):
+            index = SpatialIndex(cell_size=16)
+            index.build(x[k * stride:(k + 1) * stride], y[k * stride:(k + 1) * stride], np.arange(n))
+            indexes.append(index)
+        stacked = StackedIndex(stride)
+        stacked.build(indexes)
+        rows = np.concatenate([np.arange(n) + k * stride for k, n in enumerate(sizes)])
+        radius = rng.uniform(5, 40, rows.size)
+        qi, nj = stacked.query_radius(x[rows], y[rows], radius, x, y, exclude=rows)
+        start = 0
+        for k, n in enumerate(sizes):
+            base = k * stride
+            want_qi, want_nj = indexes[k].query_radius(
+                x[rows[start:start + n]], y[rows[start:start + n]], radius[start:start + n],
+                x[base:base + stride], y[base:base + stride], exclude=np.arange(n),
+            )
+            mine = (qi >= start) & (qi < start + n)
+            np.testing.assert_array_equal(qi[mine] - start, want_qi)
+            np.testing.assert_array_equal(nj[mine] - base, want_nj)
+            start += n
+
+
+if __name__ == "__main__":
+    unittest.main()
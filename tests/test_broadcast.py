@@ -0,0 +1,162 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.sqlite3")
+
+from server import protocol
+from server.broadcast import DeltaEncoder, FrameHub, Viewport
+from server.sim_service import Frame, FrameBuffer
+
+
+def _frame(seq):
+    cols = {"id": np.arange(3)}
+    for name in protocol.FLOAT_COLUMNS:
+        cols[name] = np.full(3, float(seq))
+    cols["color_code"] = cols["kind_code"] = np.zeros(3, dtype=np.int64)
+    return Frame(t=float(seq), w=8, h=8, seq=seq, columns=cols, colors=("red",), kinds=("creature",), tables_version=1)
+
+
+class FrameHubTests(unittest.TestCase):
+    def test_frames_are_encoded_once_and_slow_clients_skip_ahead(self):
+        async def scenario():
+            frames = FrameBuffer()
+            hub = FrameHub(frames)
+            fast = [hub.subscribe("binary") for _ in range(5)]
+            slow = hub.subscribe("binary")
+            viewer = hub.subscribe("json")
+            encode = mock.Mock(side_effect=protocol.encode_frame)
+            with mock.patch.object(protocol, "encode_frame", encode):
+                for seq in range(1, 4):
+                    # Publish from another thread, as the simulation worker does
+                    t = threading.Thread(target=frames.publish, args=(_frame(seq),))
+                    t.start()
+                    t.join()
+                    await asyncio.sleep(0.01)
+                    for sub in fast:
+                        got = await sub.next()
+                        self.assertEqual(protocol.decode_frame(got.binary)["seq"], seq)
+            self.assertEqual(encode.call_count, 3)
+            last = await slow.next()
+            self.assertEqual((last.seq, slow.delivered, slow.dropped), (3, 1, 2))
+            self.assertEqual(json.loads((await viewer.next()).json_text)["seq"], 3)
+
+            # A late subscriber starts from the current frame, and gets no repeats
+            late = hub.subscribe("binary")
+            self.assertEqual((await late.next()).seq, 3)
+            hub._deliver(frames.read())
+            self.assertFalse(late._ready.is_set())
+            hub.unsubscribe(late)
+            self.assertNotIn(late, hub.subscribers)
+
+        asyncio.run(scenario())
+
+    def test_viewport_index_is_built_when_the_frame_is_published(self):
+        async def scenario():
+            frames = FrameBuffer()
+            hub = FrameHub(frames)
+            sub = hub.subscribe("binary")
+            frames.publish(_frame(1))
+            self.assertNotIn("index", vars(frames.read()))
+            hub.set_viewport(sub, Viewport(0, 0, 8, 8))
+            t = threading.Thread(target=frames.publish, args=(_frame(2),))
+            t.start()
+            t.join()
+            frame = frames.read()
+            self.assertIn("index", vars(frame))
+            msg = await asyncio.to_thread(hub.viewport_message, frame, sub.viewport)
+            self.assertEqual(protocol.decode_frame(msg)["id"].tolist(), [0, 1, 2])
+
+        asyncio.run(scenario())
+
+
+class DeltaStreamTests(unittest.TestCase):
+    def _frames(self, count):
+        rng = np.random.default_rng(5)
+        ids = np.arange(1, 201)
+        state = {name: rng.uniform(-50, 50, ids.size) for name in protocol.FLOAT_COLUMNS}
+        moving = np.arange(ids.size) % 4 == 0  # the rest stand still, like homesteads
+        for seq in range(1, count + 1):
+            if seq == 6:
+                keep = ids != 17
+                ids, moving = ids[keep], moving[keep]
+                state = {k: v[keep] for k, v in state.items()}
+            if seq == 9:
+                ids = np.append(ids, 500)
+                moving = np.append(moving, True)
+                state = {k: np.append(v, 1.25) for k, v in state.items()}
+            state["x"] = state["x"] + moving * rng.normal(0, 1.5, ids.size)
+            state["vx"] = np.where(moving, rng.normal(0, 0.5, ids.size), state["vx"])
+            cols = {"id": ids.copy(), **{k: v.copy() for k, v in state.items()}}
+            cols["kind_code"] = np.zeros(ids.size, dtype=np.int64)
+            cols["color_code"] = (ids % 3).astype(np.int64)
+            yield Frame(t=float(seq), w=64, h=64, seq=seq, columns=cols, colors=("a", "b", "c"), kinds=("k",))
+
+    def test_client_reconstructs_quantized_state(self):
+        enc = DeltaEncoder(keyframe_every=5, precision=0.01)
+        client = protocol.DeltaDecoder()
+        sizes = {}
+        for frame in self._frames(14):
+            enc.on_frame(frame)
+            if frame.seq == 11:
+                continue  # client too slow for this one: the next message must be a keyframe
+            msg = enc.message(frame, client.seq)
+            flags = protocol.DELTA_HEADER.unpack_from(msg)[1]
+            self.assertEqual(bool(flags & protocol.KEYFRAME), frame.seq in (1, 5, 10, 12))
+            self.assertTrue(client.apply(msg))
+            sizes[frame.seq] = (len(msg), len(frame.binary))
+            got = client.columns()
+            np.testing.assert_array_equal(got["id"], frame.columns["id"])
+            for name in protocol.FLOAT_COLUMNS:
+                np.testing.assert_allclose(got[name], frame.columns[name], atol=0.005 + 1e-9)
+            np.testing.assert_array_equal(got["color_code"], frame.columns["color_code"])
+        delta_bytes, binary_bytes = sizes[3]
+        self.assertLess(delta_bytes * 4, binary_bytes)
+        # A diff against a base the client does not hold is refused
+        stale = protocol.DeltaDecoder()
+        self.assertFalse(stale.apply(enc.message(frame, frame.seq - 1)))
+
+
+class ViewportTests(unittest.TestCase):
+    def test_viewport_sends_visible_entities_or_clusters(self):
+        rng = np.random.default_rng(8)
+        n = 2000
+        cols = {"id": np.arange(1, n + 1)}
+        for name in protocol.FLOAT_COLUMNS:
+            cols[name] = rng.uniform(0, 1000, n)
+        cols["kind_code"] = (np.arange(n) % 2).astype(np.int64)
+        cols["color_code"] = np.zeros(n, dtype=np.int64)
+        frame = Frame(t=1.0, w=1000, h=1000, seq=4, columns=cols, colors=("a",), kinds=("k0", "k1"))
+        frames = FrameBuffer()
+        frames.publish(frame)
+        hub = FrameHub(frames)
+
+        view = Viewport.from_message({"type": "viewport", "rect": [300, 400, 100, 200], "margin": 20})
+        self.assertEqual(view.bounds(), (80.0, 180.0, 320.0, 420.0))
+        msg = hub.viewport_message(frame, view)
+        self.assertIs(hub.viewport_message(frame, Viewport(100, 200, 300, 400, 20)), msg)
+        got = protocol.decode_frame(msg)
+        x, y = cols["x"], cols["y"]
+        inside = (x >= 80) & (x <= 320) & (y >= 180) & (y <= 420)
+        np.testing.assert_array_equal(got["id"], cols["id"][inside])
+        self.assertLess(len(msg) * 10, len(frame.binary))
+
+        clusters = protocol.decode_clusters(hub.viewport_message(frame, Viewport(0, 0, 1000, 1000, lod=250)))
+        self.assertEqual((clusters["n"], int(clusters["count"].sum())), (16, n))
+        cell = (clusters["x"] // 250).astype(int) + 4 * (clusters["y"] // 250).astype(int)
+        expected = np.bincount((x // 250).astype(int) + 4 * (y // 250).astype(int), minlength=16)
+        np.testing.assert_array_equal(clusters["count"], expected[cell])
+
+        self.assertIsNone(Viewport.from_message({"type": "viewport", "rect": None}))
+        with self.assertRaises(ValueError):
+            Viewport.from_message({"type": "viewport", "rect": [0, 0, float("inf"), 1]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from engine.compiler import compile_program
+from engine.factory import seed_world
+from engine.kernel import Kernel
+from engine.model import ENTITY_COLUMNS
+
+
+SRC = "\n".join(
+    [
+        "const MAX_SPEED = 3.0",
+        "law jitter priority 2",
+        "  when rand() < 0.5",
+        "  do vx += rand() - 0.5; vy += 0.05",
+        "end",
+        "law flock priority 1",
+        "  when true",
+        "  do cohere(40, 0.01)",
+        "end",
+    ]
+)
+
+
+def _state(kernel):
+    world = kernel.world
+    cols = {name: world.entities.column(name).copy() for name in ENTITY_COLUMNS}
+    return cols, world.fields.copy(), world.time, list(world.entities.colors)
+
+
+class CheckpointTests(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "world.ckpt")
+
+    def _kernel(self, vectorize=False):
+        prog = compile_program(SRC)
+        world = seed_world(96, 64, n=60, seed=5, channels=[{"name": "scent", "decay": 0.9, "diffuse": True}])
+        return Kernel(world, prog.consts, prog.laws, vectorize=vectorize, seed=11)
+
+    def test_restored_kernel_continues_identically(self):
+        for vectorize in (False, True):
+            kernel = self._kernel(vectorize)
+            for _ in range(4):
+                kernel.tick()
+            kernel.world.entities[3].color = "checkpointed"
+            kernel.world.field("scent")[5, 7] = 2.5
+            kernel.checkpoint(self.path)
+            for _ in range(6):
+                kernel.tick()
+            expected = _state(kernel)
+
+            restored = Kernel.restore(self.path)
+            self.assertEqual(restored.world.channels.names, kernel.world.channels.names)
+            self.assertEqual((restored.cfg.vectorize, restored.ticks), (vectorize, 4))
+            for _ in range(6):
+                restored.tick()
+            cols, fields, t, colors = _state(restored)
+            for name in ENTITY_COLUMNS:
+                np.testing.assert_array_equal(cols[name], expected[0][name], err_msg=name)
+            np.testing.assert_array_equal(fields, expected[1])
+            self.assertEqual((t, colors), expected[2:])
+
+    def test_restore_does_not_write_back_to_the_file(self):
+        kernel = self._kernel()
+        kernel.checkpoint(self.path)
+        with open(self.path, "rb") as f:
+            before = f.read()
+        restored = Kernel.restore(self.path)
+        restored.world.fields += 1.0
+        restored.tick()
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), before)
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a checkpoint" * 4)
+        with self.assertRaises(ValueError):
+            Kernel.restore(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
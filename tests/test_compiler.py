@@ -0,0 +1,91 @@
+import unittest
+
+from engine.backend import get_backend
+from engine.compiler import compile_law_function, compile_program
+from engine.factory import seed_world
+from engine.kernel import Kernel
+
+SRC = "\n".join(
+    [
+        "const G = -0.12",
+        "const LIMIT = 0.5",
+        "law fall priority 10",
+        "  when true",
+        "  do vy -= G ** 2; hardness /= max(mass, 1.5)",
+        "end",
+        "law noisy priority 5",
+        "  when color == \"metal\" or vx > LIMIT",
+        "  do emit_sound(0.1 * mass); vx = clamp(vx, -LIMIT, LIMIT)",
+        "  do separate(6, 0.08, true)",
+        "end",
+        "law tired priority 1",
+        "  when sound > 0.15",
+        "  do alive = false; color = \"gray\"",
+        "end",
+    ]
+)
+
+
+class LawCodegenTests(unittest.TestCase):
+    def test_constants_are_inlined(self):
+        prog = compile_program(SRC)
+        lf = compile_law_function(prog.laws[0], {"G": -0.12, "LIMIT": 0.5})
+        self.assertIsNotNone(lf)
+        self.assertNotIn("G", lf.source)
+        self.assertIn("0.0144", lf.source)
+        self.assertNotIn("if not", lf.source.split("def prepare_")[0])
+        self.assertEqual(lf.fn(*([1.0] * 8), "red", 0.0, 1.0, True, 0.0, 1.0, 0.0, None, None, lf.prepare(0.0, 0.0)),
+                         {"vy": 1.0 - 0.0144, "hardness": 1.0 / 1.5})
+
+    def test_tick_uniforms_are_hoisted(self):
+        prog = compile_program("law l priority 1\n  when season > 0.5 and rain < 0.2\n  do vx += sin(season * 3.14) * mass\nend")
+        lf = compile_law_function(prog.laws[0], {})
+        self.assertNotIn("season", lf.source.split("def prepare_")[0])
+        self.assertIsNone(lf.prepare(0.2, 0.1))
+        h = lf.prepare(0.7, 0.1)
+        self.assertEqual(lf.fn(*([1.0] * 8), "red", 0.0, 1.0, True, 0.0, 1.0, 0.0, None, None, h),
+                         {"vx": 1.0 + h[0] * 1.0})
+
+    def test_unknown_names_fall_back(self):
+        prog = compile_program("law l priority 1\n  when terrain > 1\n  do vx += 1\nend")
+        self.assertIsNone(compile_law_function(prog.laws[0], {}))
+
+    def test_generated_functions_match_eval_path(self):
+        def run(use_codegen):
+            prog = compile_program(SRC)
+            world = seed_world(48, 48, n=60, seed=9, backend=get_backend(False))
+            kernel = Kernel(world, prog.consts, prog.laws)
+            if not use_codegen:
+                kernel.law_fns = [None] * len(kernel.laws)
+            else:
+                self.assertTrue(all(kernel.law_fns))
+            for _ in range(4):
+                kernel.tick()
+            return [(e.x, e.y, e.vx, e.vy, e.hardness, e.sound, e.alive, e.color) for e in world.entities]
+
+        self.assertEqual(run(True), run(False))
+
+    def test_scratch_names_carry_across_an_entitys_laws(self):
+        src = "\n".join(
+            [
+                "law mark priority 9",
+                "  when true",
+                "  do foo = 5",
+                "end",
+                "law reward priority 1",
+                "  when foo > 1",
+                "  do energy += 1",
+                "end",
+            ]
+        )
+        for vectorize in (False, True):
+            prog = compile_program(src)
+            world = seed_world(48, 48, n=20, seed=9, backend=get_backend(False))
+            kernel = Kernel(world, prog.consts, prog.laws, vectorize=vectorize)
+            before = world.entities.energy.copy()
+            kernel.tick()
+            self.assertEqual((world.entities.energy - before).tolist(), [1.0] * 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
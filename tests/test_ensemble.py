@@ -0,0 +1,71 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from engine.batch import WorldSpec, build_kernel, main
+from engine.ensemble import expand_grid, summarize, sweep
+
+
+SRC = "\n".join(
+    [
+        "const W = 48",
+        "const H = 32",
+        "const G = 0.1",
+        "law fall priority 2",
+        "  when true",
+        "  do vy += G",
+        "end",
+        "law jitter priority 1",
+        "  when rand() < 0.5",
+        "  do vx += rand() - 0.5; energy -= 0.01",
+        "end",
+    ]
+)
+
+SPEC = WorldSpec(name="test", dsl=SRC, seed=5, n=20)
+
+
+class EnsembleTests(unittest.TestCase):
+    def test_expand_grid(self):
+        self.assertEqual(
+            expand_grid({"G": [1, 2], "SUBSTEPS": [3]}),
+            [{"G": 1, "SUBSTEPS": 3}, {"G": 2, "SUBSTEPS": 3}],
+        )
+
+    def test_pool_matches_serial_runs(self):
+        variants = expand_grid({"G": [0.05, 0.2]})
+        pooled = sorted(sweep(SPEC, variants, seeds=[1, 2], ticks=5, workers=2), key=lambda r: r["run"])
+        serial = list(sweep(SPEC, variants, seeds=[1, 2], ticks=5, workers=1))
+        self.assertEqual([(r["run"], r["seed"], r["consts"]) for r in pooled], [
+            (0, 1, {"G": 0.05}), (1, 2, {"G": 0.05}), (2, 1, {"G": 0.2}), (3, 2, {"G": 0.2}),
+        ])
+        strip = lambda r: {k: v for k, v in r.items() if k not in ("elapsed_s", "ticks_per_s")}
+        self.assertEqual([strip(r) for r in pooled], [strip(r) for r in serial])
+
+        kernel = build_kernel(SPEC, seed=2, consts={"G": 0.2})
+        for _ in range(5):
+            kernel.tick(observer_xy=None)
+        self.assertEqual({k: pooled[3][k] for k in summarize(kernel)}, summarize(kernel))
+
+    def test_a_failing_variant_reports_its_error(self):
+        results = list(sweep(SPEC, [{"G": "1 +"}, {"G": 0.3}], ticks=2, workers=1))
+        self.assertIn("error", results[0])
+        self.assertNotIn("error", results[1])
+        self.assertEqual(results[1]["alive"], 20)
+
+    def test_command_line(self):
+        directory = Path(tempfile.mkdtemp())
+        law = directory / "fall.law"
+        law.write_text(SRC, encoding="utf-8")
+        out = directory / "sweep.jsonl"
+        code = main(["sweep", str(law), "--ticks", "2", "--grid", "G=0.1,0.2", "--grid", "SUBSTEPS=1,2",
+                     "--seeds", "1-2", "--n", "10", "--workers", "1", "--out", str(out)])
+        self.assertEqual(code, 0)
+        rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(rows[-1]["consts"], {"G": "0.2", "SUBSTEPS": "2"})
+
+
+if __name__ == "__main__":
+    unittest.main()
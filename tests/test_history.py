@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.sqlite3")
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from server import history
+from server.models import Base, SnapshotBlob
+from server.sim_service import Frame
+
+
+def _frame(n=50, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = {"id": np.arange(1, n + 1, dtype=np.uint32)}
+    for name in ("x", "y", "z", "vx", "vy", "vz", "mass", "hardness", "energy", "wealth"):
+        columns[name] = rng.normal(size=n) * 50
+    columns["color_code"] = rng.integers(0, 2, size=n).astype(np.uint16)
+    columns["kind_code"] = np.zeros(n, dtype=np.uint16)
+    return Frame(t=12.5, w=320, h=224, seq=9, columns=columns, colors=("red", "blue"), kinds=("beast",))
+
+
+class SnapshotFormatTests(unittest.TestCase):
+    def test_round_trip_keeps_columns_tables_and_fields(self):
+        frame = _frame()
+        grid = np.linspace(0, 1, 40 * 56, dtype=np.float32).reshape(40, 56)
+        snap = history.decode_snapshot(history.encode_snapshot(frame, {"terrain": grid}, step=4))
+        self.assertEqual((snap["t"], snap["seq"], snap["w"], snap["h"], snap["step"]), (12.5, 9, 320, 224, 4))
+        self.assertEqual((snap["colors"], snap["kinds"]), (["red", "blue"], ["beast"]))
+        np.testing.assert_array_equal(snap["columns"]["id"], frame.columns["id"])
+        np.testing.assert_array_equal(snap["columns"]["color_code"], frame.columns["color_code"])
+        np.testing.assert_allclose(snap["columns"]["x"], frame.columns["x"], rtol=1e-6)
+        np.testing.assert_array_equal(snap["fields"]["terrain"], grid)
+
+    def test_empty_frame(self):
+        frame = _frame(n=0)
+        snap = history.decode_snapshot(history.encode_snapshot(frame))
+        self.assertEqual(snap["columns"]["x"].shape, (0,))
+        self.assertEqual(snap["fields"], {})
+
+    def test_blob_is_smaller_than_the_json_payload(self):
+        frame = _frame(n=500)
+        self.assertLess(len(history.encode_snapshot(frame)) * 2, len(frame.json_text))
+
+
+class RetentionTests(unittest.TestCase):
+    def test_old_snapshots_are_thinned_by_tier(self):
+        engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/retention.sqlite3", future=True)
+        Base.metadata.create_all(bind=engine)
+        sessions = sessionmaker(bind=engine, future=True)
+        now = 100_000.0
+        with sessions() as session:
+            # ids 1..120: the first 60 are two days old, the next 60 two hours old; then 10 fresh ones
+            for i in range(130):
+                age = 2 * 86400 if i < 60 else 7200 if i < 120 else 10
+                session.add(SnapshotBlob(t=float(i), created=now - age, seq=i, n=0, data=b""))
+            session.commit()
+            tiers = history.parse_retention("3600:10,86400:60")
+            self.assertEqual(tiers, ((3600.0, 10), (86400.0, 60)))
+            history.thin_history(session, now, tiers)
+            history.thin_history(session, now, tiers)
+            session.commit()
+            ids = session.scalars(select(SnapshotBlob.id).order_by(SnapshotBlob.id)).all()
+        self.assertEqual(ids, [60, 70, 80, 90, 100, 110, 120] + list(range(121, 131)))
+
+    def test_sessions_are_thinned_independently(self):
+        engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/sessions.sqlite3", future=True)
+        Base.metadata.create_all(bind=engine)
+        sessions = sessionmaker(bind=engine, future=True)
+        now = 100_000.0
+        with sessions() as session:
+            # Two sessions writing in turn, so their ids interleave
+            for i in range(200):
+                name = "ab"[i % 2]
+                session.add(SnapshotBlob(t=float(i), created=now - 7200, seq=i, n=0, session=name,
+                                         ordinal=i // 2 + 1, data=b""))
+            session.commit()
+            history.thin_history(session, now, ((3600.0, 10),))
+            history.thin_history(session, now, ((3600.0, 10),))
+            session.commit()
+            rows = session.execute(select(SnapshotBlob.session, SnapshotBlob.ordinal).order_by(SnapshotBlob.id)).all()
+        for name in "ab":
+            self.assertEqual([o for s, o in rows if s == name], list(range(10, 101, 10)))
+
+
+if __name__ == "__main__":
+    unittest.main()
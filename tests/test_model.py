@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+
+from engine.backend import get_backend
+from engine.factory import seed_world
+from engine.model import Entity, EntityStore, World
+
+
+class EntityStoreTests(unittest.TestCase):
+    def test_append_and_view_roundtrip(self):
+        store = EntityStore(capacity=1)
+        for i in range(5):
+            store.append(Entity(id=i + 1, x=i, y=2.0 * i, z=0.0, vx=0.5, vy=0.0, vz=0.0,
+                                mass=1.0, hardness=1.0, color="red" if i % 2 else "blue"))
+        self.assertEqual(len(store), 5)
+        self.assertEqual(store.colors, ["blue", "red"])
+        self.assertEqual(store.y.tolist(), [0.0, 2.0, 4.0, 6.0, 8.0])
+
+        e = store[3]
+        self.assertEqual((e.id, e.x, e.color), (4, 3.0, "red"))
+        e.apply_env({"x": 9.5, "color": "gold", "alive": False})
+        self.assertEqual(store.x[3], 9.5)
+        self.assertEqual(store.color_names()[3], "gold")
+        self.assertEqual(store.alive_indices().tolist(), [0, 1, 2, 4])
+        self.assertEqual([v.id for v in store[:2]], [1, 2])
+
+    def test_world_wraps_entity_list(self):
+        world = World(w=8, h=8, dt=1.0, entities=[
+            Entity(id=1, x=1.0, y=1.0, z=0.0, vx=1.0, vy=0.0, vz=0.0, mass=1.0, hardness=1.0, color="gray"),
+        ])
+        self.assertIsInstance(world.entities, EntityStore)
+        self.assertEqual(world.entities[0].color, "gray")
+
+    def test_step_integrate_matches_per_entity_update(self):
+        world = seed_world(32, 24, n=40, seed=7, backend=get_backend(False))
+        world.entities.alive[::5] = False
+        world.sound_field[:] = np.linspace(0.0, 1.0, 32 * 24, dtype=np.float32).reshape(24, 32)
+        before = [(e.x, e.vx, e.y, e.vy, e.seen, e.alive) for e in world.entities]
+        world.step_integrate()
+        sound = world.sound_field
+        for (x, vx, y, vy, seen, alive), e in zip(before, world.entities):
+            if not alive:
+                self.assertEqual(e.x, x)
+                continue
+            self.assertEqual(e.x, x + vx)
+            self.assertEqual(e.y, y + vy)
+            self.assertAlmostEqual(e.seen, max(0.0, seen - 0.01))
+            ix = int(max(0, min(31, round(e.x))))
+            iy = int(max(0, min(23, round(e.y))))
+            self.assertEqual(e.sound, float(sound[iy, ix]))
+        self.assertAlmostEqual(float(world.trail_field.sum()), 0.35 * 32, places=4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import tempfile
+import threading
+import time
+import unittest
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from server.models import Base, Metric, Snapshot
+from server.persistence import WriteBehindQueue
+
+
+class WriteBehindQueueTests(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/persist.sqlite3", future=True)
+        Base.metadata.create_all(bind=engine)
+        self.sessions = sessionmaker(bind=engine, future=True)
+
+    def count(self, model):
+        with self.sessions() as session:
+            return session.scalar(select(func.count()).select_from(model))
+
+    def test_rows_are_written_in_batches(self):
+        queue = WriteBehindQueue(self.sessions, batch_size=10, flush_ms=50)
+        queue.start()
+        try:
+            for i in range(25):
+                queue.put(Snapshot, t=float(i), payload=lambda i=i: f'{{"t": {i}}}')
+                queue.put(Metric, t=float(i), elapsed_ms=1.0, steps=1)
+            deadline = time.time() + 5
+            while queue.written < 50 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            queue.stop()
+        self.assertEqual((self.count(Snapshot), self.count(Metric)), (25, 25))
+        stats = queue.stats()
+        self.assertEqual(stats["depth"], 0)
+        self.assertLess(stats["batches"], 10)
+        with self.sessions() as session:
+            self.assertEqual(session.scalar(select(Snapshot.payload).where(Snapshot.t == 7.0)), '{"t": 7}')
+
+    def test_a_row_that_fails_to_encode_does_not_stop_the_writer(self):
+        def broken():
+            raise ValueError("cannot encode")
+
+        queue = WriteBehindQueue(self.sessions, batch_size=2, flush_ms=10)
+        queue.start()
+        try:
+            with self.assertLogs("mythos", "ERROR"):
+                queue.put(Snapshot, t=0.0, payload=broken)
+                queue.put(Snapshot, t=1.0, payload="{}")
+                deadline = time.time() + 5
+                while queue.written < 1 and time.time() < deadline:
+                    time.sleep(0.01)
+            queue.put(Snapshot, t=2.0, payload="{}")
+            while queue.written < 2 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(queue._thread.is_alive())
+        finally:
+            queue.stop()
+        self.assertEqual(self.count(Snapshot), 2)
+        self.assertEqual((queue.stats()["failed"], queue.stats()["written"]), (1, 2))
+
+    def test_full_queue_drops_by_policy(self):
+        for drop, kept in (("oldest", [6.0, 7.0, 8.0, 9.0]), ("newest", [0.0, 1.0, 2.0, 3.0])):
+            queue = WriteBehindQueue(self.sessions, max_rows=4, drop=drop)
+            for i in range(10):
+                queue.put(Metric, t=float(i), elapsed_ms=0.0, steps=1)
+            self.assertEqual(queue.stats()["dropped"], 6)
+            self.assertEqual([row["t"] for _, row, _ in queue._rows], kept)
+
+    def test_put_does_not_wait_for_a_slow_database(self):
+        gate = threading.Event()
+
+        def slow_sessions():
+            gate.wait(5)
+            return self.sessions()
+
+        queue = WriteBehindQueue(slow_sessions, batch_size=1, flush_ms=0)
+        queue.start()
+        try:
+            start = time.perf_counter()
+            for i in range(200):
+                queue.put(Metric, t=float(i), elapsed_ms=0.0, steps=1)
+            self.assertLess(time.perf_counter() - start, 0.5)
+        finally:
+            gate.set()
+            queue.stop()
+        self.assertEqual(self.count(Metric), 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
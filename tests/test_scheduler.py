@@ -0,0 +1,159 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.sqlite3")
+
+from server.broadcast import FrameHub
+from server.db import SessionLocal
+from server.persistence import WriteBehindQueue
+from server.scheduler import Scheduler
+from server.sessions import DEFAULT_SESSION, SessionManager
+from server.sim_service import SimulationService
+
+
+SRC = "\n".join(
+    [
+        "law drift priority 1",
+        "  when true",
+        "  do vx += 0.1",
+        "end",
+    ]
+)
+
+
+class BusyService:
+    """Just enough of SimulationService for the scheduler: a flag, a kernel and a step."""
+
+    def __init__(self, cost=0.002, tick_ms=0):
+        self.running = True
+        self.kernel = SimpleNamespace(world=SimpleNamespace(backend=SimpleNamespace(name="cpu")))
+        self.tick_ms = tick_ms
+        self.cost = cost
+        self.threads = set()
+
+    def step(self):
+        self.threads.add(threading.current_thread().name)
+        end = time.perf_counter() + self.cost
+        while time.perf_counter() < end:
+            pass
+
+
+def _wait_for(pred, timeout=5.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if pred():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class SchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = Scheduler(idle_after=0)
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def test_cpu_time_follows_weights(self):
+        heavy, light = BusyService(), BusyService()
+        self.scheduler.add("heavy", heavy, weight=3)
+        self.scheduler.add("light", light, weight=1)
+        self.scheduler.start()
+        time.sleep(0.6)
+        stats = self.scheduler.stats()
+        self.assertAlmostEqual(stats["heavy"]["cpu_share"], 0.75, delta=0.08)
+        self.assertEqual(heavy.threads, {"mythos-sim"})
+        # Both are always due and never get their turn on time, so both report lag
+        self.assertGreater(stats["light"]["lag_ms"], 0.0)
+
+    def test_rate_limited_sessions_leave_time_for_others(self):
+        slow, busy = BusyService(tick_ms=50), BusyService()
+        self.scheduler.add("slow", slow)
+        self.scheduler.add("busy", busy)
+        self.scheduler.start()
+        time.sleep(0.5)
+        stats = self.scheduler.stats()
+        self.assertLessEqual(stats["slow"]["ticks"], 12)
+        self.assertGreater(stats["busy"]["ticks"], 5 * stats["slow"]["ticks"])
+
+    def test_idle_sessions_stop_until_touched(self):
+        scheduler = Scheduler(idle_after=0.1)
+        watched, unwatched = BusyService(), BusyService()
+        scheduler.add("watched", watched, keepalive=lambda: True)
+        scheduler.add("unwatched", unwatched)
+        scheduler.start()
+        try:
+            self.assertTrue(_wait_for(lambda: scheduler.stats()["unwatched"]["idle"]))
+            ticks = scheduler.stats()["unwatched"]["ticks"]
+            time.sleep(0.1)
+            self.assertEqual(scheduler.stats()["unwatched"]["ticks"], ticks)
+            self.assertFalse(scheduler.stats()["watched"]["idle"])
+            self.assertTrue(unwatched.running)
+            scheduler.touch("unwatched")
+            self.assertTrue(_wait_for(lambda: scheduler.stats()["unwatched"]["ticks"] > ticks))
+        finally:
+            scheduler.stop()
+
+    def test_failed_step_pauses_only_that_session(self):
+        bad, good = BusyService(), BusyService()
+        bad.step = lambda: 1 / 0
+        self.scheduler.add("bad", bad)
+        self.scheduler.add("good", good)
+        self.scheduler.start()
+        self.assertTrue(_wait_for(lambda: not bad.running))
+        ticks = self.scheduler.stats()["good"]["ticks"]
+        self.assertTrue(_wait_for(lambda: self.scheduler.stats()["good"]["ticks"] > ticks))
+
+
+class SessionManagerTests(unittest.TestCase):
+    def setUp(self):
+        self.sessions = SessionManager(
+            lambda name: SimulationService(WriteBehindQueue(SessionLocal), name=name),
+            lambda service: FrameHub(service.frames),
+            Scheduler(idle_after=0),
+            WriteBehindQueue(SessionLocal),
+            max_sessions=3,
+        )
+        self.sessions.start()
+
+    def tearDown(self):
+        self.sessions.stop()
+
+    def test_sessions_hold_separate_worlds(self):
+        a = self.sessions.get(DEFAULT_SESSION).service
+        b = self.sessions.get("other", create=True).service
+        asyncio.run(a.apply_program(SRC, None, seed=1, n=10))
+        asyncio.run(b.apply_program(SRC, None, seed=2, n=25))
+        b.set_run(True).result(timeout=5)
+        self.assertTrue(_wait_for(lambda: self.sessions.scheduler.stats()["other"]["ticks"] > 3))
+        self.assertEqual(len(a.last_frame.entities), 10)
+        self.assertEqual(len(b.last_frame.entities), 25)
+        self.assertEqual(a.last_frame.t, 0.0)
+        self.assertGreater(b.last_frame.t, 0.0)
+        names = [item["name"] for item in self.sessions.list()]
+        self.assertEqual(names, [DEFAULT_SESSION, "other"])
+
+    def test_limits_and_removal(self):
+        with self.assertRaises(KeyError):
+            self.sessions.get("missing")
+        with self.assertRaises(ValueError):
+            self.sessions.create("../escape")
+        self.sessions.create("one")
+        self.sessions.create("two", weight=2)
+        with self.assertRaises(ValueError):
+            self.sessions.create("three")
+        self.assertEqual(self.sessions.scheduler.stats()["two"]["weight"], 2.0)
+        self.sessions.remove("one")
+        self.assertNotIn("one", self.sessions.scheduler)
+        with self.assertRaises(ValueError):
+            self.sessions.remove(DEFAULT_SESSION)
+        self.sessions.create("three")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+
+import numpy as np
+
+from engine.backend import get_backend
+from engine.compiler import compile_program
+from engine.factory import seed_world
+from engine.kernel import Kernel
+from engine.safeexpr import compile_expr
+from engine.selectors import SelectorCache
+
+from test_vector import PROFILES, _run
+
+
+class SelectorCacheTests(unittest.TestCase):
+    def test_masks_are_cached_until_read_columns_change(self):
+        world = seed_world(64, 64, seed=4, backend=get_backend(False), profiles=PROFILES)
+        store = world.entities
+        cache = SelectorCache()
+        expr = compile_expr('color == "red" and mass > LIMIT')
+        env = {"LIMIT": 1.5}
+        cache.begin_substep(store, env)
+        mask = cache.mask(expr)
+        expected = [e.color == "red" and e.mass > 1.5 for e in store]
+        self.assertEqual(mask.tolist(), expected)
+
+        world.step_integrate()  # moves entities, leaves color and mass alone
+        cache.begin_substep(store, env)
+        self.assertIs(cache.mask(expr), mask)
+
+        store[0].color = "blue" if store[0].color == "red" else "red"
+        cache.begin_substep(store, env)
+        self.assertIsNot(cache.mask(expr), mask)
+        self.assertEqual(cache.mask(expr)[0], store[0].color == "red" and store[0].mass > 1.5)
+
+    def test_selector_filters_neighbors(self):
+        src = "\n".join(
+            [
+                "law chase priority 1",
+                "  when color == \"blue\"",
+                "  do cohere(30, 0.1, color == \"red\")",
+                "end",
+            ]
+        )
+        prog = compile_program(src)
+        world = seed_world(64, 64, seed=4, backend=get_backend(False), profiles=PROFILES)
+        kernel = Kernel(world, prog.consts, prog.laws)
+        kernel._build_grid()
+        kernel.selectors.begin_substep(world.entities, dict(kernel.consts))
+        store = world.entities
+        blue = next(e for e in store if e.color == "blue")
+        sel = prog.laws[0].actions[0].args[2]
+        nb, _, _, _ = kernel._near(blue, kernel._get_neighbors(blue.x, blue.y, 30), 30, sel)
+        self.assertTrue(nb.size > 0)
+        self.assertTrue(all(store[int(i)].color == "red" for i in nb))
+
+        scalar = _run(False, src, ticks=3)
+        vector = _run(True, src, ticks=3)
+        for name in ("x", "y", "vx", "vy"):
+            np.testing.assert_array_equal(getattr(scalar.world.entities, name), getattr(vector.world.entities, name))
+
+    def test_row_laws_keep_masks_when_colors_do_not_change(self):
+        src = "\n".join(
+            [
+                "law chase priority 1",
+                "  when color == \"blue\"",
+                "  do attract(30, 0.1, color == \"red\"); vx *= 0.9",
+                "end",
+            ]
+        )
+        for vectorize in (False, True):
+            kernel = _run(vectorize, src, ticks=1)
+            sel = kernel.laws[0].actions[0].args[2]
+            mask = kernel.selectors.mask(sel)
+            version = kernel.world.entities.versions["color_code"]
+            kernel.tick()
+            self.assertEqual(kernel.world.entities.versions["color_code"], version)
+            self.assertIs(kernel.selectors.mask(sel), mask)
+
+    def test_selectors_read_field_samples(self):
+        world = seed_world(64, 64, seed=4, backend=get_backend(False), profiles=PROFILES)
+        world.sample_entities(["terrain"])
+        store = world.entities
+        cache = SelectorCache()
+        cache.begin_substep(store, {}, ["terrain"])
+        mask = cache.mask(compile_expr("terrain > 0.3"))
+        self.assertEqual(mask.tolist(), (store.column("terrain") > 0.3).tolist())
+        cache.begin_substep(store, {}, ["terrain"])
+        self.assertIsNot(cache.mask(compile_expr("terrain > 0.3")), mask)
+
+        src = "\n".join(
+            [
+                "law flock priority 1",
+                "  when true",
+                "  do cohere(20, 0.05, terrain > 0.3)",
+                "end",
+            ]
+        )
+        scalar = _run(False, src, ticks=3)
+        vector = _run(True, src, ticks=3)
+        for name in ("x", "y", "vx", "vy"):
+            np.testing.assert_array_equal(getattr(scalar.world.entities, name), getattr(vector.world.entities, name))
+
+
+if __name__ == "__main__":
+    unittest.main()
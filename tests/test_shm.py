@@ -0,0 +1,188 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.sqlite3")
+os.environ.setdefault("MYTHOS_REPLAY_DIR", tempfile.mkdtemp())
+
+from server import config
+from server.remote import RemoteSessions
+from server.sessions import DEFAULT_SESSION
+from server.shm import SharedFrameReader, SharedFrameWriter
+from server.sim_service import FieldCache, SimulationService
+from server.simd import SimServer
+
+
+SRC = "\n".join(
+    [
+        "law drift priority 1",
+        "  when true",
+        "  do vx += 0.1",
+        "end",
+    ]
+)
+
+PREFIX = f"mythos-test-{os.getpid()}"
+
+
+def _wait_for(pred, timeout=5.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if pred():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _count_in_child(name, out):
+    reader = SharedFrameReader(name)
+    _, frame = reader.read()
+    out.put((len(frame.columns["id"]), float(frame.columns["x"].sum())))
+    del frame
+    reader.close()
+
+
+class SharedFrameRingTests(unittest.TestCase):
+    def setUp(self):
+        self.service = SimulationService()
+        asyncio.run(self.service.apply_program(SRC, None, seed=3, n=40))
+        self.name = f"{PREFIX}-ring"
+        self.writer = SharedFrameWriter(self.name, slots=4, field_every=0.0)
+        self.reader = None
+
+    def tearDown(self):
+        if self.reader is not None:
+            self.reader.close()
+        self.writer.close()
+
+    def publish(self):
+        service = self.service
+        self.writer.publish(service.last_frame, service.kernel.world, service.generation)
+
+    def test_reader_sees_the_published_frame_without_copying(self):
+        self.publish()
+        self.reader = SharedFrameReader(self.name)
+        seq, frame = self.reader.read()
+        expected = self.service.last_frame
+        self.assertEqual(frame.binary, expected.binary)
+        self.assertFalse(frame.columns["x"].flags.owndata)
+        self.assertFalse(frame.columns["x"].flags.writeable)
+        self.assertIsNone(self.reader.read(after=seq))
+
+        shared = self.reader.fields()
+        world = self.service.kernel.world
+        self.assertEqual(shared.field_versions, world.field_versions)
+        got = FieldCache().encode(shared.generation, shared, 4, "u16", ("terrain", "water"))
+        want = FieldCache().encode(self.service.generation, world, 4, "u16", ("terrain", "water"))
+        self.assertEqual(got.body, want.body)
+
+    def test_ring_wraps_and_grows(self):
+        self.publish()
+        self.reader = SharedFrameReader(self.name)
+        first, _ = self.reader.read()
+        for _ in range(4):
+            self.service.step()
+            self.publish()
+        self.assertFalse(self.reader.valid(first))
+        # A much bigger world needs a bigger segment; readers follow it
+        asyncio.run(self.service.apply_program(SRC, None, seed=4, n=3000))
+        self.publish()
+        seq, frame = self.reader.read(first)
+        self.assertEqual(len(frame.columns["id"]), 3000)
+        self.assertTrue(self.reader.valid(seq))
+        self.assertEqual(self.reader.fields().generation, self.service.generation)
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "needs fork")
+    def test_another_process_reads_the_frame(self):
+        self.publish()
+        ctx = multiprocessing.get_context("fork")
+        out = ctx.Queue()
+        child = ctx.Process(target=_count_in_child, args=(self.name, out))
+        child.start()
+        count, total = out.get(timeout=10)
+        child.join(10)
+        cols = self.service.last_frame.columns
+        self.assertEqual(count, len(cols["id"]))
+        self.assertAlmostEqual(total, float(cols["x"].sum()), places=3)
+
+
+class RemoteSessionsTests(unittest.TestCase):
+    def setUp(self):
+        address = os.path.join(tempfile.mkdtemp(), "sim.sock")
+        self.server = SimServer(address, b"test", prefix=PREFIX, field_every=0.0)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.assertTrue(_wait_for(lambda: os.path.exists(address)))
+        self.sessions = RemoteSessions(address, b"test", config.make_hub, prefix=PREFIX, poll_ms=2)
+        self.sessions.start()
+
+    def tearDown(self):
+        self.sessions.stop()
+        self.server.shutdown()
+        self.thread.join(5)
+
+    def test_commands_go_to_the_simulation_and_frames_come_back(self):
+        remote = self.sessions.get(DEFAULT_SESSION).service
+        asyncio.run(remote.apply_program(SRC, None, 5, 30))
+        self.assertEqual(len(remote.last_frame.entities), 30)
+        fields = asyncio.run(remote.fields_payload(step=8))
+        self.assertEqual(fields["grid_w"], len(fields["terrain"][0]))
+
+        remote.set_rate(1, 1).result(timeout=5)
+        remote.set_run(True).result(timeout=5)
+        first = remote.last_frame
+        self.assertTrue(_wait_for(lambda: remote.last_frame.t > first.t + 3))
+        local = self.server.sessions.get(DEFAULT_SESSION).service
+        remote.set_run(False).result(timeout=5)
+        self.assertTrue(_wait_for(lambda: remote.last_frame.t == local.last_frame.t))
+        np.testing.assert_array_equal(remote.last_frame.columns["vx"], local.last_frame.columns["vx"])
+
+    def test_sessions_and_errors_cross_the_process_boundary(self):
+        with self.assertRaises(KeyError):
+            self.sessions.get("nope")
+        other = self.sessions.get("other", create=True).service
+        asyncio.run(other.apply_program(SRC, None, 1, 12))
+        self.assertEqual(len(other.last_frame.entities), 12)
+        self.assertEqual([item["name"] for item in self.sessions.list()], [DEFAULT_SESSION, "other"])
+        with self.assertRaises(ValueError):
+            asyncio.run(other.seek(-1))
+        self.sessions.remove("other")
+        self.assertNotIn("other", self.server.writers)
+
+
+class AuthKeyTests(unittest.TestCase):
+    def setUp(self):
+        self.saved = os.environ.pop("MYTHOS_SIM_AUTHKEY", None)
+
+    def tearDown(self):
+        if self.saved is not None:
+            os.environ["MYTHOS_SIM_AUTHKEY"] = self.saved
+
+    def test_local_processes_share_a_private_random_key(self):
+        key_file = os.path.join(tempfile.mkdtemp(), "sim.key")
+        key = config.sim_authkey("/tmp/mythos.sock", key_file)
+        self.assertEqual(len(key), 64)
+        self.assertEqual(config.sim_authkey(("127.0.0.1", 8765), key_file), key)
+        self.assertEqual(os.stat(key_file).st_mode & 0o777, 0o600)
+        self.assertNotEqual(config.sim_authkey(None, os.path.join(tempfile.mkdtemp(), "sim.key")), key)
+
+    def test_remote_addresses_need_an_explicit_key(self):
+        key_file = os.path.join(tempfile.mkdtemp(), "sim.key")
+        with self.assertRaises(RuntimeError):
+            config.sim_authkey(("0.0.0.0", 8765), key_file)
+        self.assertFalse(os.path.exists(key_file))
+        os.environ["MYTHOS_SIM_AUTHKEY"] = "s3cret"
+        try:
+            self.assertEqual(config.sim_authkey(("10.0.0.2", 8765), key_file), b"s3cret")
+        finally:
+            del os.environ["MYTHOS_SIM_AUTHKEY"]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.sqlite3")
+
+from sqlalchemy import create_engine, inspect, text
+
+from server import protocol
+from server.db import SessionLocal, init_db
+from server.models import Base, SnapshotBlob
+from server.sim_service import SimulationService
+
+
+SRC = "\n".join(
+    [
+        "law drift priority 1",
+        "  when true",
+        "  do vx += 0.1",
+        "end",
+    ]
+)
+
+
+def _wait_for(pred, timeout=5.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if pred():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class SimulationServiceTests(unittest.TestCase):
+    def setUp(self):
+        self.service = SimulationService()
+        self.service.start()
+
+    def tearDown(self):
+        self.service.stop()
+
+    def test_worker_publishes_immutable_frames(self):
+        service = self.service
+        asyncio.run(service.apply_program(SRC, None, seed=3, n=12))
+        first = service.last_frame
+        self.assertEqual(len(first.entities), 12)
+        service.set_rate(1, 2).result(timeout=5)
+        service.set_run(True)
+        self.assertTrue(_wait_for(lambda: service.last_frame.seq > first.seq + 2))
+        later = service.last_frame
+        self.assertGreater(later.t, first.t)
+        with self.assertRaises(Exception):
+            first.t = 0.0
+        service.set_run(False).result(timeout=5)
+        fields = asyncio.run(service.fields_payload(step=8))
+        self.assertEqual(fields["grid_w"], len(fields["terrain"][0]))
+
+    def test_reads_do_not_wait_for_a_slow_tick(self):
+        service = self.service
+        asyncio.run(service.apply_program(SRC, None, seed=3, n=12))
+        tick = service.kernel.tick
+
+        def slow_tick(*args, **kwargs):
+            time.sleep(0.3)
+            tick(*args, **kwargs)
+
+        service.kernel.tick = slow_tick
+        seq = service.last_frame.seq
+        service.set_run(True)
+        time.sleep(0.05)
+        start = time.perf_counter()
+        payload = service.frame_payload()
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertIsNotNone(payload)
+        self.assertTrue(_wait_for(lambda: service.last_frame.seq > seq))
+        service.set_run(False)
+
+    def test_checkpoint_round_trip_through_the_worker(self):
+        service = self.service
+        service.checkpoint_dir = Path(tempfile.mkdtemp())
+        asyncio.run(service.apply_program(SRC, None, seed=3, n=12))
+        saved = asyncio.run(service.save_checkpoint("soak-1"))
+        self.assertEqual([c["name"] for c in service.list_checkpoints()], ["soak-1"])
+        before = service.last_frame
+        asyncio.run(service.apply_program(SRC, None, seed=9, n=5))
+        asyncio.run(service.restore_checkpoint("soak-1"))
+        self.assertEqual(service.kernel.world.time, saved["t"])
+        self.assertEqual(service.last_frame.entities, before.entities)
+        with self.assertRaises(ValueError):
+            asyncio.run(service.save_checkpoint("../escape"))
+
+    def test_command_errors_reach_the_caller(self):
+        with self.assertRaises(Exception):
+            asyncio.run(self.service.apply_program("law broken", None, seed=1, n=3))
+
+
+class MigrationTests(unittest.TestCase):
+    def test_old_databases_are_migrated_in_place(self):
+        engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/old.sqlite3", future=True)
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE snapshot_blobs"))
+            conn.execute(text(
+                "CREATE TABLE snapshot_blobs (id INTEGER PRIMARY KEY, t FLOAT NOT NULL, created FLOAT NOT NULL, "
+                "seq INTEGER NOT NULL, n INTEGER NOT NULL, data BLOB NOT NULL)"
+            ))
+        init_db(engine)
+        init_db(engine)
+        inspector = inspect(engine)
+        self.assertTrue({"session", "ordinal"} <= {c["name"] for c in inspector.get_columns("snapshot_blobs")})
+        self.assertIn(["session"], [ix["column_names"] for ix in inspector.get_indexes("snapshot_blobs")])
+
+    def test_a_restarted_session_continues_its_snapshot_numbering(self):
+        init_db()
+        with SessionLocal() as session:
+            session.add(SnapshotBlob(t=0.0, created=0.0, seq=0, n=0, session="numbered", ordinal=7, data=b""))
+            session.commit()
+        self.assertEqual(SimulationService(name="numbered")._last_ordinal(), 7)
+        self.assertEqual(SimulationService(name="fresh")._last_ordinal(), 0)
+
+
+class ReplayTests(unittest.TestCase):
+    def test_seek_returns_to_an_earlier_tick(self):
+        service = SimulationService(replay_dir=tempfile.mkdtemp(), replay_every=4)
+        asyncio.run(service.apply_program(SRC, None, seed=3, n=12))
+        service.set_run(True)
+        for _ in range(6):
+            service.step()
+            if service.kernel.ticks == 5:
+                at_five = service.last_frame.entities
+        self.assertEqual(service.replay_status()["checkpoints"], [0, 4])
+        asyncio.run(service.seek(5))
+        self.assertFalse(service.running)
+        self.assertEqual(service.replay_status()["tick"], 5)
+        self.assertEqual(service.last_frame.entities, at_five)
+        self.assertEqual([e["kind"] for e in service.recorder.events], ["apply", "run"])
+
+
+class FrameProtocolTests(unittest.TestCase):
+    def test_binary_frame_round_trips_the_json_entities(self):
+        service = SimulationService()
+        pack = service.load_worldpack("fantasy.json")
+        asyncio.run(service.apply_program(pack["dsl"], pack["profiles"], pack["seed"], 40))
+        service.step()
+        frame = service.last_frame
+        decoded = protocol.decode_frame(frame.binary)
+        self.assertEqual(len(frame.binary), protocol.HEADER.size + decoded["n"] * protocol.BYTES_PER_ENTITY)
+        self.assertEqual((decoded["seq"], decoded["w"], decoded["h"]), (frame.seq, frame.w, frame.h))
+        tables = protocol.tables_message(frame)
+        self.assertEqual(decoded["tables"], tables["version"])
+        for i, ent in enumerate(frame.entities):
+            self.assertEqual(decoded["id"][i], ent["id"])
+            self.assertEqual(tables["colors"][decoded["color_code"][i]], ent["color"])
+            self.assertEqual(tables["kinds"][decoded["kind_code"][i]], ent["kind"])
+            for name in protocol.FLOAT_COLUMNS:
+                self.assertAlmostEqual(float(decoded[name][i]), ent[name], places=3)
+
+        service.step()
+        self.assertEqual(service.last_frame.tables_version, frame.tables_version)
+        service.kernel.world.entities[0].color = "brand-new"
+        service.step()
+        self.assertEqual(service.last_frame.tables_version, frame.tables_version + 1)
+        self.assertIn("brand-new", service.last_frame.colors)
+
+
+class FieldsResponseTests(unittest.TestCase):
+    def setUp(self):
+        self.service = SimulationService()
+        asyncio.run(self.service.apply_program(SRC, None, seed=3, n=12))
+
+    def test_versions_track_changed_channels_only(self):
+        service = self.service
+        first = asyncio.run(service.fields_response(step=8))
+        again = asyncio.run(service.fields_response(step=8))
+        self.assertIs(again, first)
+        versions = dict(service.kernel.world.field_versions)
+        service.step()
+        world = service.kernel.world
+        self.assertEqual(world.field_versions["terrain"], versions["terrain"])
+        self.assertGreater(world.field_versions["water"], versions["water"])
+        later = asyncio.run(service.fields_response(step=8))
+        self.assertNotEqual(later.etag, first.etag)
+        terrain = asyncio.run(service.fields_response(step=8, names=("terrain",)))
+        world.terrain_field = world.terrain_field + 1.0
+        self.assertNotEqual(asyncio.run(service.fields_response(step=8, names=("terrain",))).etag, terrain.etag)
+
+    def test_quantized_grids_match_the_json_payload(self):
+        service = self.service
+        payload = asyncio.run(service.fields_payload(step=8))
+        for fmt, tol in (("u8", 0.01), ("u16", 1e-4)):
+            decoded = protocol.decode_grids(asyncio.run(service.fields_response(step=8, fmt=fmt)).body)
+            self.assertEqual((decoded["grid_w"], decoded["grid_h"]), (payload["grid_w"], payload["grid_h"]))
+            self.assertEqual(decoded["versions"], payload["versions"])
+            for name in ("terrain", "water", "fertility", "climate"):
+                expected = np.asarray(payload[name])
+                span = max(1.0, float(expected.max() - expected.min()))
+                self.assertLessEqual(float(np.abs(decoded[name] - expected).max()), tol * span)
+        png = asyncio.run(service.fields_response(step=8, fmt="png", names=("terrain",)))
+        self.assertTrue(png.body.startswith(b"\x89PNG"))
+        self.assertIn("X-Field-Scale", png.headers)
+        with self.assertRaises(ValueError):
+            asyncio.run(service.fields_response(step=8, fmt="png"))
+        with self.assertRaises(KeyError):
+            asyncio.run(service.fields_response(step=8, names=("nope",)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+
+from engine.spatial import SpatialIndex
+
+
+def _brute(qx, qy, radius, x, y, idx):
+    pairs = []
+    for q in range(len(qx)):
+        for j in idx:
+            if (x[j] - qx[q]) ** 2 + (y[j] - qy[q]) ** 2 <= radius * radius and j != q:
+                pairs.append((q, int(j)))
+    return sorted(pairs)
+
+
+class SpatialIndexTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        self.x = rng.uniform(-20, 200, 300)
+        self.y = rng.uniform(0, 150, 300)
+        self.x[7], self.y[7] = 1e7, -1e7  # far outlier forces the clamped layout
+        self.idx = np.flatnonzero(rng.random(300) > 0.1)
+
+    def test_radius_query_matches_brute_force(self):
+        sp = SpatialIndex(16)
+        for xs in (self.x.copy(), np.where(np.arange(300) == 7, 50.0, self.x)):
+            sp.build(xs, self.y, self.idx)
+            qi, nj = sp.query_radius(xs, self.y, 24.0, xs, self.y, exclude=np.arange(300))
+            self.assertTrue(np.all(np.diff(qi) >= 0))
+            self.assertEqual(sorted(zip(qi.tolist(), nj.tolist())), _brute(xs, self.y, 24.0, xs, self.y, self.idx))
+
+    def test_candidates_cover_neighbors_in_cell_order(self):
+        self.x[7], self.y[7] = 50.0, 60.0
+        sp = SpatialIndex(16)
+        sp.build(self.x, self.y, self.idx)
+        self.assertFalse(sp.clamped)
+        for q in (0, 7, 42):
+            cand = sp.candidates(self.x[q], self.y[q], 24.0)
+            near = {j for qq, j in _brute(self.x[q:q + 1], self.y[q:q + 1], 24.0, self.x, self.y, self.idx)}
+            self.assertTrue(near <= set(cand.tolist()))
+            cells = np.floor(self.y[cand] / 16) * 1e6 + np.floor(self.x[cand] / 16)
+            self.assertTrue(np.all(np.diff(cells) >= 0))
+
+    def test_rect_query_matches_brute_force(self):
+        sp = SpatialIndex(16)
+        for xs in (self.x.copy(), np.where(np.arange(300) == 7, 50.0, self.x)):
+            sp.build(xs, self.y, self.idx)
+            for rect in ((10.0, 20.0, 90.0, 70.0), (-1e9, -1e9, 1e9, 1e9), (300.0, 0.0, 400.0, 10.0), (5.0, 5.0, 5.0, 5.0)):
+                x0, y0, x1, y1 = rect
+                inside = (xs >= x0) & (xs <= x1) & (self.y >= y0) & (self.y <= y1)
+                expected = self.idx[inside[self.idx]]
+                np.testing.assert_array_equal(sp.query_rect(x0, y0, x1, y1, xs, self.y), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+
+import numpy as np
+
+from engine.backend import get_backend
+from engine.compiler import compile_program
+from engine.factory import seed_world
+from engine.kernel import Kernel
+
+PROFILES = [
+    {"name": "a", "color": "red", "count": 30, "mass_range": [1, 2], "hardness_range": [0.5, 1.5],
+     "speed_range": [-1, 1], "energy_range": [0.1, 1.0]},
+    {"name": "b", "color": "blue", "count": 30, "mass_range": [1, 2], "hardness_range": [0.5, 1.5],
+     "speed_range": [-1, 1], "energy_range": [0.1, 1.0]},
+]
+
+SRC = "\n".join(
+    [
+        "const G = 0.12",
+        "const SUBSTEPS = 2",
+        "law gravity priority 10",
+        "  when true",
+        "  do vy += G",
+        "end",
+        "law burn priority 8",
+        "  when color == \"red\" and energy > 0.05",
+        "  do energy -= 0.02; vx *= 0.99",
+        "  do emit_sound(0.1 * mass)",
+        "end",
+        "law starve priority 5",
+        "  when energy < 0.2",
+        "  do alive = false",
+        "end",
+        "law cap priority 4",
+        "  when not (color == \"red\")",
+        "  do vx = clamp(vx, -0.5, 0.5); hardness /= max(mass, 1.5)",
+        "end",
+    ]
+)
+
+
+def _run(vectorize: bool, src: str = SRC, ticks: int = 6):
+    prog = compile_program(src)
+    world = seed_world(64, 64, seed=4, backend=get_backend(False), profiles=PROFILES)
+    kernel = Kernel(world, prog.consts, prog.laws, vectorize=vectorize)
+    for _ in range(ticks):
+        kernel.tick()
+    return kernel
+
+
+class VectorEngineTests(unittest.TestCase):
+    def test_per_entity_laws_match_scalar(self):
+        scalar = _run(False)
+        vector = _run(True)
+        self.assertTrue(all(v is not None for v in vector.vector_laws))
+        a, b = scalar.world.entities, vector.world.entities
+        np.testing.assert_array_equal(a.alive, b.alive)
+        for name in ("x", "y", "vx", "vy", "energy", "sound", "hardness"):
+            np.testing.assert_allclose(getattr(a, name), getattr(b, name), rtol=1e-12, atol=1e-12)
+
+    def test_neighbor_calls_fall_back_to_scalar(self):
+        src = "\n".join(
+            [
+                "law flock priority 1",
+                "  when true",
+                "  do attract(10, 0.05, true); vx += 0.01",
+                "end",
+                "law fall priority 0",
+                "  when true",
+                "  do vy += 0.1",
+                "end",
+            ]
+        )
+        kernel = _run(True, src, ticks=2)
+        self.assertIsNone(kernel.vector_laws[0])
+        self.assertIsNotNone(kernel.vector_laws[1])
+
+    def test_batched_boids_match_scalar(self):
+        src = "\n".join(
+            [
+                "law flock priority 1",
+                "  when color == \"red\"",
+                "  do cohere(20, 0.05, true); separate(8, 0.08, true)",
+                "end",
+                "law drift priority 0",
+                "  when true",
+                "  do vx *= 0.98",
+                "end",
+            ]
+        )
+        scalar = _run(False, src, ticks=4)
+        vector = _run(True, src, ticks=4)
+        self.assertIsNotNone(vector.vector_laws[0])
+        for name in ("x", "y", "vx", "vy"):
+            np.testing.assert_array_equal(getattr(scalar.world.entities, name), getattr(vector.world.entities, name))
+
+    def test_math_errors_match_scalar(self):
+        def law(when, do):
+            return "\n".join(["law l priority 1", f"  when {when}", f"  do {do}", "end"])
+
+        for src, error in ((law("true", "energy = energy / (vx - vx)"), ZeroDivisionError),
+                           (law("true", "energy = log(-1 - mass)"), ValueError)):
+            for vectorize in (False, True):
+                with self.assertRaises(error):
+                    _run(vectorize, src, ticks=1)
+        # Guarded by the other side of `and` per entity, so neither mode fails
+        guarded = law("mass < 0 and energy / (vx - vx) > 1", "energy = 0")
+        scalar, vector = _run(False, guarded, ticks=1), _run(True, guarded, ticks=1)
+        np.testing.assert_array_equal(scalar.world.entities.energy, vector.world.entities.energy)
+
+
+if __name__ == "__main__":
+    unittest.main()